@@ -0,0 +1,33 @@
+"""
+Minimal model used by the benchmarks. It lives in its own module so that pickled systems can be loaded again,
+independent of how the benchmark runner was started.
+"""
+from mlpf.ModelPackage.abstract_model import AbstractModel
+from typing import Dict, Any
+
+import numpy as np
+
+
+class _SumLearnStrategy:
+
+    def learn(self, model, training_signal: Dict[str, Any], **kwargs):
+        frame = training_signal['data_signal']
+        model.sums = model.sums + frame.to_numpy().sum(axis=0)
+        return {'rows': len(frame)}
+
+
+class _SumResponseStrategy:
+
+    def predict(self, model, signal: Dict[str, Any], **kwargs):
+        return model.sums
+
+
+class BenchmarkModel(AbstractModel):
+
+    def __init__(self, settings: Dict):
+        super().__init__(_SumLearnStrategy(), _SumResponseStrategy(), settings)
+        self.sums = 0.
+
+
+def mean_absolute_error(prediction, signal: Dict[str, Any]) -> float:
+    return float(np.abs(signal['data_signal'].to_numpy() - prediction).mean())
@@ -0,0 +1,49 @@
+"""
+Compare two benchmark result files of run_benchmarks.
+
+    python -m benchmarks.compare base.json new.json --threshold 1.1
+
+Prints the ratio new / base of the median time of every benchmark that is present in both files and exits with
+status 1 if any ratio is above the threshold.
+"""
+from typing import Dict, Any, List, Tuple
+
+import argparse
+import json
+import sys
+
+
+def compare(base: Dict[str, Any], new: Dict[str, Any]) -> List[Tuple[str, str, float, float, float]]:
+    rows = []
+    for scale, new_scale in new['scales'].items():
+        base_scale = base['scales'].get(scale)
+        if base_scale is None:
+            continue
+        for name, new_result in new_scale['benchmarks'].items():
+            base_result = base_scale['benchmarks'].get(name)
+            if base_result is None or base_result['median_s'] <= 0:
+                continue
+            ratio = new_result['median_s'] / base_result['median_s']
+            rows.append((scale, name, base_result['median_s'], new_result['median_s'], ratio))
+    return rows
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Compare two mlpf benchmark result files.')
+    parser.add_argument('base')
+    parser.add_argument('new')
+    parser.add_argument('--threshold', type=float, default=1.1, help='ratio above which a benchmark regressed')
+    args = parser.parse_args(argv)
+    with open(args.base) as base_file, open(args.new) as new_file:
+        rows = compare(json.load(base_file), json.load(new_file))
+    regressed = False
+    print('{:<8} {:<26} {:>12} {:>12} {:>8}'.format('scale', 'benchmark', 'base [s]', 'new [s]', 'ratio'))
+    for scale, name, base_median, new_median, ratio in rows:
+        flag = ' <- regression' if ratio > args.threshold else ''
+        regressed = regressed or bool(flag)
+        print('{:<8} {:<26} {:>12.4f} {:>12.4f} {:>8.2f}{}'.format(scale, name, base_median, new_median, ratio, flag))
+    return 1 if regressed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
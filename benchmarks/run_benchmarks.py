@@ -0,0 +1,254 @@
+"""
+Benchmark suite of the data and learning pipeline.
+
+    python -m benchmarks.run_benchmarks --scales small medium --output bench.json
+    python -m benchmarks.compare base.json bench.json
+
+Every scale generates its own synthetic workbench data (see synthetic_data) and times ingest, the time until the
+first table of an asynchronous ingest is available, meta data queries, row filtered retrieval, queries from several
+threads while another thread reloads tables and toggles an index, preprocessing in iterative and batch mode, fitting
+the global normalization, the learn_data iteration, the parallel evaluation, a grouped 5-fold cross-validation and
+saving / loading of the system. Results are written as json. The concurrent queries also check that every reader
+saw a consistent snapshot and fail the run otherwise.
+"""
+from . import synthetic_data
+from .benchmark_components import BenchmarkModel, mean_absolute_error
+from mlpf.BackendPackage.system_manager import SystemManager
+from mlpf.DataWarehousePackage.lib.meta_query import Range
+from mlpf.ModelPackage import model_factory
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Callable
+
+import numpy as np
+import pandas as pd
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+
+
+SCALES: Dict[str, Dict[str, int]] = {
+    'tiny': {'folders': 2, 'tables_per_folder': 10, 'table_length': 200},
+    'small': {'folders': 4, 'tables_per_folder': 25, 'table_length': 500},
+    'medium': {'folders': 8, 'tables_per_folder': 100, 'table_length': 2000},
+    'large': {'folders': 16, 'tables_per_folder': 250, 'table_length': 5000},
+}
+
+COLUMNS = synthetic_data.TRAJECTORY_COLUMNS
+PREPROCESSING_COLUMNS = [synthetic_data.TIME] + synthetic_data.TRAJECTORY_COLUMNS
+BENCHMARK_MODEL = 'benchmark_model'
+BENCHMARK_PREPROCESSOR = 'low_pass'
+CONCURRENT_QUERIES = 16
+QUERY_THREADS = [1, 2, 4, 8]
+
+
+def _register():
+    if BENCHMARK_MODEL not in model_factory.get_selection():
+        model_factory.register(BENCHMARK_MODEL, BenchmarkModel)
+
+
+def _timed(function: Callable, repeat: int, setup: Callable = None) -> Dict[str, Any]:
+    timings = []
+    result = None
+    for _ in range(repeat):
+        argument = setup() if setup is not None else None
+        start = time.perf_counter()
+        result = function(argument) if setup is not None else function()
+        timings.append(time.perf_counter() - start)
+    return {'repeat': repeat, 'min_s': min(timings), 'median_s': statistics.median(timings),
+            'mean_s': statistics.mean(timings), 'timings_s': timings, '_result': result}
+
+
+def _concurrent_queries(query: Callable, threads: int, write: Callable, check: Callable) -> int:
+    # a fixed amount of queries is split over the threads while one writer keeps changing the warehouse, every
+    # result is checked for a consistent snapshot
+    stop = threading.Event()
+
+    def writer():
+        while not stop.is_set():
+            write()
+
+    writer_thread = threading.Thread(target=writer, daemon=True)
+    writer_thread.start()
+    try:
+        with ThreadPoolExecutor(threads) as executor:
+            results = list(executor.map(lambda _: query(), range(CONCURRENT_QUERIES)))
+    finally:
+        stop.set()
+        writer_thread.join()
+    for result in results:
+        check(result)
+    return sum(len(result) for result in results)
+
+
+def _snapshot_check(reference: List[pd.DataFrame], compare_frames: bool) -> Callable:
+    # the writer only reloads tables with their unchanged files and toggles an index, every query has to return
+    # the reference tables, torn reads show up as missing, duplicate or changed tables
+    reference_rows = [len(frame) for frame in reference]
+
+    def check(result: List[pd.DataFrame]):
+        if [len(frame) for frame in result] != reference_rows:
+            raise RuntimeError('Inconsistent concurrent read: {} tables with {} rows instead of {} with {}.'.format(
+                len(result), sum(len(frame) for frame in result), len(reference), sum(reference_rows)))
+        if compare_frames and not all(frame.equals(expected) for frame, expected in zip(result, reference)):
+            raise RuntimeError('Inconsistent concurrent read: a table differs from its file.')
+    return check
+
+
+async def _first_ingested_table(system: SystemManager, model_id: str, folders: List[str]) -> str:
+    table_ids = system.ingest_data(model_id, folders, synthetic_data.META_DATA_KEYS)
+    try:
+        return await table_ids.__anext__()
+    finally:
+        await table_ids.aclose()
+
+
+def run_scale(scale: str, parameters: Dict[str, int], work_dir: str, repeat: int, seed: int) -> Dict[str, Any]:
+    """
+    Generate the data of one scale below work_dir and run all benchmarks on it
+
+    :param scale:
+    :param parameters:
+    :param work_dir:
+    :param repeat:
+    :param seed:
+    :return:
+    """
+    data_root = os.path.join(work_dir, scale, 'data')
+    start = time.perf_counter()
+    folders = synthetic_data.generate_workbench_data(data_root, seed=seed, **parameters)
+    generation_time = time.perf_counter() - start
+    config_path = os.path.join(work_dir, scale, 'sys_manager_config.json')
+    with open(config_path, 'w') as outfile:
+        json.dump(SystemManager.default_config(), outfile)
+
+    def new_system():
+        system = SystemManager(scale, config_path)
+        model_id = system.create_new_model_data_instance(BENCHMARK_MODEL, {}, data_root)
+        return system, model_id
+
+    results = {}
+    results['load_data_folders'] = _timed(
+        lambda args: args[0].load_data(args[1], folders, synthetic_data.META_DATA_KEYS), repeat, new_system)
+    results['ingest_first_table'] = _timed(
+        lambda args: asyncio.run(_first_ingested_table(args[0], args[1], folders)), repeat, new_system)
+    system, model_id = new_system()
+    system.load_data(model_id, folders, synthetic_data.META_DATA_KEYS)
+    raw_filter = ({}, {'benchmark_preprocessed': None})
+
+    results['meta_query_include'] = _timed(
+        lambda: system.get_data(model_id, meta_filter=({'condition': 'fast', 'session': 2}, {})), repeat)
+    results['meta_query_exclude'] = _timed(
+        lambda: system.get_data(model_id, meta_filter=({}, {'condition': 'baseline'})), repeat)
+    range_filter = ({'trial': Range(10, 20)}, {})
+    results['meta_query_range_scan'] = _timed(lambda: system.get_data(model_id, meta_filter=range_filter), repeat)
+    system.create_meta_index(model_id, 'trial')
+    results['meta_query_range_indexed'] = _timed(lambda: system.get_data(model_id, meta_filter=range_filter), repeat)
+    results['get_data_columns'] = _timed(
+        lambda: system.get_data(model_id, meta_filter=raw_filter, columns=COLUMNS), repeat)
+    row_filter = [(synthetic_data.TIME, lambda column: column > 0.5), (' human_x', lambda column: column < 0.)]
+    results['get_data_row_filter'] = _timed(
+        lambda: system.get_data(model_id, meta_filter=raw_filter, columns=COLUMNS, row_filter=row_filter), repeat)
+    results['learn_data'] = _timed(
+        lambda: sum(1 for _ in system.learn_data(model_id, raw_filter, COLUMNS, None, 1, ('random', {'seed': 1}))),
+        repeat)
+    results['evaluate'] = _timed(
+        lambda: system.evaluate(model_id, raw_filter, {'mae': mean_absolute_error}, COLUMNS), repeat)
+    results['cross_validate_5fold'] = _timed(
+        lambda: system.cross_validate(model_id, BENCHMARK_MODEL, {}, 5, raw_filter, {'mae': mean_absolute_error},
+                                      group_key='trial', columns=COLUMNS), repeat)
+
+    warehouse = system.model_data_pairs[model_id][1]
+    table_ids = warehouse.get_table_ids_by_meta_data(raw_filter)
+    writes = iter(range(10 ** 9))
+
+    def write():
+        step = next(writes)
+        warehouse.reload_table(table_ids[step % len(table_ids)], synthetic_data.META_DATA_KEYS)
+        # the session filter of the query alternates between the index and a scan
+        if step % 16 == 8:
+            warehouse.drop_meta_index('session')
+        elif step % 16 == 0:
+            warehouse.create_meta_index('session')
+        time.sleep(0.001)
+
+    session_filter = ({'session': Range(0, None)}, {'benchmark_preprocessed': None})
+
+    def concurrent_query():
+        return system.get_data(model_id, meta_filter=session_filter, columns=COLUMNS, row_filter=row_filter)
+    reference = concurrent_query()
+    # one untimed run compares every returned frame, the timed runs check the tables and rows of every result
+    _concurrent_queries(concurrent_query, max(QUERY_THREADS), write, _snapshot_check(reference, True))
+    for threads in QUERY_THREADS:
+        results['concurrent_queries_{}t'.format(threads)] = _timed(
+            lambda: _concurrent_queries(concurrent_query, threads, write, _snapshot_check(reference, False)), repeat)
+
+    preprocessing_run = iter(range(2 * repeat))
+
+    def preprocess(batch_mode: bool):
+        mark_new = ('benchmark_preprocessed', next(preprocessing_run))
+        return system.preprocess(model_id, BENCHMARK_PREPROCESSOR, PREPROCESSING_COLUMNS, {'window': 5},
+                                 mark_new, None, batch_mode, meta_filter=raw_filter)
+    results['preprocessing_iterative'] = _timed(lambda: preprocess(False), repeat)
+    results['preprocessing_batch'] = _timed(lambda: preprocess(True), repeat)
+    results['fit_global_normalize'] = _timed(
+        lambda: system.fit_preprocessor(model_id, 'normalize', PREPROCESSING_COLUMNS, {'scope': 'global'}, raw_filter),
+        repeat)
+
+    save_file = os.path.join(work_dir, scale, 'system.pickle')
+    results['system_save'] = _timed(lambda: system.save(save_file), repeat)
+    results['system_load'] = _timed(lambda: SystemManager.load(save_file), repeat)
+    save_size = os.path.getsize(save_file)
+
+    amount_tables = parameters['folders'] * parameters['tables_per_folder']
+    for name, result in results.items():
+        result.pop('_result')
+        result['tables_per_s'] = amount_tables / result['median_s'] if result['median_s'] > 0 else None
+    return {'parameters': dict(parameters, seed=seed, tables=amount_tables),
+            'generation_s': generation_time,
+            'save_file_bytes': save_size,
+            'benchmarks': results}
+
+
+def environment() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ''
+    return {'python': platform.python_version(), 'platform': platform.platform(), 'processor': platform.processor(),
+            'cpu_count': os.cpu_count(), 'numpy': np.__version__, 'pandas': pd.__version__, 'commit': commit,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description='Run the mlpf pipeline benchmarks.')
+    parser.add_argument('--scales', nargs='+', default=['small'], choices=sorted(SCALES))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--work-dir', default=None, help='keep generated data here instead of a temporary folder')
+    parser.add_argument('--output', default='bench_output.json')
+    args = parser.parse_args(argv)
+
+    _register()
+    report = {'environment': environment(), 'scales': {}}
+    with tempfile.TemporaryDirectory() as temporary_dir:
+        work_dir = args.work_dir or temporary_dir
+        for scale in args.scales:
+            print('Running scale {} {}'.format(scale, SCALES[scale]))
+            report['scales'][scale] = run_scale(scale, SCALES[scale], work_dir, args.repeat, args.seed)
+            for name, result in report['scales'][scale]['benchmarks'].items():
+                print('  {:<26} median {:>10.4f} s'.format(name, result['median_s']))
+    with open(args.output, 'w') as outfile:
+        json.dump(report, outfile, indent=4, sort_keys=True)
+    print('Results written to {}'.format(args.output))
+
+
+if __name__ == '__main__':
+    main()
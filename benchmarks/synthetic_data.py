@@ -0,0 +1,72 @@
+"""
+Deterministic generator of synthetic workbench data.
+
+Every folder stands for one subject and holds trajectory csv files with the columns t, ' human_x', human_y and
+human_z, each next to a json file with its meta data (subject, trial, session, condition). The same arguments
+always produce byte identical files.
+"""
+from typing import List, Dict, Any
+
+import numpy as np
+import pandas as pd
+import json
+import os
+
+
+TIME = 't'
+TRAJECTORY_COLUMNS = [' human_x', 'human_y', 'human_z']
+META_DATA_KEYS = ['subject', 'trial', 'session', 'condition']
+CONDITIONS = ['baseline', 'slow', 'fast']
+
+
+def generate_workbench_data(data_root: str, folders: int = 4, tables_per_folder: int = 25, table_length: int = 500,
+                            seed: int = 0, length_jitter: float = 0.1, sample_rate: float = 100.) -> List[str]:
+    """
+    Write folders x tables_per_folder trajectory csv files below data_root.
+
+    :param data_root:
+    :param folders: amount of subject folders
+    :param tables_per_folder: amount of trajectory tables per folder
+    :param table_length: mean amount of rows of a table
+    :param seed:
+    :param length_jitter: relative random deviation of the table length, 0 for equal lengths
+    :param sample_rate: mean sample rate in Hz, the time stamps are slightly irregular
+    :return: names of the created folders, relative to data_root
+    """
+    rng = np.random.default_rng(seed)
+    folder_names = []
+    for subject in range(folders):
+        folder_name = 'subject_{:03d}'.format(subject)
+        os.makedirs(os.path.join(data_root, folder_name), exist_ok=True)
+        folder_names.append(folder_name)
+        for trial in range(tables_per_folder):
+            length = max(2, int(round(table_length * (1 + length_jitter * rng.uniform(-1, 1)))))
+            frame = trajectory_frame(rng, length, sample_rate)
+            meta_data = {'subject': subject, 'trial': trial, 'session': trial % 5,
+                         'condition': CONDITIONS[trial % len(CONDITIONS)]}
+            write_table(os.path.join(data_root, folder_name, 'trial_{:04d}'.format(trial)), frame, meta_data)
+    return folder_names
+
+
+def trajectory_frame(rng: np.random.Generator, length: int, sample_rate: float = 100.) -> pd.DataFrame:
+    """
+    Smooth random 3d walk with slightly irregular time stamps
+
+    :param rng:
+    :param length:
+    :param sample_rate:
+    :return:
+    """
+    dt = (1. / sample_rate) * (1 + 0.05 * rng.uniform(-1, 1, length))
+    time_stamps = np.cumsum(dt) - dt[0]
+    velocity = np.cumsum(rng.normal(0., 0.01, (length, 3)), axis=0)
+    position = np.cumsum(velocity * dt[:, None], axis=0) + rng.uniform(-1., 1., 3)
+    frame = pd.DataFrame(position, columns=TRAJECTORY_COLUMNS)
+    frame.insert(0, TIME, time_stamps)
+    return frame
+
+
+def write_table(path_without_extension: str, frame: pd.DataFrame, meta_data: Dict[str, Any]):
+    frame.to_csv(path_without_extension + '.csv', index=False, float_format='%.6f')
+    with open(path_without_extension + '.json', 'w') as outfile:
+        json.dump(meta_data, outfile, sort_keys=True)
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import List, Any
 
 import pandas as pd
 
@@ -18,3 +18,44 @@ class AbstractPreprocessor(ABC):
     @abstractmethod
     def update_settings(self, **settings):
         raise NotImplementedError()
+
+    # Optional partial fit protocol for preprocessors that need statistics over all tables, e.g. a global mean.
+    # The DataWarehouse calls partial_stats for every table, combines the results with merge and hands them to
+    # finalize, before any table is preprocessed. merge has to be associative, partial results may be combined in
+    # any grouping.
+
+    def needs_fit(self) -> bool:
+        """
+        True if the preprocessor has to be fitted with partial_stats, merge and finalize before preprocessing
+
+        :return:
+        """
+        return False
+
+    def partial_stats(self, data: pd.DataFrame) -> Any:
+        """
+        Statistics of one table
+
+        :param data:
+        :return:
+        """
+        raise NotImplementedError()
+
+    def merge(self, stats: Any, other_stats: Any) -> Any:
+        """
+        Combine the statistics of two disjoint sets of tables
+
+        :param stats:
+        :param other_stats:
+        :return:
+        """
+        raise NotImplementedError()
+
+    def finalize(self, stats: Any):
+        """
+        Fit the preprocessor with the merged statistics of all tables
+
+        :param stats:
+        :return:
+        """
+        raise NotImplementedError()
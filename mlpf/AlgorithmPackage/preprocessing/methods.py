@@ -0,0 +1,245 @@
+"""
+Built-in preprocessors for trajectory tables, e.g. with the columns t, ' human_x', human_y and human_z.
+
+All of them implement their work as one vectorized kernel over a RaggedBatch, i.e. the rows of all tables stacked
+into a single array. preprocess_batch_ordered runs the kernel once for all tables, preprocess runs it for a batch
+of one table, so both modes give the same results.
+"""
+from . import preprocessing_factory
+from .abstract_preprocessor import AbstractPreprocessor
+from .ragged_batch import RaggedBatch
+from typing import List, Tuple, Optional
+
+import numpy as np
+import pandas as pd
+
+# value columns, row count, column means and column sums of squared deviations
+NormalizationStats = Tuple[List[str], int, np.ndarray, np.ndarray]
+
+
+class TrajectoryPreprocessor(AbstractPreprocessor):
+
+    def __init__(self, time_column: str = 't'):
+        self.time_column: str = time_column
+
+    def preprocess(self, data: pd.DataFrame) -> pd.DataFrame:
+        return self.preprocess_batch_ordered([data])[0]
+
+    def preprocess_batch_ordered(self, data: List[pd.DataFrame]) -> List[pd.DataFrame]:
+        if not data:
+            return []
+        return self._process(RaggedBatch.from_frames(data))
+
+    def update_settings(self, **settings):
+        for name, value in settings.items():
+            if not hasattr(self, name) or name.startswith('_'):
+                raise ValueError('{} has no setting {}.'.format(type(self).__name__, name))
+            setattr(self, name, value)
+
+    def _process(self, batch: RaggedBatch) -> List[pd.DataFrame]:
+        raise NotImplementedError()
+
+    def _value_positions(self, batch: RaggedBatch) -> List[int]:
+        return [i for i, column in enumerate(batch.columns) if column != self.time_column]
+
+
+class UniformResampler(TrajectoryPreprocessor):
+    """
+    Linear interpolation of every column onto a uniform time grid with the given frequency, starting at the first
+    time stamp of each table. The time stamps have to be increasing within a table.
+    """
+
+    def __init__(self, frequency: float = 100., time_column: str = 't'):
+        super().__init__(time_column)
+        self.frequency: float = frequency
+
+    def _process(self, batch: RaggedBatch) -> List[pd.DataFrame]:
+        if self.frequency <= 0:
+            raise ValueError('The resampling frequency has to be positive.')
+        time_position = batch.column_position(self.time_column)
+        time = batch.values[:, time_position]
+        if not len(time):
+            return batch.to_frames()
+        non_empty = batch.lengths > 0
+        first = np.zeros(len(batch))
+        last = np.zeros(len(batch))
+        first[non_empty] = time[batch.starts[non_empty]]
+        last[non_empty] = time[batch.offsets[1:][non_empty] - 1]
+        span = last - first
+        new_lengths = np.where(non_empty, np.floor(span * self.frequency + 1e-9).astype(np.int64) + 1, 0)
+        new_offsets = np.zeros(len(batch) + 1, dtype=np.int64)
+        np.cumsum(new_lengths, out=new_offsets[1:])
+        new_table_of_row = np.repeat(np.arange(len(batch)), new_lengths)
+        new_time = first[new_table_of_row] + (np.arange(new_offsets[-1]) - new_offsets[:-1][new_table_of_row]) \
+            / self.frequency
+        # Shift every table onto its own disjoint time range, a single search then finds the bracketing rows of all
+        # new time stamps without ever pairing rows of two tables.
+        base = np.zeros(len(batch))
+        np.cumsum(span[:-1] + 1., out=base[1:])
+        shift = base - first
+        left = np.searchsorted(time + shift[batch.table_of_row], new_time + shift[new_table_of_row], side='right') - 1
+        # The shifted time stamps are rounded, so a new time stamp that lies on an original one may land next to it.
+        # The bracketing rows are corrected on the original time stamps of the table, and the interpolation weights
+        # only use those as well, so a table gets the same result in every batch.
+        table_first = batch.starts[new_table_of_row]
+        table_last = batch.offsets[1:][new_table_of_row] - 1
+        left = np.clip(left, table_first, table_last)
+        left -= (left > table_first) & (time[left] > new_time)
+        left += (left < table_last) & (time[np.minimum(left + 1, table_last)] <= new_time)
+        right = np.minimum(left + 1, table_last)
+        step = time[right] - time[left]
+        weight = np.divide(new_time - time[left], step, out=np.zeros(len(new_time)), where=right > left)
+        positions = self._value_positions(batch)
+        new_values = np.empty((new_offsets[-1], len(batch.columns)))
+        new_values[:, time_position] = new_time
+        left_values = batch.values[left][:, positions]
+        new_values[:, positions] = left_values + weight[:, None] * (batch.values[right][:, positions] - left_values)
+        return batch.to_frames(new_values, new_offsets)
+
+
+class MovingAverageFilter(TrajectoryPreprocessor):
+    """
+    Low-pass filter: centered moving average over window rows. The window shrinks at the table borders, the time
+    column is passed through.
+    """
+
+    def __init__(self, window: int = 5, time_column: str = 't'):
+        super().__init__(time_column)
+        self.window: int = window
+
+    def _process(self, batch: RaggedBatch) -> List[pd.DataFrame]:
+        if self.window < 1:
+            raise ValueError('The filter window has to be at least one row.')
+        positions = self._value_positions(batch)
+        table_of_row = batch.table_of_row
+        rows = np.arange(len(batch.values))
+        half = self.window // 2
+        start = np.maximum(rows - half, batch.starts[table_of_row])
+        end = np.minimum(rows - half + self.window, batch.offsets[1:][table_of_row])
+        # The prefix sums restart at every table, behind a zero row of their own, so the rounding errors of one table
+        # never reach the next one and a table gets the same result in every batch. Table i has its prefix sums at
+        # the rows offsets[i] + i to offsets[i + 1] + i.
+        values = batch.values[:, positions]
+        cumulative = np.zeros((len(batch.values) + len(batch), len(positions)))
+        for i, (first, last) in enumerate(zip(batch.starts, batch.offsets[1:])):
+            np.cumsum(values[first:last], axis=0, out=cumulative[first + i + 1:last + i + 1])
+        new_values = batch.values.copy()
+        new_values[:, positions] = (cumulative[end + table_of_row] - cumulative[start + table_of_row]) \
+            / (end - start)[:, None]
+        return batch.to_frames(new_values)
+
+
+class Normalizer(TrajectoryPreprocessor):
+    """
+    Z-score normalization of every column except time. With scope 'table' every table is normalized with its own
+    mean and standard deviation. With scope 'global' all tables are normalized with the mean and standard deviation
+    of all rows of the tables the normalizer was fitted on, see AbstractPreprocessor.partial_stats. Values fitted
+    with DataWarehouse.fit_preprocessor are kept until the settings change, so they can be applied to other tables
+    later, e.g. validation data.
+    Constant columns are only centered.
+    """
+
+    SCOPES = ('table', 'global')
+
+    def __init__(self, scope: str = 'table', time_column: str = 't'):
+        super().__init__(time_column)
+        self.scope: str = scope
+        self._columns: Optional[List[str]] = None
+        self._mean: Optional[np.ndarray] = None
+        self._std: Optional[np.ndarray] = None
+
+    def update_settings(self, **settings):
+        super().update_settings(**settings)
+        self._columns, self._mean, self._std = None, None, None
+
+    def needs_fit(self) -> bool:
+        return self.scope == 'global' and self._mean is None
+
+    def partial_stats(self, data: pd.DataFrame) -> NormalizationStats:
+        # merged with the pairwise algorithm of Chan et al., which stays accurate for large row counts
+        columns = [column for column in data.columns if column != self.time_column]
+        values = data[columns].to_numpy(dtype=np.float64)
+        if not len(values):
+            return columns, 0, np.zeros(len(columns)), np.zeros(len(columns))
+        mean = values.mean(axis=0)
+        return columns, len(values), mean, ((values - mean) ** 2).sum(axis=0)
+
+    def merge(self, stats: NormalizationStats, other_stats: NormalizationStats) -> NormalizationStats:
+        columns, count, mean, squares = stats
+        other_columns, other_count, other_mean, other_squares = other_stats
+        if columns != other_columns:
+            raise ValueError('Tables with the columns {} and {} can not be normalized together.'.format(
+                columns, other_columns))
+        total = count + other_count
+        if not total:
+            return stats
+        delta = other_mean - mean
+        return (columns, total, mean + delta * other_count / total,
+                squares + other_squares + delta ** 2 * count * other_count / total)
+
+    def finalize(self, stats: NormalizationStats):
+        columns, count, mean, squares = stats
+        std = np.sqrt(squares / max(count, 1))
+        std[std == 0] = 1.
+        self._columns, self._mean, self._std = columns, mean, std
+
+    def _process(self, batch: RaggedBatch) -> List[pd.DataFrame]:
+        if self.scope not in self.SCOPES:
+            raise ValueError('Unknown normalization scope {}, use one of {}.'.format(self.scope, self.SCOPES))
+        positions = self._value_positions(batch)
+        values = batch.values[:, positions]
+        if self.scope == 'global':
+            if self._mean is None:
+                raise ValueError('The global normalization has to be fitted first, e.g. by preprocessing the tables '
+                                 'in a DataWarehouse.')
+            if [batch.columns[position] for position in positions] != self._columns:
+                raise ValueError('The normalization was fitted on the columns {}.'.format(self._columns))
+            new_values = batch.values.copy()
+            new_values[:, positions] = (values - self._mean) / self._std
+            return batch.to_frames(new_values)
+        lengths = np.maximum(batch.lengths, 1)[:, None]
+        mean = batch.per_table_sum(values) / lengths
+        centered = values - mean[batch.table_of_row]
+        std = np.sqrt(batch.per_table_sum(centered ** 2) / lengths)
+        std[std == 0] = 1.
+        new_values = batch.values.copy()
+        new_values[:, positions] = centered / std[batch.table_of_row]
+        return batch.to_frames(new_values)
+
+
+class VelocityDeriver(TrajectoryPreprocessor):
+    """
+    Derivative of every column with respect to time: central differences inside a table and one sided differences
+    at its borders. The velocities replace the positions unless a suffix for new columns is given.
+    """
+
+    def __init__(self, suffix: str = '', time_column: str = 't'):
+        super().__init__(time_column)
+        self.suffix: str = suffix
+
+    def _process(self, batch: RaggedBatch) -> List[pd.DataFrame]:
+        time_position = batch.column_position(self.time_column)
+        positions = self._value_positions(batch)
+        table_of_row = batch.table_of_row
+        rows = np.arange(len(batch.values))
+        previous_row = np.maximum(rows - 1, batch.starts[table_of_row])
+        next_row = np.minimum(rows + 1, batch.offsets[1:][table_of_row] - 1)
+        time = batch.values[:, time_position]
+        dt = time[next_row] - time[previous_row]
+        values = batch.values[:, positions]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            velocity = (values[next_row] - values[previous_row]) / dt[:, None]
+        velocity[dt == 0] = 0.
+        if self.suffix:
+            new_values = np.concatenate([batch.values, velocity], axis=1)
+            columns = batch.columns + [batch.columns[position] + self.suffix for position in positions]
+            return batch.to_frames(new_values, columns=columns)
+        new_values = batch.values.copy()
+        new_values[:, positions] = velocity
+        return batch.to_frames(new_values)
+
+
+preprocessing_factory.register('resample', UniformResampler)
+preprocessing_factory.register('low_pass', MovingAverageFilter)
+preprocessing_factory.register('normalize', Normalizer)
+preprocessing_factory.register('velocity', VelocityDeriver)
@@ -0,0 +1,86 @@
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+class RaggedBatch:
+    """
+    All rows of a list of equally structured frames stacked into one float array. Table k occupies the rows
+    offsets[k]:offsets[k + 1], so vectorized kernels can process every table in one pass.
+    """
+
+    def __init__(self, values: np.ndarray, offsets: np.ndarray, columns: List[str],
+                 indexes: Optional[List[pd.Index]] = None):
+        self.values: np.ndarray = values
+        self.offsets: np.ndarray = offsets
+        self.columns: List[str] = list(columns)
+        self.indexes: Optional[List[pd.Index]] = indexes
+
+    @classmethod
+    def from_frames(cls, frames: List[pd.DataFrame]):
+        if not frames:
+            return cls(np.empty((0, 0)), np.zeros(1, dtype=np.int64), [])
+        columns = list(frames[0].columns)
+        for frame in frames:
+            if list(frame.columns) != columns:
+                raise ValueError('All frames of a batch need the same columns, got {} and {}.'.format(
+                    columns, list(frame.columns)))
+        lengths = np.fromiter((len(frame) for frame in frames), dtype=np.int64, count=len(frames))
+        offsets = np.zeros(len(frames) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        values = np.concatenate([frame.to_numpy(dtype=float) for frame in frames]) if offsets[-1] \
+            else np.empty((0, len(columns)))
+        return cls(values, offsets, columns, [frame.index for frame in frames])
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def lengths(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    @property
+    def starts(self) -> np.ndarray:
+        return self.offsets[:-1]
+
+    @property
+    def table_of_row(self) -> np.ndarray:
+        return np.repeat(np.arange(len(self)), self.lengths)
+
+    def column_position(self, column: str) -> int:
+        try:
+            return self.columns.index(column)
+        except ValueError:
+            raise ValueError('Column {} is not part of the batch {}.'.format(column, self.columns))
+
+    def per_table_sum(self, values: np.ndarray) -> np.ndarray:
+        """
+        Sum of the rows of every table, zero for empty tables
+
+        :param values: array with one row per batch row
+        :return: array with one row per table
+        """
+        sums = np.zeros((len(self),) + values.shape[1:], dtype=values.dtype)
+        non_empty = self.lengths > 0
+        if non_empty.any():
+            sums[non_empty] = np.add.reduceat(values, self.starts[non_empty], axis=0)
+        return sums
+
+    def to_frames(self, values: Optional[np.ndarray] = None, offsets: Optional[np.ndarray] = None,
+                  columns: Optional[List[str]] = None) -> List[pd.DataFrame]:
+        """
+        Split a stacked array back into frames. The original row index is kept if the table lengths are unchanged.
+
+        :param values: defaults to the values of the batch
+        :param offsets: defaults to the offsets of the batch
+        :param columns: defaults to the columns of the batch
+        :return:
+        """
+        values = self.values if values is None else values
+        offsets = self.offsets if offsets is None else offsets
+        columns = self.columns if columns is None else columns
+        keep_index = self.indexes is not None and np.array_equal(offsets, self.offsets)
+        return [pd.DataFrame(values[offsets[k]:offsets[k + 1]], columns=columns,
+                             index=self.indexes[k] if keep_index else None)
+                for k in range(len(offsets) - 1)]
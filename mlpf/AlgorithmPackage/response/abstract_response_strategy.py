@@ -1,7 +1,9 @@
 from abc import ABC, abstractmethod
 from ...ModelPackage.abstract_model import AbstractModel
 
-from typing import Dict, Any
+from typing import Dict, Any, List, Union
+
+import numpy as np
 
 
 class AbstractResponseStrategy(ABC):
@@ -9,3 +11,9 @@ class AbstractResponseStrategy(ABC):
     @abstractmethod
     def fit(self, model: AbstractModel, signal: Dict[str, Any], **kwargs):
         raise NotImplementedError()
+
+    def predict_batch(self, model: AbstractModel, signals: Union[List[Dict[str, Any]], Dict[str, np.ndarray]],
+                      **kwargs) -> List[Any]:
+        # Override with a vectorized kernel if the strategy can answer many signals at once.
+        # This method has to conserve order from input to output!
+        return [model.predict(signal, **kwargs) for signal in model.unpack_signal_batch(signals)]
@@ -1,5 +1,7 @@
 from .system_manager import SystemManager
-from typing import List, Dict, Any, Tuple
+from .lib.result_table import ResultTableWriter, read_result_table
+from typing import List, Dict, Any, Tuple, Optional, AsyncIterator, Callable
+from concurrent.futures import Executor
 from abc import ABC, abstractmethod
 
 import pandas as pd
@@ -7,6 +9,7 @@ import logging
 import json
 import os
 import shutil
+import time
 import tkinter
 
 from tkinter import messagebox
@@ -129,21 +132,43 @@ class AbstractBackend(ABC):
             self.active_model = model_id
         return model_id
 
-    def sync_data(self):
+    def sync_data(self, overlay: Optional[bool] = None):
         """
-        Sync all models to share the same data warehouse instance of the currently active model
+        Sync all models to share the data of the currently active model. With overlays every model keeps its own
+        preprocessed data, otherwise all models share the same data warehouse instance.
 
+        :param overlay: see SystemManager.sync_data_warehouse
         :return:
         """
-        self.system.sync_data_warehouse(self.active_model)
+        self.system.sync_data_warehouse(self.active_model, overlay)
 
     def load_data(self):
         """
-        Load the data of the currently active system
+        Load the data of the currently active system. Calling it again only loads new and changed files and drops
+        the tables of deleted files.
 
         :return:
         """
-        self.system.load_data(self.active_model, self.config['subjects'], self.config['meta_data'])
+        self.system.refresh_data(self.active_model, self.config['subjects'], self.config['meta_data'])
+
+    def ingest_data(self, executor: Optional[Executor] = None) -> AsyncIterator[str]:
+        """
+        Load the new files of the currently active system in the background
+
+        :param executor: executor to parse the files in, the default executor of the event loop if None
+        :return: async iterator of the ids of the new tables, as soon as they are added
+        """
+        return self.system.ingest_data(self.active_model, self.config['subjects'], self.config['meta_data'], executor)
+
+    def watch_data(self, interval: float = 5.):
+        """
+        Keep the data of the currently active system up to date with the data root in the background
+
+        :param interval: seconds between two scans
+        :return: the running watcher, stop it with its stop method
+        """
+        return self.system.watch_data(self.active_model, self.config['subjects'], self.config['meta_data'],
+                                      interval)
 
     def set_active_model(self, model_id: str):
         """
@@ -155,23 +180,70 @@ class AbstractBackend(ABC):
         self.active_model = model_id
 
     def learn_online_data(self, meta_filter: Tuple[Dict[str, Any], Dict[str, Any]],
-                          learning_plan: Tuple[str, Any] = ('', {})):
+                          learning_plan: Tuple[str, Any] = ('', {}), result_table: Optional[str] = None):
         """
         Perform online learning with the currently active system
 
         :param meta_filter:
         :param learning_plan:
-        :return:
+        :param result_table: stream the statistics into this result table of the ResultTables folder instead of
+        gathering them in memory, an existing table is appended to
+        :return: the gathered statistics, or the path of the result table if result_table is set
         """
         columns = [self.HUMAN_TRAJECTORY_X, self.HUMAN_TRAJECTORY_Y, self.HUMAN_TRAJECTORY_Z]
         row_filter = None
         granularity = 1
+        if result_table is not None:
+            file_path = self._result_table_path(result_table)
+            with ResultTableWriter(file_path) as result_sink:
+                for _ in self.system.learn_data(self.active_model, meta_filter, columns, row_filter, granularity,
+                                                learning_plan, result_sink=result_sink):
+                    pass
+            return file_path
         statistics_gathered = []
         for statistics in self.system.learn_data(self.active_model, meta_filter, columns,
                                                  row_filter, granularity, learning_plan):
             statistics_gathered.append(statistics)
         return statistics_gathered
 
+    def read_result_table(self, result_table: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Read a result table of the ResultTables folder, e.g. to plot or compare runs
+
+        :param result_table:
+        :param columns: columns to read, all if None
+        :return:
+        """
+        return read_result_table(self._result_table_path(result_table), columns)
+
+    async def learn_ingested_data(self, executor: Optional[Executor] = None, result_table: Optional[str] = None):
+        """
+        Load the new files of the currently active system and perform online learning on them while they are loaded.
+        Learning starts as soon as the first file is parsed.
+
+            statistics = asyncio.run(backend.learn_ingested_data())
+
+        :param executor: executor to parse the files in, the default executor of the event loop if None
+        :param result_table: stream the statistics into this result table of the ResultTables folder instead of
+        gathering them in memory, an existing table is appended to
+        :return: the gathered statistics, or the path of the result table if result_table is set
+        """
+        columns = [self.HUMAN_TRAJECTORY_X, self.HUMAN_TRAJECTORY_Y, self.HUMAN_TRAJECTORY_Z]
+        row_filter = None
+        granularity = 1
+        if result_table is not None:
+            file_path = self._result_table_path(result_table)
+            with ResultTableWriter(file_path) as result_sink:
+                async for _ in self.system.learn_data_async(self.active_model, self.ingest_data(executor), columns,
+                                                            row_filter, granularity, result_sink=result_sink):
+                    pass
+            return file_path
+        statistics_gathered = []
+        async for statistics in self.system.learn_data_async(self.active_model, self.ingest_data(executor), columns,
+                                                             row_filter, granularity):
+            statistics_gathered.append(statistics)
+        return statistics_gathered
+
     def learn_online_data_step(self, meta_filter: Tuple[Dict[str, Any], Dict[str, Any]],
                                learning_plan: Tuple[str, Any] = ('', {})):
         """
@@ -191,6 +263,39 @@ class AbstractBackend(ABC):
                                                  row_filter, granularity, learning_plan):
             yield statistics
 
+    def predict_data(self, meta_filter: Tuple[Dict[str, Any], Dict[str, Any]]) -> List[Any]:
+        """
+        Predict the human trajectories that match the filter with the currently active model in one batch
+
+        :param meta_filter:
+        :return:
+        """
+        columns = [self.HUMAN_TRAJECTORY_X, self.HUMAN_TRAJECTORY_Y, self.HUMAN_TRAJECTORY_Z]
+        return self.system.predict_data(self.active_model, meta_filter, columns)
+
+    def evaluate(self, meta_filter: Tuple[Dict[str, Any], Dict[str, Any]],
+                 metrics: Dict[str, Callable[[Any, Dict[str, Any]], Any]], result_table: Optional[str] = None,
+                 workers: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Evaluate the currently active model on the human trajectories that match the filter in parallel
+
+        :param meta_filter:
+        :param metrics: name and function(prediction, signal) of every metric, see SystemManager.evaluate
+        :param result_table: write the metrics of every table into this result table of the ResultTables folder
+        and append the aggregated metrics to the result table with the suffix _summary
+        :param workers: amount of worker processes, one per cpu if None
+        :return: the aggregated metrics
+        """
+        columns = [self.HUMAN_TRAJECTORY_X, self.HUMAN_TRAJECTORY_Y, self.HUMAN_TRAJECTORY_Z]
+        if result_table is None:
+            return self.system.evaluate(self.active_model, meta_filter, metrics, columns, workers=workers)
+        with ResultTableWriter(self._result_table_path(result_table)) as result_sink:
+            summary = self.system.evaluate(self.active_model, meta_filter, metrics, columns, workers=workers,
+                                           result_sink=result_sink)
+        with ResultTableWriter(self._result_table_path(result_table + '_summary')) as summary_sink:
+            summary_sink.append(dict(summary, model_id=self.active_model))
+        return summary
+
     def amount_data_points(self, meta_filter: Tuple[Dict[str, Any], Dict[str, Any]]):
         """
         Get the amount of data points that match the specified filter
@@ -198,7 +303,33 @@ class AbstractBackend(ABC):
         :param meta_filter:
         :return:
         """
-        return len(self.system.get_data(self.active_model, meta_filter=meta_filter))
+        return self.system.get_statistics(self.active_model, meta_filter)['tables']
+
+    def amount_rows(self, meta_filter: Tuple[Dict[str, Any], Dict[str, Any]]) -> int:
+        """
+        Get the total amount of rows of the data that matches the specified filter
+
+        :param meta_filter:
+        :return:
+        """
+        return self.system.get_statistics(self.active_model, meta_filter)['rows']
+
+    def export_stats(self) -> str:
+        """
+        Export the pipeline statistics of the active system into the ResultTables folder of the workbench
+
+        :return: path of the written file
+        """
+        file_name = 'stage_statistics_{}.json'.format(time.strftime('%Y%m%d_%H%M%S'))
+        file_path = self._result_tables_file(file_name)
+        self.system.export_stats(file_path)
+        return file_path
+
+    def _result_table_path(self, result_table: str) -> str:
+        return self._result_tables_file('{}.mlpfrt'.format(result_table))
+
+    def _result_tables_file(self, file_name: str) -> str:
+        return os.path.join(self.workbench_path, self.system.sys_name, 'ResultTables', file_name)
 
     def _create_workbench_folder_system(self, system_name: str) -> str:
         new_system_path = os.path.join(self.workbench_path, system_name)
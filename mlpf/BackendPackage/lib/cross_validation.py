@@ -0,0 +1,173 @@
+"""
+Index based k-fold cross-validation.
+
+Folds are lists of table ids of one data warehouse, building them only splits the ids. Every fold trains a fresh
+model on the tables of the other folds and evaluates it on its own tables. The folds run in parallel in worker
+processes. The system and the settings of the run, which hold a snapshot of the filtered tables of all folds, are
+pickled once into a temporary file that the workers load when they start, only the table ids and the fresh model of a
+fold are sent with its task. Every worker process therefore holds a full copy of the tables, while with threads all
+folds share the frames of the caller.
+
+The workers are started with forkserver, or spawn where it is not available, and never forked from the calling
+process: a fork copies locks that other threads, e.g. a folder watcher or an ingestion, hold at that moment and the
+worker could wait for them forever. Scripts starting a cross-validation therefore need the usual
+`if __name__ == '__main__':` guard.
+
+    folds = build_folds(table_ids, 5, warehouse.get_meta_data_by_id, group_key='person')
+"""
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Any, List, Callable, Iterator, Tuple, Optional
+
+import logging
+import math
+import multiprocessing
+import numbers
+import os
+import pickle
+import random
+import tempfile
+
+FOLD = 'fold'
+
+_worker_system: Any = None
+_worker_settings: Optional[Dict[str, Any]] = None
+
+
+def build_folds(table_ids: List[str], k: int, meta_data: Optional[Callable[[str], Dict[str, Any]]] = None,
+                group_key: Optional[str] = None, stratify_key: Optional[str] = None, seed: int = 1) -> List[List[str]]:
+    """
+    Split table ids into k disjoint folds.
+
+    Without a key the shuffled ids are dealt to the folds in turn. With a group_key all tables with the same value of
+    that meta data key end up in the same fold, the largest groups are placed first, each into the fold with the fewest
+    tables. With a stratify_key every value of that key is spread over the folds as evenly as possible. Tables without
+    the key form a group or stratum of their own.
+
+    :param table_ids:
+    :param k: amount of folds, at least 2
+    :param meta_data: meta data of a table id, needed for group_key and stratify_key
+    :param group_key: meta data key whose tables must not be split over folds
+    :param stratify_key: meta data key whose values are spread evenly over the folds
+    :param seed: seed of the shuffling
+    :return: k lists of table ids
+    """
+    if k < 2:
+        raise ValueError('k has to be at least 2')
+    if group_key is not None and stratify_key is not None:
+        raise ValueError('group_key and stratify_key can not be combined')
+    if (group_key is not None or stratify_key is not None) and meta_data is None:
+        raise ValueError('meta_data is needed to group or stratify the folds')
+    if len(table_ids) < k:
+        raise ValueError('{} tables can not be split into {} folds'.format(len(table_ids), k))
+    rand = random.Random(seed)
+    folds = [[] for _ in range(k)]
+    if group_key is not None:
+        groups = list(_partition(table_ids, meta_data, group_key).values())
+        if len(groups) < k:
+            raise ValueError('{} groups of {} can not be split into {} folds'.format(len(groups), group_key, k))
+        rand.shuffle(groups)
+        for group in sorted(groups, key=len, reverse=True):
+            min(folds, key=len).extend(group)
+        return folds
+    strata = _partition(table_ids, meta_data, stratify_key).values() if stratify_key is not None else [table_ids]
+    position = 0
+    for stratum in strata:
+        for table_id in rand.sample(stratum, len(stratum)):
+            folds[position % k].append(table_id)
+            position += 1
+    return folds
+
+
+def run_folds(system: Any, settings: Dict[str, Any], folds: List[Tuple[List[str], List[str], Any]],
+              workers: Optional[int] = None, processes: bool = True) -> Iterator[Dict[str, Any]]:
+    """
+    Run system._run_fold(training ids, validation ids, model, **settings) for every fold on a worker pool and yield
+    the results in the order of the folds.
+
+    :param system: SystemManager running the folds
+    :param settings: keyword arguments of _run_fold shared by all folds
+    :param folds: (training ids, validation ids, model) of every fold
+    :param workers: amount of workers, one per fold up to one per cpu if None
+    :param processes: use worker processes if the system and the settings can be pickled, threads otherwise
+    :return:
+    """
+    workers = workers or min(len(folds), os.cpu_count() or 1)
+    executor, task_system, state_path = _create_executor(system, settings, folds, max(1, workers), processes)
+    try:
+        with executor:
+            task_settings = None if task_system is None else settings
+            futures = [executor.submit(_run_worker_fold, index, fold, task_system, task_settings)
+                       for index, fold in enumerate(folds)]
+            for future in futures:
+                yield future.result()
+    finally:
+        if state_path is not None:
+            os.remove(state_path)
+
+
+def aggregate(fold_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Mean and standard deviation over the folds of every numeric value of the fold metric summaries, e.g.
+    {'folds': 5, 'mae_mean': {'mean': ..., 'std': ...}, ...}. NaN values are left out.
+
+    :param fold_results: results of run_folds
+    :return:
+    """
+    values = OrderedDict()
+    for result in fold_results:
+        for name, value in result.get('metrics', {}).items():
+            if isinstance(value, numbers.Real) and not isinstance(value, bool) and not math.isnan(value):
+                values.setdefault(name, []).append(value)
+    summary = {'folds': len(fold_results)}
+    for name, fold_values in values.items():
+        mean = sum(fold_values) / len(fold_values)
+        variance = sum((value - mean) ** 2 for value in fold_values) / (len(fold_values) - 1) \
+            if len(fold_values) > 1 else 0.
+        summary[name] = {'mean': mean, 'std': math.sqrt(variance)}
+    return summary
+
+
+def _partition(table_ids: List[str], meta_data: Callable[[str], Dict[str, Any]], key: str) -> Dict[Any, List[str]]:
+    partitions = OrderedDict()
+    for table_id in table_ids:
+        partitions.setdefault(meta_data(table_id).get(key), []).append(table_id)
+    return partitions
+
+
+def _create_executor(system: Any, settings: Dict[str, Any], folds: List[Tuple[List[str], List[str], Any]],
+                     workers: int, processes: bool) -> Tuple[Executor, Optional[Any], Optional[str]]:
+    # process pool with the system and settings loaded once per worker from a temporary file, which the caller
+    # removes after the run, or a thread pool sharing them with the tasks
+    if processes:
+        state_file = tempfile.NamedTemporaryFile('wb', suffix='.pkl', delete=False)
+        try:
+            with state_file:
+                pickle.dumps(folds, pickle.HIGHEST_PROTOCOL)
+                pickle.dump((system, settings), state_file, pickle.HIGHEST_PROTOCOL)
+        except BaseException as error:
+            os.remove(state_file.name)
+            if not isinstance(error, (pickle.PicklingError, AttributeError, TypeError)):
+                raise
+            logging.warning('The system, the settings or the models can not be pickled, running the folds on threads '
+                            'instead of processes.')
+        else:
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            return ProcessPoolExecutor(workers, multiprocessing.get_context(method), _set_worker_system,
+                                       (state_file.name,)), None, state_file.name
+    return ThreadPoolExecutor(workers), system, None
+
+
+def _set_worker_system(state_path: str):
+    global _worker_system, _worker_settings
+    with open(state_path, 'rb') as state_file:
+        _worker_system, _worker_settings = pickle.load(state_file)
+
+
+def _run_worker_fold(index: int, fold: Tuple[List[str], List[str], Any], system: Any = None,
+                     settings: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    system = system if system is not None else _worker_system
+    settings = settings if settings is not None else _worker_settings
+    result = system._run_fold(*fold, **settings)
+    result[FOLD] = index
+    return result
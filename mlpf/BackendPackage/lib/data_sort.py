@@ -7,6 +7,9 @@ def random_order(data_frames: List[Tuple[pd.DataFrame, Dict[str, Any]]]) -> List
     return random.sample(data_frames, len(data_frames))
 
 
-def sort(data_frames: List[Tuple[pd.DataFrame, Dict[str, Any]]], order_keys: List[str]) \
+def sort(data_frames: List[Tuple[pd.DataFrame, Dict[str, Any]]], order_keys: List[str], descending: bool = False) \
         -> List[Tuple[pd.DataFrame, Dict[str, Any]]]:
-    return sorted(data_frames, key=lambda x: [x[1][order_key] for order_key in order_keys])
+    # Sort positions by the extracted meta data keys only, the (frame, meta) tuples are never compared or copied
+    sort_keys = [tuple(meta_data[order_key] for order_key in order_keys) for _, meta_data in data_frames]
+    order = sorted(range(len(data_frames)), key=sort_keys.__getitem__, reverse=descending)
+    return [data_frames[i] for i in order]
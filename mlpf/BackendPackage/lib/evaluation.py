@@ -0,0 +1,147 @@
+"""
+Parallel evaluation of a model over many data tables.
+
+The tables are predicted in chunks on a pool of workers. With processes every worker process unpickles the model
+once when it starts, only the signals of the chunks are sent to it. Metrics are functions of the prediction and the
+signal of a table and are evaluated in the workers as well:
+
+    def mean_absolute_error(prediction, signal):
+        return float(np.abs(signal['data_signal'].to_numpy() - prediction).mean())
+
+Models or metrics that can not be pickled, e.g. lambdas, are evaluated on a thread pool with the one model instead,
+which then has to allow concurrent predictions. The worker processes are started with forkserver, or spawn where it is
+not available, never forked from the calling process: a fork copies locks that other threads, e.g. a folder watcher
+or an ingestion, hold at that moment. Scripts evaluating on processes therefore need the usual
+`if __name__ == '__main__':` guard.
+"""
+from ...ModelPackage.abstract_model import AbstractModel
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Any, List, Callable, Iterable, Iterator, Tuple, Optional
+
+import logging
+import math
+import multiprocessing
+import numbers
+import os
+import pickle
+
+TABLE_ID = 'table_id'
+ROWS = 'rows'
+
+_worker_model: Optional[AbstractModel] = None
+
+
+def evaluate(model: AbstractModel, signals: Iterable[Tuple[str, Dict[str, Any]]],
+             metrics: Dict[str, Callable[[Any, Dict[str, Any]], Any]], workers: Optional[int] = None,
+             chunk_size: int = 8, processes: bool = True) -> Iterator[Dict[str, Any]]:
+    """
+    Predict the signals on a worker pool and yield the metrics of every table in the order of the signals. At most
+    two chunks per worker are in flight, so the signals may be produced lazily.
+
+    :param model:
+    :param signals: (table id, signal) pairs, the signals are built like the training signals of learn_data
+    :param metrics: name and function of every metric
+    :param workers: amount of workers, one per cpu if None
+    :param chunk_size: amount of tables predicted with one predict_batch call
+    :param processes: use worker processes if the model and the metrics can be pickled, threads otherwise
+    :return: one row per table with the table id, its amount of rows and the value of every metric
+    """
+    if chunk_size < 1:
+        raise ValueError('chunk_size has to be at least 1')
+    workers = workers or os.cpu_count() or 1
+    executor, task_model = _create_executor(model, metrics, workers, processes)
+    with executor:
+        pending = deque()
+        chunk = []
+        for table_id, signal in signals:
+            chunk.append((table_id, signal))
+            if len(chunk) < chunk_size:
+                continue
+            pending.append(executor.submit(_evaluate_chunk, chunk, metrics, task_model))
+            chunk = []
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        if chunk:
+            pending.append(executor.submit(_evaluate_chunk, chunk, metrics, task_model))
+        while pending:
+            yield from pending.popleft().result()
+
+
+class MetricSummary:
+    """
+    Streaming aggregation of per table metric rows: amount of tables and rows and, for every numeric metric, the
+    mean over the tables, the mean weighted by the rows of the tables, the minimum and the maximum. NaN values are
+    left out.
+    """
+
+    def __init__(self):
+        self.tables: int = 0
+        self.rows: int = 0
+        self._metrics: Dict[str, Dict[str, float]] = {}
+
+    def add(self, row: Dict[str, Any]):
+        self.tables += 1
+        self.rows += row.get(ROWS, 0)
+        for name, value in row.items():
+            if name in (TABLE_ID, ROWS) or not isinstance(value, numbers.Real) or math.isnan(value):
+                continue
+            metric = self._metrics.setdefault(name, {'count': 0, 'sum': 0., 'rows': 0, 'weighted_sum': 0.,
+                                                     'min': math.inf, 'max': -math.inf})
+            metric['count'] += 1
+            metric['sum'] += value
+            metric['rows'] += row.get(ROWS, 0)
+            metric['weighted_sum'] += value * row.get(ROWS, 0)
+            metric['min'] = min(metric['min'], value)
+            metric['max'] = max(metric['max'], value)
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Flat dict of the aggregated metrics, e.g. {'tables': 10, 'rows': 5000, 'mae_mean': ..., 'mae_weighted': ...}
+
+        :return:
+        """
+        summary = {'tables': self.tables, 'rows': self.rows}
+        for name, metric in self._metrics.items():
+            summary[name + '_mean'] = metric['sum'] / metric['count']
+            summary[name + '_weighted'] = metric['weighted_sum'] / metric['rows'] if metric['rows'] else math.nan
+            summary[name + '_min'] = metric['min']
+            summary[name + '_max'] = metric['max']
+        return summary
+
+
+def _create_executor(model: AbstractModel, metrics: Dict[str, Callable], workers: int,
+                     processes: bool) -> Tuple[Executor, Optional[AbstractModel]]:
+    # process pool with the model loaded once per worker, or a thread pool sharing the model with the tasks
+    if processes:
+        try:
+            pickle.dumps(metrics)
+            model_bytes = pickle.dumps(model, pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, AttributeError, TypeError):
+            logging.warning('The model or the metrics can not be pickled, evaluating on threads instead of processes.')
+        else:
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            return ProcessPoolExecutor(workers, multiprocessing.get_context(method), _load_worker_model,
+                                       (model_bytes,)), None
+    return ThreadPoolExecutor(workers), model
+
+
+def _load_worker_model(model_bytes: bytes):
+    global _worker_model
+    _worker_model = pickle.loads(model_bytes)
+
+
+def _evaluate_chunk(chunk: List[Tuple[str, Dict[str, Any]]], metrics: Dict[str, Callable],
+                    model: Optional[AbstractModel] = None) -> List[Dict[str, Any]]:
+    model = model if model is not None else _worker_model
+    predictions = model.predict_batch([signal for _, signal in chunk])
+    if len(predictions) != len(chunk):
+        raise ValueError('predict_batch returned {} predictions for {} tables'.format(len(predictions), len(chunk)))
+    rows = []
+    for (table_id, signal), prediction in zip(chunk, predictions):
+        data_signal = signal['data_signal']
+        row = {TABLE_ID: table_id, ROWS: len(data_signal) if hasattr(data_signal, '__len__') else 1}
+        for name, metric in metrics.items():
+            row[name] = metric(prediction, signal)
+        rows.append(row)
+    return rows
@@ -13,7 +13,12 @@ def plan_random(data_frames: List[Tuple[pd.DataFrame, Dict[str, Any]]], seed=1)
     return tmp
 
 
-dispatcher = defaultdict(lambda: plan_random, {'random': plan_random})
+def plan_sorted(data_frames: List[Tuple[pd.DataFrame, Dict[str, Any]]], order_keys: List[str],
+                descending: bool = False) -> List[Tuple[pd.DataFrame, Dict[str, Any]]]:
+    return data_sort.sort(data_frames, order_keys, descending)
+
+
+dispatcher = defaultdict(lambda: plan_random, {'random': plan_random, 'sorted': plan_sorted})
 
 
 def get_data_plan(learning_plan: str) -> Callable:
@@ -0,0 +1,211 @@
+"""
+Append only columnar result tables, e.g. for the statistics returned by model.learn.
+
+A result table file starts with a magic number followed by batches. Every batch is a little endian uint32 header
+length, a json header with the amount of rows and the name, dtype and byte size of every column, and the raw bytes
+of the columns. Batches are only appended, so a crash loses at most the rows that were still buffered. A batch that
+was cut off while writing is ignored when reading.
+
+    with ResultTableWriter(path) as writer:
+        for statistics in system.learn_data(...):
+            writer.append(statistics)
+    frame = read_result_table(path, columns=['step', 'loss'])
+"""
+from typing import Dict, Any, List, Iterator, Tuple, Optional
+
+import numpy as np
+import pandas as pd
+import json
+import numbers
+import os
+import struct
+
+MAGIC = b'MLPFRT01'
+STEP = 'step'
+VALUE = 'statistics'
+# column of a step value that the row itself carries, the step column is the row count of the file
+ROW_STEP = 'statistics_step'
+_HEADER_LENGTH = struct.Struct('<I')
+
+
+class ResultTableWriter:
+    """
+    Buffers result rows column wise and appends them to a result table file in batches of flush_rows rows, so the
+    memory of a long run stays bounded. Every row gets a step column counting the rows of the file, appending to an
+    existing file continues its steps. A step value of the row itself is kept in the statistics_step column.
+
+    Rows are dicts of scalar values, other values are stored in a single statistics column. Missing values are NaN
+    in numeric columns and empty strings in text columns. Values that are neither numbers nor booleans are stored as
+    text. Integers beyond int64 turn their column of the batch into floats, or into text beyond the float range.
+    """
+
+    def __init__(self, path: str, flush_rows: int = 1024, fsync: bool = False):
+        """
+        :param path: file of the result table, created if it does not exist
+        :param flush_rows: amount of buffered rows that triggers writing a batch
+        :param fsync: force every batch to disk before continuing
+        """
+        if flush_rows < 1:
+            raise ValueError('flush_rows has to be at least 1')
+        self.path: str = path
+        self.flush_rows: int = flush_rows
+        self.fsync: bool = fsync
+        self._buffer: Dict[str, List[Any]] = {}
+        self._buffered_rows: int = 0
+        self._file = None
+        self.rows: int = 0
+        if os.path.exists(path) and os.path.getsize(path):
+            self.rows = sum(rows for rows, _, _ in _batch_headers(path))
+            self._file = _open_for_append(path)
+        else:
+            self._file = open(path, 'wb')
+            self._file.write(MAGIC)
+            self._file.flush()
+
+    def append(self, row: Any):
+        """
+        Buffer one row and write the buffer if it is full
+
+        :param row: dict of column name to value, anything else is stored in the statistics column
+        :return:
+        """
+        if self._file is None:
+            raise ValueError('The result table {} is closed.'.format(self.path))
+        row = dict(row) if isinstance(row, dict) else {VALUE: row}
+        if STEP in row:
+            row[ROW_STEP] = row.pop(STEP)
+        row[STEP] = self.rows
+        for column, value in row.items():
+            values = self._buffer.get(column)
+            if values is None:
+                values = self._buffer[column] = [None] * self._buffered_rows
+            values.append(value)
+        self._buffered_rows += 1
+        self.rows += 1
+        for values in self._buffer.values():
+            if len(values) < self._buffered_rows:
+                values.append(None)
+        if self._buffered_rows >= self.flush_rows:
+            self.flush()
+
+    def extend(self, rows: List[Any]):
+        for row in rows:
+            self.append(row)
+
+    def flush(self):
+        """
+        Append the buffered rows as one batch to the file
+
+        :return:
+        """
+        if not self._buffered_rows:
+            return
+        arrays = [(column, _column_array(values)) for column, values in self._buffer.items()]
+        header = json.dumps({'rows': self._buffered_rows,
+                             'columns': [[column, array.dtype.str, array.nbytes] for column, array in arrays]})
+        header = header.encode('utf-8')
+        self._file.write(_HEADER_LENGTH.pack(len(header)) + header)
+        for _, array in arrays:
+            self._file.write(array.tobytes())
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._buffer = {}
+        self._buffered_rows = 0
+
+    def close(self):
+        if self._file is None:
+            return
+        self.flush()
+        self._file.close()
+        self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def read_result_table(path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Read a result table. Only the requested columns are read from the file, the others are skipped.
+
+    :param path:
+    :param columns: columns to read, all if None
+    :return: one row per appended row, columns missing in some batches are filled with NaN
+    """
+    frames = []
+    with open(path, 'rb') as in_file:
+        for rows, header_columns, offset in _batch_headers(path):
+            in_file.seek(offset)
+            data = {}
+            for column, dtype, nbytes in header_columns:
+                if columns is not None and column not in columns:
+                    in_file.seek(nbytes, os.SEEK_CUR)
+                    continue
+                data[column] = np.frombuffer(in_file.read(nbytes), dtype=np.dtype(dtype))
+            frames.append(pd.DataFrame(data, index=pd.RangeIndex(rows)))
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    frame = pd.concat(frames, ignore_index=True)
+    if columns is not None:
+        frame = frame.reindex(columns=[column for column in columns if column in frame.columns])
+    return frame
+
+
+def _batch_headers(path: str) -> Iterator[Tuple[int, List[Tuple[str, str, int]], int]]:
+    # yields the rows, columns and data offset of every complete batch
+    size = os.path.getsize(path)
+    with open(path, 'rb') as in_file:
+        if in_file.read(len(MAGIC)) != MAGIC:
+            raise ValueError('{} is not a result table.'.format(path))
+        position = len(MAGIC)
+        while position + _HEADER_LENGTH.size <= size:
+            in_file.seek(position)
+            header_length, = _HEADER_LENGTH.unpack(in_file.read(_HEADER_LENGTH.size))
+            header = in_file.read(header_length)
+            if len(header) < header_length:
+                return
+            header = json.loads(header.decode('utf-8'))
+            offset = position + _HEADER_LENGTH.size + header_length
+            end = offset + sum(nbytes for _, _, nbytes in header['columns'])
+            if end > size:
+                return
+            yield header['rows'], [tuple(column) for column in header['columns']], offset
+            position = end
+
+
+def _complete_size(path: str) -> int:
+    end = len(MAGIC)
+    for _, columns, offset in _batch_headers(path):
+        end = offset + sum(nbytes for _, _, nbytes in columns)
+    return end
+
+
+def _open_for_append(path: str):
+    # a batch cut off by a crash is dropped, new batches continue behind the last complete one
+    out_file = open(path, 'r+b')
+    out_file.truncate(_complete_size(path))
+    out_file.seek(0, os.SEEK_END)
+    return out_file
+
+
+def _column_array(values: List[Any]) -> np.ndarray:
+    present = [value for value in values if value is not None]
+    if all(isinstance(value, (bool, np.bool_)) for value in present) and len(present) == len(values):
+        return np.array(values, dtype=bool)
+    if all(isinstance(value, numbers.Integral) and not isinstance(value, (bool, np.bool_)) for value in present) \
+            and len(present) == len(values):
+        try:
+            return np.array(values, dtype='<i8')
+        except OverflowError:
+            # integers beyond int64 are stored as floats, or as text if they exceed those as well
+            pass
+    if all(isinstance(value, numbers.Real) for value in present):
+        try:
+            return np.array([np.nan if value is None else value for value in values], dtype='<f8')
+        except OverflowError:
+            pass
+    text = ['' if value is None else str(value) for value in values]
+    return np.array(text, dtype='<U{}'.format(max(1, max(len(value) for value in text))))
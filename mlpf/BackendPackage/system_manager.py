@@ -1,26 +1,48 @@
 from ..DataWarehousePackage.data_warehouse import DataWarehouse
+from ..DataWarehousePackage.sharded_data_warehouse import ShardedDataWarehouse
+from ..DataWarehousePackage.warehouse_overlay import WarehouseOverlay
+from ..DataWarehousePackage.lib.folder_watcher import FolderWatcher
+from ..DataWarehousePackage.lib.window_dataset import WindowDataset
 from ..ModelPackage.abstract_model import AbstractModel
 from ..ModelPackage import model_factory
-from ..BackendPackage.lib import learning_plans
+from ..BackendPackage.lib import cross_validation, evaluation, learning_plans
+from ..BackendPackage.lib.result_table import ResultTableWriter
+from ..lib import instrumentation
 
 from itertools import zip_longest
-from typing import Dict, List, Tuple, Union, Callable, Any, Optional
+from concurrent.futures import Executor
+from functools import partial
+from typing import Dict, List, Tuple, Union, Callable, Any, Optional, Iterator, AsyncIterator, AsyncIterable
 
+import asyncio
+
+import copy
 import pickle
 import pandas as pd
+import threading
 import uuid
 import json
 import logging
+import weakref
 
 
 class SystemManager:
+    """
+    Manages the model data pairs of a system.
+
+    The data warehouses can be used from several threads, e.g. to query while new files are ingested, see
+    DataWarehouse. Adding, replacing and syncing pairs is synchronized as well. Models are not: learning a model
+    while it predicts in another thread has to be coordinated by the caller.
+    """
 
     def __init__(self, sys_name, config_path):
         with open(config_path) as json_file:
             self.config = json.load(json_file)
+        self._apply_instrumentation()
         self.model_data_pairs: Dict[str, List[Union[AbstractModel, None], DataWarehouse]] = {}
         self.config_path = config_path
         self.sys_name = sys_name
+        self._pairs_lock: threading.RLock = threading.RLock()
 
     @staticmethod
     def load(filename: str):
@@ -35,6 +57,7 @@ class SystemManager:
             system = pickle.load(in_file)
             with open(system.config_path) as json_file:
                 system.config = json.load(json_file)
+            system._apply_instrumentation()
             return system
 
     def save(self, filename: str):
@@ -47,7 +70,7 @@ class SystemManager:
         with open(filename, 'wb') as output:
             pickle.dump(self, output, pickle.HIGHEST_PROTOCOL)
 
-    def create_new_model_data_instance(self, model_name, model_config, data_root: str) -> str:
+    def create_new_model_data_instance(self, model_name, model_config, data_root: str, shards: int = 0) -> str:
         """
         Create a model and data instance if they are provided and add them as new model data pair to the system.
         Return the corresponding model data ID.
@@ -55,15 +78,17 @@ class SystemManager:
         :param model_name:
         :param model_config:
         :param data_root:
+        :param shards: if > 0 the data is partitioned over that many worker processes
         :return:
         """
         if model_name:
             new_model = model_factory.create_model(model_name, settings=model_config)
         else:
             new_model = None
-        new_warehouse = DataWarehouse(data_root)
+        new_warehouse = self._create_warehouse(data_root, shards)
         new_id = str(uuid.uuid4())
-        self.model_data_pairs[new_id] = [new_model, new_warehouse]
+        with self._pairs_lock:
+            self.model_data_pairs[new_id] = [new_model, new_warehouse]
         return new_id
 
     def load_data(self, model_id: str, folders: List[str], meta_data_keys: Union[List[str], None]) -> List[str]:
@@ -78,9 +103,60 @@ class SystemManager:
         _, warehouse = self.model_data_pairs[model_id]
         return warehouse.load_data_folders(folders, meta_data_keys)
 
-    def learn_data(self, model_id: str, meta_filter: Tuple[Dict[str, Any], Dict[str, Any]],
+    def refresh_data(self, model_id: str, folders: List[str], meta_data_keys: Union[List[str], None],
+                     deleted_mark: Union[Tuple[str, Any], None] = None) -> Tuple[List[str], List[str], List[str]]:
+        """
+        Incrementally load the folders: only new and changed csv files are read, tables of deleted files are dropped
+        or marked.
+
+        :param model_id:
+        :param folders:
+        :param meta_data_keys:
+        :param deleted_mark: mark the tables of deleted files with this meta data instead of dropping them
+        :return: ids of the added, reloaded and deleted tables
+        """
+        _, warehouse = self.model_data_pairs[model_id]
+        return warehouse.refresh_data_folders(folders, meta_data_keys, deleted_mark)
+
+    def ingest_data(self, model_id: str, folders: List[str], meta_data_keys: Union[List[str], None],
+                    executor: Optional[Executor] = None) -> AsyncIterator[str]:
+        """
+        Load the csv files of the folders that are not loaded yet in the background and get an async iterator of
+        the ids of the new tables, which yields every table as soon as it is added. See learn_data_async.
+
+        :param model_id:
+        :param folders:
+        :param meta_data_keys:
+        :param executor: executor to parse the files in, the default executor of the event loop if None
+        :return:
+        """
+        _, warehouse = self.model_data_pairs[model_id]
+        return warehouse.ingest_data_folders(folders, meta_data_keys, executor)
+
+    def watch_data(self, model_id: str, folders: List[str], meta_data_keys: Union[List[str], None],
+                   interval: float = 5., deleted_mark: Union[Tuple[str, Any], None] = None,
+                   callback: Optional[Callable[[List[str], List[str], List[str]], None]] = None) -> FolderWatcher:
+        """
+        Start polling the folders in the background and refresh the data whenever files are added, changed or
+        deleted. The returned watcher has to be stopped by the caller.
+
+        :param model_id:
+        :param folders:
+        :param meta_data_keys:
+        :param interval: seconds between two scans
+        :param deleted_mark:
+        :param callback: called with the added, reloaded and deleted table ids after every scan that found changes
+        :return:
+        """
+        _, warehouse = self.model_data_pairs[model_id]
+        watcher = FolderWatcher(warehouse, folders, meta_data_keys, interval, deleted_mark, callback)
+        watcher.start()
+        return watcher
+
+    def learn_data(self, model_id: str, meta_filter: Optional[Tuple[Dict[str, Any], Dict[str, Any]]],
                    columns: Union[List[str], None] = None, row_filter: Union[List[Tuple[str, Callable]], None] = None,
-                   granularity: int = 1, learning_plan: Tuple[str, Optional[Dict]] = ('random', {'seed': 1}), **kwargs):
+                   granularity: int = 1, learning_plan: Tuple[str, Optional[Dict]] = ('random', {'seed': 1}),
+                   result_sink: Optional[ResultTableWriter] = None, table_ids: Optional[List[str]] = None, **kwargs):
         """
         Perform Learning using the filtered data on the model specified by the model data pair ID.
 
@@ -90,16 +166,243 @@ class SystemManager:
         :param row_filter:
         :param granularity:
         :param learning_plan:
+        :param result_sink: also append every statistics to this result table, closing it is up to the caller
+        :param table_ids: learn these tables instead of the tables matching the meta filter
         :param kwargs:
         :return:
         """
         logging.debug('Starting online learning')
         model, warehouse = self.model_data_pairs[model_id]
+        if table_ids is not None:
+            if meta_filter is not None:
+                logging.warning('Table ids and meta filter were given, the meta filter is ignored.')
+            data_frames = self._get_frames_by_ids(warehouse, table_ids, columns, row_filter)
+        else:
+            data_frames = warehouse.get_complete_data_by_meta_data(meta_filter, columns, row_filter)
+        yield from self._learn(model, data_frames, granularity, learning_plan, result_sink, **kwargs)
+
+    async def learn_data_async(self, model_id: str, table_ids: AsyncIterable[str],
+                               columns: Union[List[str], None] = None,
+                               row_filter: Union[List[Tuple[str, Callable]], None] = None, granularity: int = 1,
+                               result_sink: Optional[ResultTableWriter] = None, **kwargs) -> AsyncIterator[Any]:
+        """
+        Perform learning on the tables of a stream of table ids, e.g. of ingest_data, in the order they arrive.
+        Learning starts with the first tables while the stream still produces the next ones. The model learns in
+        the default executor of the event loop, so the event loop keeps ingesting meanwhile.
+
+            async for statistics in system.learn_data_async(model_id, system.ingest_data(model_id, folders, keys)):
+                ...
+
+        :param model_id:
+        :param table_ids:
+        :param columns:
+        :param row_filter:
+        :param granularity:
+        :param result_sink: also append every statistics to this result table, closing it is up to the caller
+        :param kwargs:
+        :return:
+        """
+        loop = asyncio.get_running_loop()
+        model, warehouse = self.model_data_pairs[model_id]
+        feed_frames = []
+        async for table_id in table_ids:
+            feed_frames.append((warehouse.get_data_by_id(table_id, columns, row_filter),
+                                warehouse.get_meta_data_by_id(table_id)))
+            if len(feed_frames) < granularity:
+                continue
+            statistics = await loop.run_in_executor(None, partial(self._learn_frames, model, feed_frames, **kwargs))
+            if result_sink is not None:
+                result_sink.append(statistics)
+            yield statistics
+            feed_frames = []
+        if feed_frames:
+            statistics = await loop.run_in_executor(None, partial(self._learn_frames, model, feed_frames, **kwargs))
+            if result_sink is not None:
+                result_sink.append(statistics)
+            yield statistics
+
+    def get_windows(self, model_id: str, meta_filter: Tuple[Dict[str, Any], Dict[str, Any]], window: int,
+                    stride: int = 1, horizon: int = 0, columns: Union[List[str], None] = None,
+                    row_filter: Union[List[Tuple[str, Callable]], None] = None) -> WindowDataset:
+        """
+        Retrieve all sliding windows over the filtered data as views, indexed by (table id, offset).
+
+        :param model_id:
+        :param meta_filter:
+        :param window: rows of the input part of a window
+        :param stride: rows between the starts of two consecutive windows of a table
+        :param horizon: rows of the target part directly after the input part
+        :param columns:
+        :param row_filter:
+        :return:
+        """
+        _, warehouse = self.model_data_pairs[model_id]
+        return warehouse.get_windows_by_meta_data(meta_filter, window, stride, horizon, columns, row_filter)
+
+    def learn_windows(self, model_id: str, meta_filter: Tuple[Dict[str, Any], Dict[str, Any]], window: int,
+                      stride: int = 1, horizon: int = 0, columns: Union[List[str], None] = None,
+                      row_filter: Union[List[Tuple[str, Callable]], None] = None, batch_size: int = 32,
+                      shuffle: bool = True, seed: Optional[int] = 1, result_sink: Optional[ResultTableWriter] = None,
+                      **kwargs):
+        """
+        Perform learning on batches of sliding windows over the filtered data. A training signal holds the inputs
+        of shape (batch, window, columns) as data_signal, the targets of shape (batch, horizon, columns) as
+        target_signal and the (table id, offset) of every window as window_index.
+
+        :param model_id:
+        :param meta_filter:
+        :param window:
+        :param stride:
+        :param horizon:
+        :param columns:
+        :param row_filter:
+        :param batch_size:
+        :param shuffle:
+        :param seed:
+        :param result_sink: also append every statistics to this result table, closing it is up to the caller
+        :param kwargs:
+        :return:
+        """
+        model, _ = self.model_data_pairs[model_id]
+        windows = self.get_windows(model_id, meta_filter, window, stride, horizon, columns, row_filter)
+        for inputs, targets, window_index in windows.batches(batch_size, shuffle, seed):
+            training_signal = {'data_signal': inputs, 'target_signal': targets, 'window_index': window_index}
+            with instrumentation.stage('learn') as recorder:
+                recorder.add(rows=inputs.shape[0] * inputs.shape[1], nbytes=inputs.nbytes)
+                statistics = model.learn(training_signal, **kwargs)
+            if result_sink is not None:
+                result_sink.append(statistics)
+            yield statistics
+
+    def predict_data(self, model_id: str, meta_filter: Tuple[Dict[str, Any], Dict[str, Any]],
+                     columns: Union[List[str], None] = None,
+                     row_filter: Union[List[Tuple[str, Callable]], None] = None, **kwargs) -> List[Any]:
+        """
+        Predict every data table that matches the filter in one batched call on the model specified by the model
+        data pair ID. The signals are built like the training signals of learn_data with a granularity of one.
+
+        :param model_id:
+        :param meta_filter:
+        :param columns:
+        :param row_filter:
+        :param kwargs:
+        :return: one prediction per matched data table
+        """
+        model, warehouse = self.model_data_pairs[model_id]
         data_frames = warehouse.get_complete_data_by_meta_data(meta_filter, columns, row_filter)
-        data_frames = learning_plans.get_data_plan(learning_plan[0])(data_frames, **learning_plan[1])
-        for feed_frames in zip_longest(fillvalue=None, *[iter(data_frames)] * granularity):
-            training_signal = self._build_training_signal(feed_frames)
-            yield model.learn(training_signal, **kwargs)
+        signals = [self._build_training_signal([data_frame]) for data_frame in data_frames]
+        return model.predict_batch(signals, **kwargs)
+
+    def evaluate_tables(self, model_id: str, meta_filter: Tuple[Dict[str, Any], Dict[str, Any]],
+                        metrics: Dict[str, Callable[[Any, Dict[str, Any]], Any]],
+                        columns: Union[List[str], None] = None,
+                        row_filter: Union[List[Tuple[str, Callable]], None] = None, workers: Optional[int] = None,
+                        chunk_size: int = 8, processes: bool = True) -> Iterator[Dict[str, Any]]:
+        """
+        Predict every data table that matches the filter on a worker pool and stream the metrics of the tables, see
+        evaluation.evaluate. The signals are built like the training signals of learn_data with a granularity of one
+        and are only read from the data warehouse shortly before they are predicted.
+
+        :param model_id:
+        :param meta_filter:
+        :param metrics: name and function(prediction, signal) of every metric
+        :param columns:
+        :param row_filter:
+        :param workers: amount of workers, one per cpu if None
+        :param chunk_size: amount of tables per predict_batch call
+        :param processes: evaluate in worker processes, which load the model once, instead of threads
+        :return: one row per table with the table id, its amount of rows and the value of every metric
+        """
+        model, warehouse = self.model_data_pairs[model_id]
+        signals = ((table_id, self._build_training_signal([(warehouse.get_data_by_id(table_id, columns, row_filter),
+                                                             warehouse.get_meta_data_by_id(table_id))]))
+                   for table_id in warehouse.get_table_ids_by_meta_data(meta_filter))
+        return evaluation.evaluate(model, signals, metrics, workers, chunk_size, processes)
+
+    def evaluate(self, model_id: str, meta_filter: Tuple[Dict[str, Any], Dict[str, Any]],
+                 metrics: Dict[str, Callable[[Any, Dict[str, Any]], Any]], columns: Union[List[str], None] = None,
+                 row_filter: Union[List[Tuple[str, Callable]], None] = None, workers: Optional[int] = None,
+                 chunk_size: int = 8, processes: bool = True,
+                 result_sink: Optional[ResultTableWriter] = None) -> Dict[str, Any]:
+        """
+        Evaluate the model on every data table that matches the filter, see evaluate_tables, and aggregate the
+        metrics over the tables.
+
+        :param model_id:
+        :param meta_filter:
+        :param metrics: name and function(prediction, signal) of every metric
+        :param columns:
+        :param row_filter:
+        :param workers: amount of workers, one per cpu if None
+        :param chunk_size: amount of tables per predict_batch call
+        :param processes: evaluate in worker processes, which load the model once, instead of threads
+        :param result_sink: also append the metrics of every table to this result table
+        :return: amount of tables and rows and the mean, row weighted mean, min and max of every metric
+        """
+        summary = evaluation.MetricSummary()
+        for row in self.evaluate_tables(model_id, meta_filter, metrics, columns, row_filter, workers, chunk_size,
+                                        processes):
+            summary.add(row)
+            if result_sink is not None:
+                result_sink.append(row)
+        return summary.summary()
+
+    def cross_validate(self, model_id: str, model_name: str, model_config: Dict, k: int,
+                       meta_filter: Tuple[Dict[str, Any], Dict[str, Any]] = ({}, {}),
+                       metrics: Optional[Dict[str, Callable[[Any, Dict[str, Any]], Any]]] = None,
+                       group_key: Optional[str] = None, stratify_key: Optional[str] = None, seed: int = 1,
+                       columns: Union[List[str], None] = None,
+                       row_filter: Union[List[Tuple[str, Callable]], None] = None, granularity: int = 1,
+                       learning_plan: Tuple[str, Optional[Dict]] = ('random', {'seed': 1}),
+                       workers: Optional[int] = None, processes: bool = True, keep_models: bool = False,
+                       **kwargs) -> Dict[str, Any]:
+        """
+        K-fold cross-validation on the data tables of a model data pair that match the filter, see
+        cross_validation.build_folds. The folds are sets of table ids of the one data warehouse, no pair is created.
+        Every fold learns a fresh model of model_factory like learn_data on the tables of the other folds and evaluates
+        it on its own tables. The filtered frames of all folds are taken once before the folds start, the folds only
+        see this snapshot and not the data warehouse, so it can be changed meanwhile. The folds run in parallel in
+        worker processes, or in threads if the models, the metrics or the kwargs can not be pickled. Every worker
+        process loads its own copy of the snapshot, so processes need about workers times the memory of the filtered
+        tables on top of the data warehouse. Threads share the frames of the snapshot, which mostly are views of the
+        stored tables, use processes=False for selections that do not fit workers times into memory.
+
+        :param model_id: model data pair of the data, its model is not changed
+        :param model_name: model_factory name of the fold models
+        :param model_config:
+        :param k: amount of folds
+        :param meta_filter:
+        :param metrics: name and function(prediction, signal) of every validation metric, see evaluate
+        :param group_key: meta data key whose tables are kept in one fold
+        :param stratify_key: meta data key whose values are spread evenly over the folds
+        :param seed: seed of the fold assignment
+        :param columns:
+        :param row_filter:
+        :param granularity:
+        :param learning_plan:
+        :param workers: amount of folds run at the same time, one per fold up to one per cpu if None
+        :param processes: run the folds in worker processes instead of threads, each holding a copy of the tables
+        :param keep_models: also return the learned model of every fold
+        :param kwargs: passed to model.learn
+        :return: {'folds': [...], 'summary': {...}}, per fold its index, amount of training and validation tables,
+            the learn statistics and the metric summary of the validation tables; the summary holds the mean and
+            standard deviation over the folds of every metric summary value
+        """
+        warehouse = self.model_data_pairs[model_id][1]
+        table_ids = warehouse.get_table_ids_by_meta_data(meta_filter)
+        folds = cross_validation.build_folds(table_ids, k, warehouse.get_meta_data_by_id, group_key, stratify_key,
+                                             seed)
+        # the fold models are created here, models registered at runtime are unknown to spawned workers
+        fold_tasks = [([table_id for other in folds if other is not fold for table_id in other], fold,
+                       model_factory.create_model(model_name, model_config)) for fold in folds]
+        tables = dict(zip(table_ids, self._get_frames_by_ids(warehouse, table_ids, columns, row_filter)))
+        settings = {'tables': tables, 'metrics': metrics or {}, 'granularity': granularity,
+                    'learning_plan': learning_plan, 'keep_models': keep_models, 'learn_kwargs': kwargs}
+        # the workers get a system without the model data pairs, they need nothing but the snapshot of the tables
+        fold_system = copy.copy(self)
+        fold_system.model_data_pairs = {}
+        fold_results = list(cross_validation.run_folds(fold_system, settings, fold_tasks, workers, processes))
+        return {'folds': fold_results, 'summary': cross_validation.aggregate(fold_results)}
 
     def add_model_to_data_source(self, model_id, model_config, model_type):
         """
@@ -110,21 +413,24 @@ class SystemManager:
         :param model_type:
         :return:
         """
-        self.model_data_pairs[model_id] = [model_factory.create_model(model_type, model_config),
-                                           self.model_data_pairs[model_id][1]]
+        new_model = model_factory.create_model(model_type, model_config)
+        with self._pairs_lock:
+            self.model_data_pairs[model_id] = [new_model, self.model_data_pairs[model_id][1]]
 
-    def add_data_source(self, model_id, data_root, override=True):
+    def add_data_source(self, model_id, data_root, override=True, shards: int = 0):
         """
         Add a new Data warehouse instance to the data model pair.
 
         :param model_id:
         :param data_root:
         :param override:
+        :param shards: if > 0 the data is partitioned over that many worker processes
         :return:
         """
-        new_warehouse = DataWarehouse(data_root)
         if override:
-            self.model_data_pairs[model_id] = [self.model_data_pairs[model_id][0], new_warehouse]
+            new_warehouse = self._create_warehouse(data_root, shards)
+            with self._pairs_lock:
+                self.model_data_pairs[model_id] = [self.model_data_pairs[model_id][0], new_warehouse]
 
     def get_model(self, model_id: str) -> AbstractModel:
         """
@@ -164,6 +470,25 @@ class SystemManager:
             return warehouse.preprocessing_by_args(meta_filter, method_name, column_names,
                                                    settings, mark_new, mark_old, batch_mode)
 
+    def fit_preprocessor(self, model_id: str, method_name: str, column_names: List[str], settings: Dict,
+                         meta_filter: Tuple[Dict[str, Any], Dict[str, Any]], workers: Optional[int] = None):
+        """
+        Fit a preprocessor that needs statistics over all tables, e.g. normalize with scope global, on the filtered
+        data. Later preprocessing with the method applies the fitted state, e.g. to validation data, until the
+        preprocessor is reset or its settings change.
+
+        :param model_id:
+        :param method_name:
+        :param column_names:
+        :param settings:
+        :param meta_filter:
+        :param workers: amount of threads computing the statistics of the tables
+        :return:
+        """
+        _, warehouse = self.model_data_pairs[model_id]
+        table_ids = warehouse.get_table_ids_by_meta_data(meta_filter)
+        warehouse.fit_preprocessor(table_ids, method_name, column_names, settings, workers)
+
     def get_data(self, model_id: str, table_id: Optional[str] = None,
                  meta_filter: Optional[Tuple[Dict[str, Any], Dict[str, Any]]] = None,
                  columns: Optional[List[str]] = None,
@@ -187,15 +512,185 @@ class SystemManager:
         return df_list
 
     def get_complete_data(self, model_id: str, meta_filter: Optional[Tuple[Dict[str, Any], Dict[str, Any]]] = None,
-                          columns: Optional[List[str]] = None, row_filter: Optional[List[Tuple[str, Callable]]] = None)\
+                          columns: Optional[List[str]] = None, row_filter: Optional[List[Tuple[str, Callable]]] = None,
+                          order_by: Optional[str] = None, descending: bool = False)\
             -> List[Tuple[pd.DataFrame, Dict[str, Any]]]:
         _, warehouse = self.model_data_pairs[model_id]
-        return warehouse.get_complete_data_by_meta_data(meta_filter, columns, row_filter)
+        return warehouse.get_complete_data_by_meta_data(meta_filter, columns, row_filter, order_by, descending)
 
-    def sync_data_warehouse(self, model_id):
-        warehouse = self.model_data_pairs[model_id][1]
-        for model_data_pair in self.model_data_pairs.values():
-            model_data_pair[1] = warehouse
+    def get_statistics(self, model_id: str, meta_filter: Tuple[Dict[str, Any], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Amount of tables, total rows and per column min, max and null count of the data that matches the filter.
+        The answer comes from the statistics catalog of the data warehouse, no data is loaded.
+
+        :param model_id:
+        :param meta_filter:
+        :return:
+        """
+        _, warehouse = self.model_data_pairs[model_id]
+        return warehouse.get_statistics_by_meta_data(meta_filter)
+
+    def create_meta_index(self, model_id: str, key: str):
+        """
+        Create a sorted index on a meta data key of the data warehouse of the model data pair. Range, in and top-k
+        filters (see DataWarehousePackage.lib.meta_query) and ordered retrieval on the key use the index.
+
+        :param model_id:
+        :param key:
+        :return:
+        """
+        _, warehouse = self.model_data_pairs[model_id]
+        warehouse.create_meta_index(key)
+
+    def memory_report(self, model_id: str) -> Dict[str, int]:
+        """
+        Memory of the tables in the data warehouse of the model data pair. With the 'deduplicate_tables' config
+        flag, tables with identical data are stored once and saved_bytes shows the savings.
+
+        :param model_id:
+        :return:
+        """
+        _, warehouse = self.model_data_pairs[model_id]
+        return warehouse.memory_report()
+
+    @staticmethod
+    def stats() -> Dict[str, Any]:
+        """
+        Get the per stage timings and counters recorded by the instrumentation. The instrumentation is global to the
+        process, the statistics therefore include the stages of all system managers of the process. It is enabled
+        while a system manager whose config has the 'instrumentation' flag exists, or by lib.instrumentation.enable().
+
+        :return:
+        """
+        return instrumentation.stats()
+
+    @staticmethod
+    def export_stats(filename: str):
+        """
+        Write the per stage timings and counters, including captured profiles, to a json file.
+
+        :param filename:
+        :return:
+        """
+        instrumentation.export_json(filename)
+
+    def sync_data_warehouse(self, model_id, overlay: Optional[bool] = None):
+        """
+        Let all model data pairs use the data of the specified pair. By default the data warehouse becomes the
+        shared read only base of a copy on write overlay per pair, so preprocessing of one model does not affect
+        the others. If the pair already uses an overlay, its base is shared instead, and pairs that already have an
+        overlay of that base keep it. Without overlays all pairs share the same warehouse object.
+
+        Sharded data warehouses can not be overlaid, by default they are shared like without overlays.
+
+        :param model_id:
+        :param overlay: True to use overlays, False to share the warehouse, None to use overlays where possible
+        :return:
+        """
+        with self._pairs_lock:
+            warehouse = self.model_data_pairs[model_id][1]
+            if isinstance(warehouse, ShardedDataWarehouse):
+                if overlay:
+                    raise ValueError('A sharded data warehouse can not be overlaid, sync it with overlay=False.')
+                overlay = False
+            elif overlay is None:
+                overlay = True
+            base = warehouse.base if isinstance(warehouse, WarehouseOverlay) else warehouse
+            for model_data_pair in self.model_data_pairs.values():
+                if not overlay:
+                    model_data_pair[1] = warehouse
+                elif not (isinstance(model_data_pair[1], WarehouseOverlay) and model_data_pair[1].base is base):
+                    model_data_pair[1] = self._create_overlay(base)
+
+    def create_overlay_instance(self, base_model_id: str, model_name, model_config) -> str:
+        """
+        Create a model data pair whose data is a copy on write overlay of the data warehouse of another pair.
+        The overlay shares the raw data but keeps its own preprocessed tables and meta data changes. Sharded data
+        warehouses can not be overlaid.
+
+        :param base_model_id:
+        :param model_name:
+        :param model_config:
+        :return:
+        """
+        warehouse = self.model_data_pairs[base_model_id][1]
+        if isinstance(warehouse, ShardedDataWarehouse):
+            raise ValueError('A sharded data warehouse can not be overlaid.')
+        new_model = model_factory.create_model(model_name, settings=model_config) if model_name else None
+        new_id = str(uuid.uuid4())
+        with self._pairs_lock:
+            self.model_data_pairs[new_id] = [new_model, self._create_overlay(warehouse)]
+        return new_id
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_pairs_lock', None)
+        state.pop('_instrumentation_release', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._pairs_lock = threading.RLock()
+
+    def _apply_instrumentation(self):
+        # the process wide instrumentation stays enabled while a system with the config flag exists, it is released
+        # when the system is garbage collected instead of staying enabled for the rest of the process
+        release = self.__dict__.pop('_instrumentation_release', None)
+        if release is not None:
+            release()
+        if self.config.get('instrumentation', False):
+            instrumentation.acquire()
+            self._instrumentation_release = weakref.finalize(self, instrumentation.release)
+
+    def _create_overlay(self, warehouse: DataWarehouse) -> WarehouseOverlay:
+        return WarehouseOverlay(warehouse, self.config.get('deduplicate_tables', False))
+
+    def _create_warehouse(self, data_root: str, shards: int) -> Union[DataWarehouse, ShardedDataWarehouse]:
+        deduplicate = self.config.get('deduplicate_tables', False)
+        if shards > 0:
+            return ShardedDataWarehouse(data_root, shards, deduplicate=deduplicate)
+        return DataWarehouse(data_root, deduplicate)
+
+    def _run_fold(self, training_ids: List[str], validation_ids: List[str], model: AbstractModel,
+                  tables: Dict[str, Tuple[pd.DataFrame, Dict[str, Any]]], metrics: Dict[str, Callable],
+                  granularity: int, learning_plan: Tuple[str, Optional[Dict]], keep_models: bool,
+                  learn_kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        # one fold of cross_validate with a fresh model on the snapshot of the filtered tables, runs in a worker
+        statistics = list(self._learn(model, [tables[table_id] for table_id in training_ids], granularity,
+                                      learning_plan, None, **learn_kwargs))
+        summary = evaluation.MetricSummary()
+        if metrics:
+            signals = ((table_id, self._build_training_signal([tables[table_id]])) for table_id in validation_ids)
+            for row in evaluation.evaluate(model, signals, metrics, workers=1, processes=False):
+                summary.add(row)
+        result = {'training_tables': len(training_ids), 'validation_tables': len(validation_ids),
+                  'statistics': statistics, 'metrics': summary.summary()}
+        if keep_models:
+            result['model'] = model
+        return result
+
+    def _learn(self, model: AbstractModel, data_frames: List[Tuple[pd.DataFrame, Dict[str, Any]]], granularity: int,
+               learning_plan: Tuple[str, Optional[Dict]], result_sink: Optional[ResultTableWriter],
+               **kwargs) -> Iterator[Any]:
+        data_frames = learning_plans.get_data_plan(learning_plan[0])(data_frames, **learning_plan[1])
+        for feed_frames in zip_longest(fillvalue=None, *[iter(data_frames)] * granularity):
+            statistics = self._learn_frames(model, feed_frames, **kwargs)
+            if result_sink is not None:
+                result_sink.append(statistics)
+            yield statistics
+
+    def _learn_frames(self, model: AbstractModel, feed_frames, **kwargs) -> Any:
+        training_signal = self._build_training_signal(feed_frames)
+        with instrumentation.stage('learn') as recorder:
+            recorder.add_frames([feed_frame[0] for feed_frame in feed_frames if feed_frame is not None])
+            return model.learn(training_signal, **kwargs)
+
+    @staticmethod
+    def _get_frames_by_ids(warehouse: DataWarehouse, table_ids: List[str], columns: Union[List[str], None],
+                           row_filter: Union[List[Tuple[str, Callable]], None]) \
+            -> List[Tuple[pd.DataFrame, Dict[str, Any]]]:
+        return [(warehouse.get_data_by_id(table_id, columns, row_filter), warehouse.get_meta_data_by_id(table_id))
+                for table_id in table_ids]
 
     @staticmethod
     def _build_training_signal(data_frames: List[Tuple[pd.DataFrame, Dict[str, Any]]]) -> Dict[str, Any]:
@@ -208,4 +703,4 @@ class SystemManager:
 
     @staticmethod
     def default_config():
-        return {}
+        return {'instrumentation': False, 'deduplicate_tables': False}
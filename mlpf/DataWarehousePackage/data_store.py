@@ -1,13 +1,35 @@
-from .lib.data_table import AbstractDataTable
+from .lib.data_table import AbstractDataTable, DataTable
+from .lib.meta_index import SortedMetaIndex
+from .lib.meta_query import MetaOperator, Range, In, TopK
+from .lib.table_statistics import TableStatistics
+from ..lib import instrumentation
+from ..lib.content_hash import content_hash
 import logging
-from typing import Dict, List, Any, Union, Tuple
+import pandas as pd
+from typing import Dict, List, Any, Union, Tuple, Optional
 
 
 class DataStore:
+    """
+    In memory store of the data tables with their sources, meta data indexes and statistics. The data store itself
+    is not synchronized, DataWarehouse guards it with its read write lock.
+    """
 
-    def __init__(self):
+    def __init__(self, deduplicate: bool = False):
+        """
+        :param deduplicate: store frames with identical content only once. The tables keep their own ids and meta
+        data and reference the shared frame, which therefore must not be modified in place.
+        """
         self._tables: Dict[str, AbstractDataTable] = {}
         self._sources: Dict[str, str] = {}
+        self._positions: Dict[str, int] = {}
+        self._indexes: Dict[str, SortedMetaIndex] = {}
+        self._next_position: int = 0
+        self._deduplicate: bool = deduplicate
+        self._frames: Dict[bytes, pd.DataFrame] = {}
+        self._frame_references: Dict[bytes, int] = {}
+        self._fingerprints: Dict[str, bytes] = {}
+        self._statistics: Dict[str, TableStatistics] = {}
 
     def add_source(self, table_id: str, data_source: str, meta_data_keys: Union[List[str], None]):
         """
@@ -20,8 +42,54 @@ class DataStore:
         """
         if not self._check_table_id(table_id, data_source):
             return
-        self._tables[table_id] = AbstractDataTable.from_source(data_source, meta_data_keys)
+        self._tables[table_id] = DataTable.from_source(data_source, meta_data_keys)
         self._sources[table_id] = data_source
+        self._share_frame(table_id)
+        self._register_table(table_id)
+
+    def reload_source(self, table_id: str, meta_data_keys: Union[List[str], None]):
+        """
+        Load the data source of a table again. The table keeps its id and position.
+
+        :param table_id:
+        :param meta_data_keys:
+        :return:
+        """
+        self.replace_table(table_id, DataTable.from_source(self._sources[table_id], meta_data_keys))
+
+    def replace_table(self, table_id: str, data_table: AbstractDataTable):
+        """
+        Exchange the data table of an id, e.g. after its source changed. The id keeps its position.
+
+        :param table_id:
+        :param data_table:
+        :return:
+        """
+        for index in self._indexes.values():
+            index.remove(table_id)
+        self._release_frame(table_id)
+        self._tables[table_id] = data_table
+        self._share_frame(table_id)
+        self._statistics[table_id] = TableStatistics.from_frame(data_table.frame)
+        self.refresh_indexes([table_id])
+
+    def source(self, table_id: str) -> str:
+        return self._sources[table_id]
+
+    def remove_table(self, table_id: str):
+        """
+        Remove a table and its index entries from the data store
+
+        :param table_id:
+        :return:
+        """
+        for index in self._indexes.values():
+            index.remove(table_id)
+        self._release_frame(table_id)
+        self._tables.pop(table_id, None)
+        self._statistics.pop(table_id, None)
+        self._sources.pop(table_id, None)
+        self._positions.pop(table_id, None)
 
     def add_table(self, table_id: str, data_source: str, data_table: AbstractDataTable):
         """
@@ -36,6 +104,8 @@ class DataStore:
             return
         self._tables[table_id] = data_table
         self._sources[table_id] = data_source
+        self._share_frame(table_id)
+        self._register_table(table_id)
 
     def add_meta_data(self, table_id: str, meta_data: Tuple[str, Any]):
         """
@@ -46,6 +116,11 @@ class DataStore:
         :return:
         """
         self._tables[table_id].add_meta_data_key(meta_data[0], meta_data[1])
+        if meta_data[0] in self._indexes and table_id not in self._indexes[meta_data[0]]:
+            self._index_table(self._indexes[meta_data[0]], table_id)
+
+    def __contains__(self, table_id: str) -> bool:
+        return table_id in self._tables
 
     def load_by_id(self, table_id: str) -> AbstractDataTable:
         """
@@ -56,14 +131,206 @@ class DataStore:
         """
         return self._tables[table_id]
 
-    def load_by_meta_data(self, meta_filter: Tuple[Dict[str, Any], Dict[str, Any]]) -> List[AbstractDataTable]:
+    def statistics(self, table_id: str) -> TableStatistics:
+        """
+        Row count and column zone maps of a table, without touching its frame
+
+        :param table_id:
+        :return:
+        """
+        return self._statistics[table_id]
+
+    def load_by_meta_data(self, meta_filter: Tuple[Dict[str, Any], Dict[str, Any]], order_by: Optional[str] = None,
+                          descending: bool = False) -> List[AbstractDataTable]:
         """
         Load all data tables that match the meta data filter
         
         :param meta_filter:
+        :param order_by: meta data key to order the tables by, insertion order if None
+        :param descending:
+        :return:
+        """
+        return [self.load_by_id(table_id) for table_id in self.find_ids_by_meta_data(meta_filter, order_by, descending)]
+
+    def find_ids_by_meta_data(self, meta_filter: Tuple[Dict[str, Any], Dict[str, Any]],
+                              order_by: Optional[str] = None, descending: bool = False) -> List[str]:
+        """
+        Get the ids of all data tables that match the meta data filter, in the same order as load_by_meta_data.
+        Conditions on indexed keys narrow the candidates through the index before the filter is evaluated.
+
+        :param meta_filter:
+        :param order_by: meta data key to order the tables by, insertion order if None. Tables without the key
+        come last.
+        :param descending:
         :return:
         """
-        return [dt for dt in self._tables.values() if dt.compare_meta_data(meta_filter[0], meta_filter[1])]
+        with instrumentation.stage('load_by_meta_data'):
+            inclusive, exclusive = meta_filter
+            table_ids = self._match_ids(inclusive, exclusive)
+            for key, condition in inclusive.items():
+                if isinstance(condition, TopK):
+                    table_ids = self._top_k(table_ids, key, condition)
+            if order_by is not None:
+                table_ids = self._order(table_ids, order_by, descending)
+            return table_ids
+
+    def sort_ids(self, table_ids: List[str]) -> List[str]:
+        """
+        Sort table ids into insertion order
+
+        :param table_ids:
+        :return:
+        """
+        return sorted(table_ids, key=self._positions.__getitem__)
+
+    def create_index(self, key: str):
+        """
+        Create a sorted index on a meta data key. Range, in and top-k conditions on the key as well as ordered
+        retrieval by the key are answered by the index afterwards.
+
+        :param key:
+        :return:
+        """
+        index = SortedMetaIndex(key)
+        try:
+            for table_id in self._tables:
+                self._index_table(index, table_id)
+        except TypeError:
+            logging.warning('The values of meta data key {} are not comparable. No index created.'.format(key))
+            return
+        self._indexes[key] = index
+
+    def refresh_indexes(self, table_ids: List[str]):
+        """
+        Index meta data that was added to the tables directly, bypassing add_meta_data
+
+        :param table_ids:
+        :return:
+        """
+        for index in self._indexes.values():
+            for table_id in table_ids:
+                if table_id not in index:
+                    self._index_table(index, table_id)
+
+    def drop_index(self, key: str):
+        self._indexes.pop(key, None)
+
+    def indexed_keys(self) -> List[str]:
+        return list(self._indexes)
+
+    def memory_report(self) -> Dict[str, int]:
+        """
+        Memory of the stored frames. Logical bytes count every table on its own, stored bytes count frames that are
+        shared between tables once.
+
+        :return:
+        """
+        frames = {id(table.frame): table.frame for table in self._tables.values()}
+        logical_bytes = sum(self._frame_bytes(table.frame) for table in self._tables.values())
+        stored_bytes = sum(self._frame_bytes(frame) for frame in frames.values())
+        return {'tables': len(self._tables), 'frames': len(frames), 'logical_bytes': logical_bytes,
+                'stored_bytes': stored_bytes, 'saved_bytes': logical_bytes - stored_bytes}
+
+    def _share_frame(self, table_id: str):
+        if not self._deduplicate:
+            return
+        table = self._tables[table_id]
+        fingerprint = content_hash(table.frame)
+        stored_frame = self._frames.get(fingerprint)
+        if stored_frame is None:
+            self._frames[fingerprint] = table.frame
+            self._frame_references[fingerprint] = 0
+        elif stored_frame is table.frame or stored_frame.equals(table.frame):
+            table.frame = stored_frame
+        else:
+            # hash collision of different frames, the table keeps its own frame
+            return
+        self._frame_references[fingerprint] += 1
+        self._fingerprints[table_id] = fingerprint
+
+    def _release_frame(self, table_id: str):
+        fingerprint = self._fingerprints.pop(table_id, None)
+        if fingerprint is None:
+            return
+        self._frame_references[fingerprint] -= 1
+        if not self._frame_references[fingerprint]:
+            del self._frame_references[fingerprint]
+            del self._frames[fingerprint]
+
+    @staticmethod
+    def _frame_bytes(frame: pd.DataFrame) -> int:
+        return int(frame.memory_usage(index=True, deep=True).sum())
+
+    def _register_table(self, table_id: str):
+        self._statistics[table_id] = TableStatistics.from_frame(self._tables[table_id].frame)
+        self._positions[table_id] = self._next_position
+        self._next_position += 1
+        for key, index in list(self._indexes.items()):
+            try:
+                self._index_table(index, table_id)
+            except TypeError:
+                logging.warning('Meta data of table {} is not comparable for key {}. '
+                                'Dropping the index.'.format(table_id, key))
+                self._indexes.pop(key)
+
+    def _index_table(self, index: SortedMetaIndex, table_id: str):
+        meta_data = self._tables[table_id].meta_data
+        if index.key in meta_data:
+            index.add(table_id, meta_data[index.key], self._positions[table_id])
+
+    def _match_ids(self, inclusive: Dict[str, Any], exclusive: Dict[str, Any]) -> List[str]:
+        # all tables that match the filter in insertion order, top-k conditions are not applied yet
+        candidates = self._index_candidates(inclusive)
+        if candidates is None:
+            candidates = list(self._tables)
+        return [table_id for table_id in candidates if self._tables[table_id].compare_meta_data(inclusive, exclusive)]
+
+    def _index_for(self, key: str) -> Optional[SortedMetaIndex]:
+        return self._indexes.get(key)
+
+    def _index_candidates(self, inclusive: Dict[str, Any]) -> Optional[List[str]]:
+        candidates = None
+        for key, condition in inclusive.items():
+            if key not in self._indexes or isinstance(condition, TopK):
+                continue
+            index = self._indexes[key]
+            try:
+                if isinstance(condition, Range):
+                    table_ids = index.range(condition.low, condition.high, condition.include_low,
+                                            condition.include_high)
+                elif isinstance(condition, In):
+                    table_ids = index.values_in(condition.values)
+                elif isinstance(condition, MetaOperator):
+                    continue
+                else:
+                    table_ids = index.range(condition, condition)
+            except TypeError:
+                # values of another type than the indexed ones, the filter scan decides
+                continue
+            candidates = set(table_ids) if candidates is None else candidates.intersection(table_ids)
+        if candidates is None:
+            return None
+        return self.sort_ids(candidates)
+
+    def _top_k(self, table_ids: List[str], key: str, condition: TopK) -> List[str]:
+        index = self._index_for(key)
+        if index is not None:
+            selected = set(index.top_k(condition.k, condition.largest, set(table_ids)))
+        else:
+            ranked = sorted(table_ids, key=lambda table_id: self.load_by_id(table_id).meta_data[key],
+                            reverse=condition.largest)
+            selected = set(ranked[:condition.k])
+        return [table_id for table_id in table_ids if table_id in selected]
+
+    def _order(self, table_ids: List[str], key: str, descending: bool) -> List[str]:
+        missing = [table_id for table_id in table_ids if key not in self.load_by_id(table_id).meta_data]
+        index = self._index_for(key)
+        if index is not None:
+            ordered = index.ordered(descending, set(table_ids))
+        else:
+            ordered = sorted((table_id for table_id in table_ids if key in self.load_by_id(table_id).meta_data),
+                             key=lambda table_id: self.load_by_id(table_id).meta_data[key], reverse=descending)
+        return ordered + missing
 
     def _check_table_id(self, table_id, data_source):
         if table_id in self._tables:
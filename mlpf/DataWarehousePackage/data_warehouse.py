@@ -1,55 +1,219 @@
-from .lib.data_table import AbstractDataTable
+from .lib.data_table import AbstractDataTable, DataTable
+from .lib.ingest_manifest import IngestManifest
+from .lib.table_statistics import TableStatistics
+from .lib.window_dataset import WindowDataset
 from .data_store import DataStore
 from .lib import data_aggregation, data_modifier
 from ..AlgorithmPackage.preprocessing import preprocessing_factory
 from ..AlgorithmPackage.preprocessing.abstract_preprocessor import AbstractPreprocessor
-from typing import List, Tuple, Callable, Union, Dict, Any
+from ..lib import instrumentation
+from ..lib.rw_lock import ReadWriteLock, read_locked, write_locked
+from typing import List, Tuple, Callable, Union, Dict, Any, Optional, AsyncIterator
+from concurrent.futures import Executor, ThreadPoolExecutor
+from collections import deque
+from copy import deepcopy
 import pandas as pd
+import asyncio
 import os
+import threading
 import uuid
 
 
 class DataWarehouse:
+    """
+    Store of data tables with their meta data and the preprocessors working on them.
 
-    def __init__(self, data_root: str):
-        self._data_store: DataStore = DataStore()
+    The warehouse can be shared between threads. Queries hold a read lock and run in parallel, changes of the
+    stored tables hold the write lock and run alone. Files are parsed before the write lock is taken, so ingestion
+    only blocks queries for the moment a parsed table is added. Loading and refreshing folders is serialized, as is
+    preprocessing, which reads its source tables under the read lock and only adds its results under the write lock.
+    Frames and meta data dicts that were returned are shared with the warehouse and must not be modified.
+    """
+
+    def __init__(self, data_root: str, deduplicate: bool = False):
+        """
+        :param data_root:
+        :param deduplicate: store tables with identical data only once, see DataStore
+        """
+        self._data_store: DataStore = DataStore(deduplicate)
         self._data_root: str = data_root
         self._preprocesser_store: Dict[str, AbstractPreprocessor] = {}
+        # settings every stored preprocessor was created with
+        self._preprocessor_settings: Dict[str, Dict] = {}
+        self._manifest: IngestManifest = IngestManifest()
+        self._create_locks()
 
     def load_data_folders(self, folders=List[str], meta_data_keys: Union[List[str], None] = None) -> List[str]:
         """
-        Load all csv files in a folder
+        Load all csv files in a folder. Files that are already loaded keep their table, they are neither read
+        again nor loaded twice, see refresh_data_folders for bringing changed files up to date.
 
         :param folders:
         :param meta_data_keys:
-        :return:
+        :return: ids of the tables of all csv files of the folders
         """
+        with self._ingest_lock:
+            return self._load_data_folders(folders, meta_data_keys)
+
+    def _load_data_folders(self, folders: List[str], meta_data_keys: Union[List[str], None]) -> List[str]:
         table_ids = []
         for folder in folders:
             for file in os.listdir(os.path.join(self._data_root, folder)):
                 if not file.endswith('.csv'):
                     continue
-                table_id = self.load_data_file(os.path.join(self._data_root, folder, file), meta_data_keys)
+                path = os.path.join(folder, file)
+                if path in self._manifest:
+                    table_ids.append(self._manifest.table_id(path))
+                    continue
+                signature = self._manifest.signature(os.path.join(self._data_root, path))
+                table_id = self.load_data_file(os.path.join(self._data_root, path), meta_data_keys)
+                self._manifest.record(path, signature, table_id)
                 table_ids.append(table_id)
         return table_ids
 
-    def load_data_file(self, file: str, meta_data_keys: Union[List[str], None]) -> str:
+    def refresh_data_folders(self, folders: List[str], meta_data_keys: Union[List[str], None] = None,
+                             deleted_mark: Union[Tuple[str, Any], None] = None) \
+            -> Tuple[List[str], List[str], List[str]]:
+        """
+        Bring the tables of the folders up to date with the csv files: load new files, reload changed files into
+        their existing tables and drop the tables of deleted files. Only new and changed files are read, so calling
+        this repeatedly on a growing data root is cheap. Tables preprocessed from a changed file are not updated.
+
+        :param folders:
+        :param meta_data_keys:
+        :param deleted_mark: mark the tables of deleted files with this meta data instead of dropping them
+        :return: ids of the added, reloaded and deleted tables
+        """
+        with self._ingest_lock:
+            return self._refresh_data_folders(folders, meta_data_keys, deleted_mark)
+
+    def _refresh_data_folders(self, folders: List[str], meta_data_keys: Union[List[str], None],
+                              deleted_mark: Union[Tuple[str, Any], None]) -> Tuple[List[str], List[str], List[str]]:
+        scan = self._manifest.scan(self._data_root, folders)
+        added = []
+        for path, signature in scan.new.items():
+            table_id = self.load_data_file(os.path.join(self._data_root, path), meta_data_keys)
+            self._manifest.record(path, signature, table_id)
+            added.append(table_id)
+        reloaded = []
+        for path, signature in scan.changed.items():
+            table_id = self._manifest.table_id(path)
+            self.reload_table(table_id, meta_data_keys)
+            self._manifest.record(path, signature, table_id)
+            reloaded.append(table_id)
+        for path, signature in scan.touched.items():
+            self._manifest.record(path, signature, self._manifest.table_id(path))
+        deleted = []
+        for path, entry in scan.deleted.items():
+            if deleted_mark is None:
+                self.remove_table(entry.table_id)
+            else:
+                self.add_meta_data(entry.table_id, dict([deleted_mark]))
+            self._manifest.remove(path)
+            deleted.append(entry.table_id)
+        return added, reloaded, deleted
+
+    async def ingest_data_folders(self, folders: List[str], meta_data_keys: Union[List[str], None] = None,
+                                  executor: Optional[Executor] = None, prefetch: int = 4) -> AsyncIterator[str]:
+        """
+        Load the csv files of the folders that are not loaded yet and yield the id of every table as soon as it is
+        added, so consumers can start on the first tables while the others are still parsed. The files are parsed
+        in the executor, at most prefetch of them ahead of the consumer, and added in the order of the folders.
+        Changed and deleted files are left to refresh_data_folders, which should not run on the same folders at
+        the same time.
+
+            async for table_id in warehouse.ingest_data_folders(folders):
+                ...
+
+        :param folders:
+        :param meta_data_keys:
+        :param executor: executor to parse the files in, the default executor of the event loop if None
+        :param prefetch: amount of files parsed ahead
+        :return:
+        """
+        if prefetch < 1:
+            raise ValueError('prefetch has to be at least 1')
+        loop = asyncio.get_running_loop()
+        with self._ingest_lock:
+            # only list the files here, they are read in the executor so the first table does not wait for the rest
+            new_files = iter(self._manifest.new_files(self._data_root, folders))
+        pending = deque()
+
+        def parse_ahead():
+            while len(pending) < prefetch:
+                path = next(new_files, None)
+                if path is None:
+                    return
+                file = os.path.join(self._data_root, path)
+                pending.append((path, file, loop.run_in_executor(executor, self._parse_file, file, meta_data_keys)))
+
+        parse_ahead()
+        try:
+            while pending:
+                path, file, parsed = pending.popleft()
+                signature, data_table = await parsed
+                parse_ahead()
+                table_id = str(uuid.uuid4())
+                with self._lock.write():
+                    self._data_store.add_table(table_id, file, data_table)
+                with self._ingest_lock:
+                    self._manifest.record(path, signature, table_id)
+                yield table_id
+        finally:
+            for _, _, parsed in pending:
+                parsed.cancel()
+
+    @staticmethod
+    def _parse_file(file: str, meta_data_keys: Union[List[str], None]) \
+            -> Tuple[Tuple[int, float, Optional[str]], DataTable]:
+        # the file is stated before it is read, a change while parsing shows up in the next refresh
+        signature = IngestManifest.signature(file)
+        return signature, DataTable.from_source(file, meta_data_keys)
+
+    def load_data_file(self, file: str, meta_data_keys: Union[List[str], None], table_id: str = None) -> str:
         """
         Load a csv file into a data table structure
 
         :param file:
         :param meta_data_keys:
+        :param table_id: id of the new table, a new uuid if not specified
         :return:
         """
         if not file.endswith('.csv'):
             raise ValueError('specified file has to be a .csv file')
-        table_id = str(uuid.uuid4())
-        self._data_store.add_source(table_id, file, meta_data_keys)
+        table_id = table_id or str(uuid.uuid4())
+        data_table = DataTable.from_source(file, meta_data_keys)
+        with self._lock.write():
+            self._data_store.add_table(table_id, file, data_table)
         return table_id
 
+    def reload_table(self, table_id: str, meta_data_keys: Union[List[str], None]):
+        """
+        Load the csv file of a table again, the table keeps its id
+
+        :param table_id:
+        :param meta_data_keys:
+        :return:
+        """
+        with self._lock.read():
+            source = self._data_store.source(table_id)
+        data_table = DataTable.from_source(source, meta_data_keys)
+        with self._lock.write():
+            self._data_store.replace_table(table_id, data_table)
+
+    @write_locked
+    def remove_table(self, table_id: str):
+        """
+        Remove a data table from the warehouse
+
+        :param table_id:
+        :return:
+        """
+        self._data_store.remove_table(table_id)
+
     def preprocessing_by_args(self, meta_filter: Tuple[Dict[str, Any], Dict[str, Any]], method_name: str,
                               source_names: List[str], settings: Dict, mark_new: Tuple[str, Any],
-                              mark_old: Union[Tuple[str, Any], None], batch_mode: bool) -> List[str]:
+                              mark_old: Union[Tuple[str, Any], None], batch_mode: bool, stats: Any = None) -> List[str]:
         """
         Preprocess all data tables that fit the filters.
 
@@ -60,20 +224,23 @@ class DataWarehouse:
         :param mark_new:
         :param mark_old:
         :param batch_mode:
+        :param stats: see preprocessing_by_id
         :return:
         """
-        data_tables = self._retrieve_data_by_args(meta_filter)
-        preprocessor = self._get_preprocessor(method_name, settings)
-        new_tables = data_modifier.apply_preprocessing(data_tables, preprocessor, source_names,
-                                                       mark_new, mark_old, batch_mode)
-        return [self._add_table(table) for table in new_tables]
+        table_ids = self._find_ids(meta_filter)
+        return self.preprocessing_by_id(table_ids, method_name, source_names, settings, mark_new, mark_old,
+                                        batch_mode, stats)
 
     def preprocessing_by_id(self, table_ids: List[str], method_name: str, source_names: List[str],
                             settings: Dict, mark_new: Tuple[str, Any],
-                            mark_old: Union[Tuple[str, Any], None], batch_mode: bool) -> List[str]:
+                            mark_old: Union[Tuple[str, Any], None], batch_mode: bool, stats: Any = None) -> List[str]:
         """
         Preprocess all data tables specified in the id list.
 
+        A preprocessor that needs a fit and was not fitted with fit_preprocessor is fitted on the tables it
+        preprocesses. That fit only holds for this call, the stored preprocessor stays unfitted, so the next call
+        fits again on its own tables.
+
         :param table_ids:
         :param method_name:
         :param source_names:
@@ -81,14 +248,87 @@ class DataWarehouse:
         :param mark_new:
         :param mark_old:
         :param batch_mode:
+        :param stats: merged statistics for such a fit, e.g. over all shards, computed from the tables if None
+        :return:
+        """
+        with self._preprocessing_lock:
+            preprocessor = self._get_preprocessor(method_name, settings)
+            if table_ids and preprocessor.needs_fit():
+                preprocessor = deepcopy(preprocessor)
+                preprocessor.finalize(stats if stats is not None else
+                                      self._partial_stats(preprocessor, table_ids, source_names))
+            # marking the old tables changes them in place, otherwise they are only read
+            with self._lock.write() if mark_old else self._lock.read():
+                data_tables = [self._retrieve_data_by_id(table_id) for table_id in table_ids]
+                new_tables = data_modifier.apply_preprocessing(data_tables, preprocessor, source_names,
+                                                               mark_new, mark_old, batch_mode)
+                if mark_old:
+                    # the old tables were marked directly, their new meta data still has to reach the indexes
+                    self._data_store.refresh_indexes(table_ids)
+            with self._lock.write():
+                return [self._add_table(table) for table in new_tables]
+
+    def fit_preprocessor(self, table_ids: List[str], method_name: str, source_names: List[str], settings: Dict,
+                         workers: Optional[int] = None):
+        """
+        Fit a preprocessor that needs statistics over all tables, e.g. the global normalization, without
+        preprocessing the tables. The fitted preprocessor is kept in the preprocessor store and used by every later
+        preprocessing with the method and the same settings, e.g. of validation data, until it is reset. Without
+        it every preprocessing fits the preprocessor on its own tables.
+
+        :param table_ids:
+        :param method_name:
+        :param source_names:
+        :param settings:
+        :param workers: amount of threads computing the statistics of the tables, see partial_stats
+        :return:
+        """
+        with self._preprocessing_lock:
+            preprocessor = self._get_preprocessor(method_name, settings)
+            preprocessor.finalize(self._partial_stats(preprocessor, table_ids, source_names, workers))
+
+    def partial_stats(self, table_ids: List[str], method_name: str, source_names: List[str], settings: Dict,
+                      workers: Optional[int] = None) -> Any:
+        """
+        Merged statistics of the tables for the partial fit of a preprocessor, see AbstractPreprocessor. The
+        statistics of the tables are computed in parallel, at most two tables per worker are in flight at a time,
+        and merged in the order of the table ids, so the result does not depend on the amount of workers.
+
+        :param table_ids:
+        :param method_name:
+        :param source_names:
+        :param settings:
+        :param workers: amount of threads, one per cpu if None
+        :return:
+        """
+        with self._preprocessing_lock:
+            preprocessor = self._get_preprocessor(method_name, settings)
+            return self._partial_stats(preprocessor, table_ids, source_names, workers)
+
+    def preprocessor_needs_fit(self, method_name: str, settings: Dict) -> bool:
+        """
+        True if the preprocessor has to be fitted before it can preprocess, see AbstractPreprocessor.needs_fit
+
+        :param method_name:
+        :param settings:
         :return:
         """
-        data_tables = [self._retrieve_data_by_id(table_id) for table_id in table_ids]
-        preprocessor = self._get_preprocessor(method_name, settings)
-        new_tables = data_modifier.apply_preprocessing(data_tables, preprocessor, source_names,
-                                                       mark_new, mark_old, batch_mode)
-        return [self._add_table(table) for table in new_tables]
+        with self._preprocessing_lock:
+            return self._get_preprocessor(method_name, settings).needs_fit()
 
+    def finalize_preprocessor(self, method_name: str, settings: Dict, stats: Any):
+        """
+        Fit a preprocessor with statistics merged elsewhere, e.g. over the shards of a ShardedDataWarehouse
+
+        :param method_name:
+        :param settings:
+        :param stats:
+        :return:
+        """
+        with self._preprocessing_lock:
+            self._get_preprocessor(method_name, settings).finalize(stats)
+
+    @read_locked
     def get_data_by_id(self, table_id: str, columns: Union[List[str], None] = None,
                        row_filter: Union[List[Tuple[str, Callable]], None] = None) -> pd.DataFrame:
         """
@@ -99,26 +339,31 @@ class DataWarehouse:
         :param row_filter:
         :return:
         """
-        dt = self._retrieve_data_by_id(table_id)
-        return self._apply_filter(dt, columns, row_filter)
+        return self._filter_table(table_id, columns, row_filter)
 
+    @read_locked
     def get_data_by_meta_data(self, meta_filter: Tuple[Dict[str, Any], Dict[str, Any]],
                               columns: Union[List[str], None] = None,
-                              row_filter: Union[List[Tuple[str, Callable]], None] = None) -> List[pd.DataFrame]:
+                              row_filter: Union[List[Tuple[str, Callable]], None] = None,
+                              order_by: Optional[str] = None, descending: bool = False) -> List[pd.DataFrame]:
         """
         Retrieve the data that matches the filter.
 
         :param meta_filter:
         :param columns:
         :param row_filter:
+        :param order_by: meta data key to order the tables by, insertion order if None
+        :param descending:
         :return:
         """
-        dt_list = self._retrieve_data_by_args(meta_filter)
-        return [self._apply_filter(dt, columns, row_filter) for dt in dt_list]
+        table_ids = self._data_store.find_ids_by_meta_data(meta_filter, order_by, descending)
+        return [self._filter_table(table_id, columns, row_filter) for table_id in table_ids]
 
+    @read_locked
     def get_complete_data_by_meta_data(self, meta_filter: Tuple[Dict[str, Any], Dict[str, Any]],
                                        columns: Union[List[str], None] = None,
-                                       row_filter: Union[List[Tuple[str, Callable]], None] = None) \
+                                       row_filter: Union[List[Tuple[str, Callable]], None] = None,
+                                       order_by: Optional[str] = None, descending: bool = False) \
             -> List[Tuple[pd.DataFrame, Dict[str, Any]]]:
         """
         Retrieve the complete data tables by matching filters.
@@ -126,11 +371,115 @@ class DataWarehouse:
         :param meta_filter:
         :param columns:
         :param row_filter:
+        :param order_by: meta data key to order the tables by, insertion order if None
+        :param descending:
+        :return:
+        """
+        table_ids = self._data_store.find_ids_by_meta_data(meta_filter, order_by, descending)
+        return [(self._filter_table(table_id, columns, row_filter), self._retrieve_data_by_id(table_id).meta_data)
+                for table_id in table_ids]
+
+    @read_locked
+    def get_windows_by_meta_data(self, meta_filter: Tuple[Dict[str, Any], Dict[str, Any]], window: int,
+                                 stride: int = 1, horizon: int = 0, columns: Union[List[str], None] = None,
+                                 row_filter: Union[List[Tuple[str, Callable]], None] = None,
+                                 order_by: Optional[str] = None, descending: bool = False) -> WindowDataset:
+        """
+        Retrieve all sliding windows over the data tables that match the filter as views, see WindowDataset for when
+        a table is copied once.
+
+        :param meta_filter:
+        :param window: rows of the input part of a window
+        :param stride: rows between the starts of two consecutive windows of a table
+        :param horizon: rows of the target part directly after the input part
+        :param columns:
+        :param row_filter:
+        :param order_by: meta data key to order the tables by, insertion order if None
+        :param descending:
+        :return:
+        """
+        table_ids = self._data_store.find_ids_by_meta_data(meta_filter, order_by, descending)
+        tables = []
+        for table_id in table_ids:
+            tables.append((table_id, self._filter_table(table_id, columns, row_filter),
+                           self._retrieve_data_by_id(table_id).meta_data))
+        return WindowDataset(tables, window, stride, horizon)
+
+    @read_locked
+    def get_statistics_by_id(self, table_id: str) -> TableStatistics:
+        """
+        Retrieve the row count and column zone maps of the data table id without touching its data.
+
+        :param table_id:
+        :return:
+        """
+        return self._data_store.statistics(table_id)
+
+    @read_locked
+    def get_statistics_by_meta_data(self, meta_filter: Tuple[Dict[str, Any], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Summarize the tables that match the filter from the statistics catalog: amount of tables, total rows and per
+        column min, max and null count. No data is touched.
+
+        :param meta_filter:
+        :return:
+        """
+        table_ids = self._data_store.find_ids_by_meta_data(meta_filter)
+        return TableStatistics.summarize([self._data_store.statistics(table_id) for table_id in table_ids])
+
+    @read_locked
+    def get_meta_data_by_id(self, table_id: str) -> Dict[str, Any]:
+        """
+        Retrieve the meta data of the data table id.
+
+        :param table_id:
+        :return:
+        """
+        return self._retrieve_data_by_id(table_id).meta_data
+
+    @read_locked
+    def get_table_ids_by_meta_data(self, meta_filter: Tuple[Dict[str, Any], Dict[str, Any]],
+                                   order_by: Optional[str] = None, descending: bool = False) -> List[str]:
+        """
+        Retrieve the ids of the data tables that match the filter.
+
+        :param meta_filter:
+        :param order_by: meta data key to order the tables by, insertion order if None
+        :param descending:
+        :return:
+        """
+        return self._data_store.find_ids_by_meta_data(meta_filter, order_by, descending)
+
+    @write_locked
+    def create_meta_index(self, key: str):
+        """
+        Create a sorted index on a meta data key for range, in and top-k filters and ordered retrieval
+
+        :param key:
+        :return:
+        """
+        self._data_store.create_index(key)
+
+    @write_locked
+    def drop_meta_index(self, key: str):
+        """
+        Remove the index of a meta data key
+
+        :param key:
+        :return:
+        """
+        self._data_store.drop_index(key)
+
+    @read_locked
+    def memory_report(self) -> Dict[str, int]:
+        """
+        Memory of the stored tables and the savings of deduplication
+
         :return:
         """
-        dt_list = self._retrieve_data_by_args(meta_filter)
-        return [self._apply_filter_full_return(dt, columns, row_filter) for dt in dt_list]
+        return self._data_store.memory_report()
 
+    @write_locked
     def add_meta_data(self, table_id: str, meta_data_update: Dict[str, Any]):
         """
         Enrich a data table with new meta data
@@ -150,25 +499,80 @@ class DataWarehouse:
         :return:
         """
         # TODO: Change the behaviour to only resetting and not removing the preprocessing method
-        self._preprocesser_store.pop(method_name, None)
+        with self._preprocessing_lock:
+            self._preprocesser_store.pop(method_name, None)
+            self._preprocessor_settings.pop(method_name, None)
 
     def update_preprocessor_settings(self, method_name: str, new_settings: Dict):
         """
-        Update the settings of the specified preprocessor
+        Update the settings of the specified preprocessor. Later calls have to pass the updated settings to keep
+        using it, calls with the previous settings create a new preprocessor.
 
         :param method_name:
         :param new_settings:
         :return:
         """
-        if method_name not in self._preprocesser_store:
-            return
-        self._preprocesser_store[method_name].update_settings(**new_settings)
+        with self._preprocessing_lock:
+            if method_name not in self._preprocesser_store:
+                return
+            self._preprocesser_store[method_name].update_settings(**new_settings)
+            self._preprocessor_settings[method_name] = {**self._preprocessor_settings.get(method_name, {}),
+                                                        **new_settings}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for lock in ('_lock', '_ingest_lock', '_preprocessing_lock'):
+            state.pop(lock)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__dict__.setdefault('_preprocessor_settings', {})
+        self._create_locks()
+
+    def _create_locks(self):
+        self._lock: ReadWriteLock = ReadWriteLock()
+        # serializes loading and refreshing folders, which also guards the manifest
+        self._ingest_lock: threading.Lock = threading.Lock()
+        # guards the preprocessor store, taken before _lock
+        self._preprocessing_lock: threading.Lock = threading.Lock()
 
     def _get_preprocessor(self, method_name: str, settings: Dict):
-        if method_name not in self._preprocesser_store:
+        # other settings than the stored preprocessor was created with replace it, together with its fitted state
+        if method_name not in self._preprocesser_store or self._preprocessor_settings.get(method_name) != settings:
             self._preprocesser_store[method_name] = preprocessing_factory.create_preprocessor(method_name, settings)
+            self._preprocessor_settings[method_name] = dict(settings)
         return self._preprocesser_store[method_name]
 
+    def _partial_stats(self, preprocessor: AbstractPreprocessor, table_ids: List[str], source_names: List[str],
+                       workers: Optional[int] = None) -> Any:
+        if not table_ids:
+            raise ValueError('A preprocessor can not be fitted without tables.')
+
+        def table_stats(table_id: str) -> Any:
+            with self._lock.read():
+                data_table = self._retrieve_data_by_id(table_id)
+            return preprocessor.partial_stats(data_aggregation.select_columns(data_table, source_names))
+
+        workers = workers or os.cpu_count() or 1
+        with instrumentation.stage('partial_stats'), ThreadPoolExecutor(workers) as executor:
+            in_flight = 2 * workers
+            pending = deque(executor.submit(table_stats, table_id) for table_id in table_ids[:in_flight])
+            remaining = iter(table_ids[in_flight:])
+            stats = None
+            while pending:
+                table_result = pending.popleft().result()
+                stats = table_result if stats is None else preprocessor.merge(stats, table_result)
+                table_id = next(remaining, None)
+                if table_id is not None:
+                    pending.append(executor.submit(table_stats, table_id))
+        return stats
+
+    @read_locked
+    def _find_ids(self, meta_filter: Tuple[Dict[str, Any], Dict[str, Any]], order_by: Optional[str] = None,
+                  descending: bool = False) -> List[str]:
+        return self._data_store.find_ids_by_meta_data(meta_filter, order_by, descending)
+
     def _add_table(self, data_table: AbstractDataTable) -> str:
         table_id = str(uuid.uuid4())
         self._data_store.add_table(table_id, '', data_table)
@@ -177,24 +581,22 @@ class DataWarehouse:
     def _retrieve_data_by_id(self, table_id: str) -> AbstractDataTable:
         return self._data_store.load_by_id(table_id)
 
-    def _retrieve_data_by_args(self, meta_filter: Tuple[Dict[str, Any], Dict[str, Any]]) -> List[AbstractDataTable]:
-        return self._data_store.load_by_meta_data(meta_filter)
+    def _filter_table(self, table_id: str, columns: Union[List[str], None] = None,
+                      row_filter: Union[List[Tuple[str, Callable]], None] = None) -> pd.DataFrame:
+        statistics = self._data_store.statistics(table_id) if row_filter else None
+        return self._apply_filter(self._retrieve_data_by_id(table_id), columns, row_filter, statistics)
 
     @staticmethod
     def _apply_filter(dt: AbstractDataTable, columns: Union[List[str], None] = None,
-                      row_filter: Union[List[Tuple[str, Callable]], None] = None) -> pd.DataFrame:
+                      row_filter: Union[List[Tuple[str, Callable]], None] = None,
+                      statistics: Optional[TableStatistics] = None) -> pd.DataFrame:
         if not row_filter and not columns:
             return dt.frame
         elif not row_filter and columns:
             return data_aggregation.select_columns(dt, columns)
         elif row_filter and not columns:
-            row_mask = data_aggregation.create_mask(dt.frame, row_filter)
+            row_mask = data_aggregation.create_mask(dt.frame, row_filter, statistics)
             return data_aggregation.filter_rows(dt, row_mask)
         else:
-            row_mask = data_aggregation.create_mask(dt.frame, row_filter)
+            row_mask = data_aggregation.create_mask(dt.frame, row_filter, statistics)
             return data_aggregation.select_columns_rows(dt, columns, row_mask)
-
-    def _apply_filter_full_return(self, dt: AbstractDataTable, columns: Union[List[str], None] = None,
-                                  row_filter: Union[List[Tuple[str, Callable]], None] = None) \
-            -> Tuple[pd.DataFrame, Dict[str, Any]]:
-        return self._apply_filter(dt, columns, row_filter), dt.meta_data
@@ -0,0 +1,102 @@
+from .data_store import DataStore
+from .lib.data_table import AbstractDataTable
+from .lib.meta_index import SortedMetaIndex
+from .lib.table_statistics import TableStatistics
+from typing import Dict, List, Any, Tuple, Optional, Set
+from copy import deepcopy
+
+
+class LayeredDataStore(DataStore):
+    """
+    DataStore on top of a shared base store that is never modified. Tables added to the layered store are kept in
+    the layer itself. Meta data changes of base tables are copy on write: the first change detaches a copy of the
+    table that shares the frame of the base table but owns its meta data. Removing a base table only hides it.
+
+    Queries merge both: the base tables in the order of the base store, followed by the tables of the layer.
+    The memory report only covers the tables of the layer.
+    """
+
+    def __init__(self, base: DataStore, deduplicate: bool = False):
+        super().__init__(deduplicate)
+        self._base: DataStore = base
+        self._detached: Dict[str, AbstractDataTable] = {}
+        self._hidden: Set[str] = set()
+
+    def __contains__(self, table_id: str) -> bool:
+        return table_id in self._tables or (table_id in self._base and table_id not in self._hidden)
+
+    def load_by_id(self, table_id: str) -> AbstractDataTable:
+        if table_id in self._tables:
+            return self._tables[table_id]
+        if table_id in self._hidden:
+            raise KeyError(table_id)
+        if table_id in self._detached:
+            return self._detached[table_id]
+        return self._base.load_by_id(table_id)
+
+    def statistics(self, table_id: str) -> TableStatistics:
+        if table_id in self._tables:
+            return super().statistics(table_id)
+        if table_id in self._hidden:
+            raise KeyError(table_id)
+        # detached tables share the frame of the base table and therefore its statistics
+        return self._base.statistics(table_id)
+
+    def add_meta_data(self, table_id: str, meta_data: Tuple[str, Any]):
+        if table_id in self._tables:
+            super().add_meta_data(table_id, meta_data)
+            return
+        self.detach([table_id])
+        self._detached[table_id].add_meta_data_key(meta_data[0], meta_data[1])
+
+    def detach(self, table_ids: List[str]):
+        """
+        Give base tables their own copy of the meta data in this layer, e.g. before they are modified directly
+
+        :param table_ids:
+        :return:
+        """
+        for table_id in table_ids:
+            if table_id in self._tables or table_id in self._detached:
+                continue
+            base_table = self.load_by_id(table_id)
+            self._detached[table_id] = type(base_table).from_frame(base_table.frame, deepcopy(base_table.meta_data),
+                                                                   deepcopy(base_table.meta_data_keys))
+
+    def replace_table(self, table_id: str, data_table: AbstractDataTable):
+        if table_id not in self._tables:
+            raise ValueError('Table {} belongs to the shared base and can only be reloaded there.'.format(table_id))
+        super().replace_table(table_id, data_table)
+
+    def source(self, table_id: str) -> str:
+        if table_id not in self._tables:
+            raise ValueError('Table {} belongs to the shared base and can only be reloaded there.'.format(table_id))
+        return super().source(table_id)
+
+    def remove_table(self, table_id: str):
+        if table_id in self._tables:
+            super().remove_table(table_id)
+            return
+        self._detached.pop(table_id, None)
+        self._hidden.add(table_id)
+
+    def refresh_indexes(self, table_ids: List[str]):
+        # indexes of the layer only cover its own tables, detached base tables are always scanned
+        super().refresh_indexes([table_id for table_id in table_ids if table_id in self._tables])
+
+    def sort_ids(self, table_ids: List[str]) -> List[str]:
+        own_ids = [table_id for table_id in table_ids if table_id in self._tables]
+        base_ids = [table_id for table_id in table_ids if table_id not in self._tables]
+        return self._base.sort_ids(base_ids) + super().sort_ids(own_ids)
+
+    def _match_ids(self, inclusive: Dict[str, Any], exclusive: Dict[str, Any]) -> List[str]:
+        base_ids = [table_id for table_id in self._base._match_ids(inclusive, exclusive)
+                    if table_id not in self._detached and table_id not in self._hidden]
+        # detached tables of base tables that were removed from the base in the meantime are dropped
+        detached_ids = [table_id for table_id, table in self._detached.items()
+                        if table_id in self._base and table.compare_meta_data(inclusive, exclusive)]
+        return self._base.sort_ids(base_ids + detached_ids) + super()._match_ids(inclusive, exclusive)
+
+    def _index_for(self, key: str) -> Optional[SortedMetaIndex]:
+        # an index of the layer does not know the base tables
+        return None
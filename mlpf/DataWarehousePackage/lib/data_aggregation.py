@@ -1,5 +1,7 @@
 from .data_table import DataTable
-from typing import List, Callable, Tuple
+from .table_statistics import TableStatistics
+from ...lib import instrumentation
+from typing import List, Callable, Tuple, Optional
 import pandas as pd
 import functools
 
@@ -19,6 +21,14 @@ def filter_rows(data_table: DataTable, row_filter: pd.Series) -> pd.DataFrame:
     return df.loc[row_filter, :]
 
 
-def create_mask(data_frame: pd.DataFrame, selectors: List[Tuple[str, Callable]]) -> pd.Series:
-    return functools.reduce(lambda x, y: x & y, (fun(data_frame[column]) for column, fun in selectors))
+def create_mask(data_frame: pd.DataFrame, selectors: List[Tuple[str, Callable]],
+                statistics: Optional[TableStatistics] = None) -> pd.Series:
+    if statistics is not None and not statistics.may_match(selectors):
+        # the zone maps rule out every row, the selectors are not evaluated
+        with instrumentation.stage('create_mask_skipped') as recorder:
+            recorder.add(rows=len(data_frame))
+        return pd.Series(False, index=data_frame.index)
+    with instrumentation.stage('create_mask') as recorder:
+        recorder.add(rows=len(data_frame))
+        return functools.reduce(lambda x, y: x & y, (fun(data_frame[column]) for column, fun in selectors))
 
@@ -1,6 +1,7 @@
 from .data_table import AbstractDataTable
 from ..lib import data_aggregation
 from ...AlgorithmPackage.preprocessing.abstract_preprocessor import AbstractPreprocessor
+from ...lib import instrumentation
 from typing import List, Tuple, Any, Union
 import pandas as pd
 from copy import deepcopy
@@ -9,14 +10,16 @@ from copy import deepcopy
 def apply_preprocessing(data_tables: List[AbstractDataTable], preprocessor: AbstractPreprocessor, source_names: List[str],
                         mark_new: Tuple[str, Any], mark_old: Union[Tuple[str, Any], None],
                         batch_mode: bool) -> List[AbstractDataTable]:
-    if batch_mode:
-        return _batch_preprocessing(data_tables, preprocessor, source_names, mark_new, mark_old)
-    else:
-        preprocessed_tables = []
-        for data_table in data_tables:
-            new_table = _iterative_preprocessing(data_table, preprocessor, source_names, mark_new, mark_old)
-            preprocessed_tables.append(new_table)
-        return preprocessed_tables
+    with instrumentation.stage('apply_preprocessing') as recorder:
+        recorder.add_frames([data_table.frame for data_table in data_tables])
+        if batch_mode:
+            return _batch_preprocessing(data_tables, preprocessor, source_names, mark_new, mark_old)
+        else:
+            preprocessed_tables = []
+            for data_table in data_tables:
+                new_table = _iterative_preprocessing(data_table, preprocessor, source_names, mark_new, mark_old)
+                preprocessed_tables.append(new_table)
+            return preprocessed_tables
 
 
 def _batch_preprocessing(data_tables: List[AbstractDataTable], preprocessor: AbstractPreprocessor,
@@ -45,6 +48,6 @@ def _iterative_preprocessing(data_table: AbstractDataTable, preprocessor: Abstra
 def _inherit_table(old_table: AbstractDataTable, meta_extension: Tuple[str, Any], data_frame: pd.DataFrame):
     meta_copy = deepcopy(old_table.meta_data_keys)
     meta_dict_copy = deepcopy(old_table.meta_data)
-    new_table = AbstractDataTable.from_frame(data_frame, meta_dict_copy, meta_copy)
+    new_table = type(old_table).from_frame(data_frame, meta_dict_copy, meta_copy)
     new_table.add_meta_data_key(*meta_extension)
     return new_table
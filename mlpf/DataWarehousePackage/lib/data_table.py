@@ -1,5 +1,10 @@
+from .meta_query import MetaOperator
+from ...lib import instrumentation
+from pandas.api.types import is_numeric_dtype
 import pandas as pd
 import logging
+import json
+import os
 
 from typing import List, Dict, Any
 from abc import abstractstaticmethod, abstractclassmethod, ABC
@@ -22,10 +27,14 @@ class AbstractDataTable(ABC):
     def compare_meta_data(self, inclusive: Dict[str, Any], exclusive: Dict[str, Any]) -> bool:
         for k, v in inclusive.items():
             try:
-                if self.meta_data[k] != v:
-                    return False
+                value = self.meta_data[k]
             except KeyError:
                 return False
+            if isinstance(v, MetaOperator):
+                if not v.matches(value):
+                    return False
+            elif value != v:
+                return False
         for exclusive_key, excluded_value in exclusive.items():
             if exclusive_key in self.meta_data:
                 if self.meta_data[exclusive_key] == excluded_value:
@@ -36,9 +45,12 @@ class AbstractDataTable(ABC):
 
     @classmethod
     def from_source(cls, data_source: str, meta_data_keys: List[str] = None):
-        meta_data: Dict[str, Any] = cls._load_meta_data(data_source, meta_data_keys or [])
-        frame: pd.DataFrame = cls._load_frame(data_source)
-        return cls(frame, meta_data, meta_data_keys)
+        with instrumentation.stage('from_source') as recorder:
+            meta_data: Dict[str, Any] = cls._load_meta_data(data_source, meta_data_keys or [])
+            frame: pd.DataFrame = cls._load_frame(data_source)
+            recorder.add_frames([frame])
+        # every table gets its own key list, add_meta_data_key must not leak into other tables
+        return cls(frame, meta_data, list(meta_data.keys()))
 
     @classmethod
     def from_frame(cls, data_frame: pd.DataFrame, meta_dict: Dict[str, Any], meta_keys: List[str]):
@@ -51,3 +63,36 @@ class AbstractDataTable(ABC):
     @abstractstaticmethod
     def _load_frame(data_source: str) -> pd.DataFrame:
         raise NotImplementedError()
+
+
+class DataTable(AbstractDataTable):
+    """
+    Data table of a csv file. The meta data is read from a json file with the same name next to the csv file,
+    e.g. trial_1.csv and trial_1.json. Only the requested meta data keys are kept, all of them if none are requested.
+    """
+
+    @classmethod
+    def _load_meta_data(cls, data_source: str, meta_data_keys: List[str]) -> Dict[str, Any]:
+        meta_file = os.path.splitext(data_source)[0] + '.json'
+        if not os.path.isfile(meta_file):
+            if meta_data_keys:
+                logging.warning('No meta data file found for {}.'.format(data_source))
+            return {}
+        with open(meta_file) as json_file:
+            meta_data = json.load(json_file)
+        if not meta_data_keys:
+            return meta_data
+        missing_keys = [key for key in meta_data_keys if key not in meta_data]
+        if missing_keys:
+            logging.warning('Meta data keys {} are missing in {}.'.format(missing_keys, meta_file))
+        return {key: meta_data[key] for key in meta_data_keys if key in meta_data}
+
+    @staticmethod
+    def _load_frame(data_source: str) -> pd.DataFrame:
+        frame = pd.read_csv(data_source)
+        # read_csv keeps every column in a block of its own. Columns of one numeric dtype are stored as a single 2-D
+        # block instead, so the rows of the table, or of a selection of its columns, can be viewed as one array
+        # without copying, see WindowDataset.
+        if len(frame.columns) > 1 and frame.dtypes.nunique() == 1 and is_numeric_dtype(frame.dtypes.iloc[0]):
+            frame = pd.DataFrame(frame.to_numpy(), index=frame.index, columns=frame.columns, copy=False)
+        return frame
@@ -0,0 +1,73 @@
+from typing import List, Tuple, Union, Any, Callable, Optional
+
+import logging
+import threading
+
+
+class FolderWatcher:
+    """
+    Polls data folders in a background thread and keeps a data warehouse up to date with them through
+    refresh_data_folders, e.g. for long running services that receive new recordings.
+
+        with FolderWatcher(warehouse, ['subject_001'], interval=10.) as watcher:
+            ...
+    """
+
+    def __init__(self, warehouse, folders: List[str], meta_data_keys: Union[List[str], None] = None,
+                 interval: float = 5., deleted_mark: Union[Tuple[str, Any], None] = None,
+                 callback: Optional[Callable[[List[str], List[str], List[str]], None]] = None):
+        """
+        :param warehouse: DataWarehouse or ShardedDataWarehouse
+        :param folders: folders relative to the data root of the warehouse
+        :param meta_data_keys:
+        :param interval: seconds between two scans
+        :param deleted_mark: mark the tables of deleted files instead of dropping them
+        :param callback: called with the added, reloaded and deleted table ids after every scan that found changes
+        """
+        self.warehouse = warehouse
+        self.folders: List[str] = folders
+        self.meta_data_keys: Union[List[str], None] = meta_data_keys
+        self.interval: float = interval
+        self.deleted_mark: Union[Tuple[str, Any], None] = deleted_mark
+        self.callback = callback
+        self._stop_event: threading.Event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def poll(self) -> Tuple[List[str], List[str], List[str]]:
+        """
+        Scan the folders once
+
+        :return: ids of the added, reloaded and deleted tables
+        """
+        changes = self.warehouse.refresh_data_folders(self.folders, self.meta_data_keys, self.deleted_mark)
+        if self.callback is not None and any(changes):
+            self.callback(*changes)
+        return changes
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='FolderWatcher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.poll()
+            except Exception:
+                logging.exception('Scanning the data folders {} failed.'.format(self.folders))
+            self._stop_event.wait(self.interval)
@@ -0,0 +1,123 @@
+from typing import Dict, List, NamedTuple, Tuple, Optional
+
+import hashlib
+import os
+
+
+class ManifestEntry(NamedTuple):
+    size: int
+    mtime: float
+    content_hash: Optional[str]
+    table_id: str
+
+
+class ManifestScan(NamedTuple):
+    # new, changed and touched files map to their (size, mtime, content hash), deleted files to their manifest entry.
+    # Touched files have a new size or mtime but the content they were loaded with.
+    new: Dict[str, Tuple[int, float, Optional[str]]]
+    changed: Dict[str, Tuple[int, float, Optional[str]]]
+    touched: Dict[str, Tuple[int, float, Optional[str]]]
+    deleted: Dict[str, ManifestEntry]
+
+
+class IngestManifest:
+    """
+    Record of the csv files that were ingested from a data root: path relative to the data root ->
+    (size, mtime, content hash, table id). Size and mtime cover the csv file and its json meta data file.
+
+    A scan only stats the files of the scanned folders. Loading a file records its size and mtime, its content is
+    hashed lazily: only when the size or mtime of a recorded file changed, to tell a changed file from one that was
+    only touched. A file recorded without a hash counts as changed the first time, its hash is recorded with the
+    reload.
+    """
+
+    def __init__(self):
+        self.entries: Dict[str, ManifestEntry] = {}
+
+    def __contains__(self, path: str) -> bool:
+        return path in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def table_id(self, path: str) -> str:
+        return self.entries[path].table_id
+
+    def record(self, path: str, signature: Tuple[int, float, Optional[str]], table_id: str):
+        self.entries[path] = ManifestEntry(signature[0], signature[1], signature[2], table_id)
+
+    def remove(self, path: str):
+        self.entries.pop(path, None)
+
+    def scan(self, data_root: str, folders: List[str]) -> ManifestScan:
+        """
+        Compare the csv files in the folders with the manifest without modifying it, the caller records the results
+
+        :param data_root:
+        :param folders: folders relative to the data root
+        :return:
+        """
+        new, changed, touched, found = {}, {}, {}, set()
+        for folder in folders:
+            for file in os.listdir(os.path.join(data_root, folder)):
+                if not file.endswith('.csv'):
+                    continue
+                path = os.path.join(folder, file)
+                found.add(path)
+                size, mtime = self.file_stat(os.path.join(data_root, path))
+                entry = self.entries.get(path)
+                if entry is not None and (entry.size, entry.mtime) == (size, mtime):
+                    continue
+                if entry is None:
+                    new[path] = (size, mtime, None)
+                    continue
+                content_hash = self.content_hash(os.path.join(data_root, path))
+                if entry.content_hash != content_hash:
+                    changed[path] = (size, mtime, content_hash)
+                else:
+                    touched[path] = (size, mtime, content_hash)
+        folder_prefixes = tuple(os.path.join(folder, '') for folder in folders)
+        deleted = {path: entry for path, entry in self.entries.items()
+                   if path.startswith(folder_prefixes) and path not in found}
+        return ManifestScan(new, changed, touched, deleted)
+
+    def new_files(self, data_root: str, folders: List[str]) -> List[str]:
+        """
+        Csv files in the folders that are not in the manifest, without touching the files
+
+        :param data_root:
+        :param folders: folders relative to the data root
+        :return: paths relative to the data root
+        """
+        return [os.path.join(folder, file) for folder in folders
+                for file in os.listdir(os.path.join(data_root, folder))
+                if file.endswith('.csv') and os.path.join(folder, file) not in self.entries]
+
+    @staticmethod
+    def signature(file: str) -> Tuple[int, float, Optional[str]]:
+        # size and mtime of a file that is loaded, the content hash is only computed once the file changes
+        size, mtime = IngestManifest.file_stat(file)
+        return size, mtime, None
+
+    @staticmethod
+    def file_stat(file: str) -> Tuple[int, float]:
+        stat = os.stat(file)
+        size, mtime = stat.st_size, stat.st_mtime
+        meta_file = os.path.splitext(file)[0] + '.json'
+        if os.path.isfile(meta_file):
+            meta_stat = os.stat(meta_file)
+            size, mtime = size + meta_stat.st_size, max(mtime, meta_stat.st_mtime)
+        return size, mtime
+
+    @staticmethod
+    def content_hash(file: str) -> str:
+        digest = hashlib.blake2b(digest_size=16)
+        meta_file = os.path.splitext(file)[0] + '.json'
+        for path in (file, meta_file):
+            if not os.path.isfile(path):
+                continue
+            with open(path, 'rb') as in_file:
+                for chunk in iter(lambda: in_file.read(1 << 20), b''):
+                    digest.update(chunk)
+            digest.update(b'\0')
+        return digest.hexdigest()
@@ -0,0 +1,97 @@
+from typing import List, Tuple, Any, Iterable, Optional, Set, Dict
+
+import bisect
+
+
+class SortedMetaIndex:
+    """
+    Secondary index of one meta data key. Keeps (value, position, table id) entries sorted, where position is the
+    insertion position of the table in the data store, so that equal values keep the insertion order.
+    All values of the key have to be comparable with each other.
+    """
+
+    def __init__(self, key: str):
+        self.key: str = key
+        self._entries: List[Tuple[Any, int, str]] = []
+        self._table_ids: Dict[str, Tuple[Any, int, str]] = {}
+
+    def __contains__(self, table_id: str) -> bool:
+        return table_id in self._table_ids
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, table_id: str, value: Any, position: int):
+        entry = (value, position, table_id)
+        bisect.insort(self._entries, entry)
+        self._table_ids[table_id] = entry
+
+    def remove(self, table_id: str):
+        entry = self._table_ids.pop(table_id, None)
+        if entry is not None:
+            del self._entries[bisect.bisect_left(self._entries, entry)]
+
+    def range(self, low: Any = None, high: Any = None, include_low: bool = True, include_high: bool = True) \
+            -> List[str]:
+        """
+        Table ids with values between low and high in ascending value order
+
+        :param low:
+        :param high:
+        :param include_low:
+        :param include_high:
+        :return:
+        """
+        start = 0
+        end = len(self._entries)
+        if low is not None:
+            start = bisect.bisect_left(self._entries, (low,)) if include_low \
+                else bisect.bisect_right(self._entries, (low, float('inf')))
+        if high is not None:
+            end = bisect.bisect_right(self._entries, (high, float('inf'))) if include_high \
+                else bisect.bisect_left(self._entries, (high,))
+        return [table_id for _, _, table_id in self._entries[start:end]]
+
+    def values_in(self, values: Iterable[Any]) -> List[str]:
+        table_ids = []
+        for value in values:
+            table_ids.extend(self.range(value, value))
+        return table_ids
+
+    def ordered(self, descending: bool = False, candidates: Optional[Set[str]] = None) -> List[str]:
+        """
+        Table ids in value order, equal values in insertion order
+
+        :param descending:
+        :param candidates: only return these table ids
+        :return:
+        """
+        entries = self._descending() if descending else self._entries
+        return [table_id for _, _, table_id in entries if candidates is None or table_id in candidates]
+
+    def top_k(self, k: int, largest: bool = True, candidates: Optional[Set[str]] = None) -> List[str]:
+        """
+        The k table ids with the largest or smallest values, ties are broken by insertion order
+
+        :param k:
+        :param largest:
+        :param candidates: only consider these table ids
+        :return:
+        """
+        selected = []
+        if k == 0:
+            return selected
+        for _, _, table_id in self._descending() if largest else self._entries:
+            if candidates is None or table_id in candidates:
+                selected.append(table_id)
+                if len(selected) == k:
+                    break
+        return selected
+
+    def _descending(self) -> Iterable[Tuple[Any, int, str]]:
+        # descending values, but ascending positions within a group of equal values
+        end = len(self._entries)
+        while end > 0:
+            start = bisect.bisect_left(self._entries, (self._entries[end - 1][0],), 0, end)
+            yield from self._entries[start:end]
+            end = start
@@ -0,0 +1,82 @@
+"""
+Operators for the inclusive part of a meta data filter. Instead of a value that has to be equal, a meta data key can
+be mapped to an operator:
+
+    ({'trial': Range(10, 50), 'condition': In(['slow', 'fast'])}, {'subject': 3})
+    ({'session': TopK(5)}, {})
+
+Range and In select single tables, TopK keeps the k tables with the largest (or smallest) values among all tables that
+match the rest of the filter. Sorted meta data indexes (see DataStore.create_index) answer all of them without a scan.
+"""
+from typing import Any, Iterable
+
+
+class MetaOperator:
+
+    def matches(self, value: Any) -> bool:
+        raise NotImplementedError()
+
+
+class Range(MetaOperator):
+
+    def __init__(self, low: Any = None, high: Any = None, include_low: bool = True, include_high: bool = True):
+        """
+        Values between low and high, an unset bound is open.
+
+        :param low:
+        :param high:
+        :param include_low:
+        :param include_high:
+        """
+        self.low = low
+        self.high = high
+        self.include_low = include_low
+        self.include_high = include_high
+
+    def matches(self, value: Any) -> bool:
+        try:
+            if self.low is not None and (value < self.low or (value == self.low and not self.include_low)):
+                return False
+            if self.high is not None and (value > self.high or (value == self.high and not self.include_high)):
+                return False
+        except TypeError:
+            return False
+        return True
+
+    def __repr__(self):
+        return 'Range({!r}, {!r}, include_low={}, include_high={})'.format(self.low, self.high, self.include_low,
+                                                                           self.include_high)
+
+
+class In(MetaOperator):
+
+    def __init__(self, values: Iterable[Any]):
+        self.values = list(values)
+
+    def matches(self, value: Any) -> bool:
+        return value in self.values
+
+    def __repr__(self):
+        return 'In({!r})'.format(self.values)
+
+
+class TopK(MetaOperator):
+
+    def __init__(self, k: int, largest: bool = True):
+        """
+        The k tables with the largest values, or the smallest if largest is False. Ties are broken by insertion order.
+
+        :param k:
+        :param largest:
+        """
+        if k < 0:
+            raise ValueError('k has to be positive')
+        self.k = k
+        self.largest = largest
+
+    def matches(self, value: Any) -> bool:
+        # the selection happens on the query level, every table that has the key is a candidate
+        return True
+
+    def __repr__(self):
+        return 'TopK({}, largest={})'.format(self.k, self.largest)
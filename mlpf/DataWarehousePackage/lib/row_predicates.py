@@ -0,0 +1,125 @@
+"""
+Row filter predicates that the zone maps of the table statistics understand. They are used like any other row
+filter callable:
+
+    row_filter = [('t', Between(1., 2.)), (' human_x', GreaterThan(0.))]
+
+Tables whose column ranges rule out a match are skipped without evaluating the filter on their rows.
+"""
+from .table_statistics import ColumnStatistics
+from typing import Any
+
+import pandas as pd
+
+
+class RowPredicate:
+
+    def __call__(self, column: pd.Series) -> pd.Series:
+        raise NotImplementedError()
+
+    def may_match(self, statistics: ColumnStatistics, rows: int) -> bool:
+        """
+        False if no value within the zone map of the column can satisfy the predicate
+
+        :param statistics:
+        :param rows: amount of rows of the table
+        :return:
+        """
+        return True
+
+
+class _RangePredicate(RowPredicate):
+    # comparisons are never true for null values, a column of only nulls can not match
+
+    def may_match(self, statistics: ColumnStatistics, rows: int) -> bool:
+        if statistics.nulls >= rows:
+            return False
+        if statistics.minimum is None:
+            return True
+        try:
+            return self._range_may_match(statistics.minimum, statistics.maximum)
+        except TypeError:
+            return True
+
+    def _range_may_match(self, minimum: Any, maximum: Any) -> bool:
+        raise NotImplementedError()
+
+
+class Between(_RangePredicate):
+
+    def __init__(self, low: Any, high: Any, inclusive: bool = True):
+        self.low = low
+        self.high = high
+        self.inclusive = inclusive
+
+    def __call__(self, column: pd.Series) -> pd.Series:
+        if self.inclusive:
+            return (column >= self.low) & (column <= self.high)
+        return (column > self.low) & (column < self.high)
+
+    def _range_may_match(self, minimum: Any, maximum: Any) -> bool:
+        if self.inclusive:
+            return maximum >= self.low and minimum <= self.high
+        return maximum > self.low and minimum < self.high
+
+    def __repr__(self):
+        return 'Between({!r}, {!r}, inclusive={})'.format(self.low, self.high, self.inclusive)
+
+
+class GreaterThan(_RangePredicate):
+
+    def __init__(self, value: Any, inclusive: bool = False):
+        self.value = value
+        self.inclusive = inclusive
+
+    def __call__(self, column: pd.Series) -> pd.Series:
+        return column >= self.value if self.inclusive else column > self.value
+
+    def _range_may_match(self, minimum: Any, maximum: Any) -> bool:
+        return maximum >= self.value if self.inclusive else maximum > self.value
+
+    def __repr__(self):
+        return 'GreaterThan({!r}, inclusive={})'.format(self.value, self.inclusive)
+
+
+class LessThan(_RangePredicate):
+
+    def __init__(self, value: Any, inclusive: bool = False):
+        self.value = value
+        self.inclusive = inclusive
+
+    def __call__(self, column: pd.Series) -> pd.Series:
+        return column <= self.value if self.inclusive else column < self.value
+
+    def _range_may_match(self, minimum: Any, maximum: Any) -> bool:
+        return minimum <= self.value if self.inclusive else minimum < self.value
+
+    def __repr__(self):
+        return 'LessThan({!r}, inclusive={})'.format(self.value, self.inclusive)
+
+
+class Equals(_RangePredicate):
+
+    def __init__(self, value: Any):
+        self.value = value
+
+    def __call__(self, column: pd.Series) -> pd.Series:
+        return column == self.value
+
+    def _range_may_match(self, minimum: Any, maximum: Any) -> bool:
+        return minimum <= self.value <= maximum
+
+    def __repr__(self):
+        return 'Equals({!r})'.format(self.value)
+
+
+class NotNull(RowPredicate):
+
+    def __call__(self, column: pd.Series) -> pd.Series:
+        return column.notna()
+
+    def may_match(self, statistics: ColumnStatistics, rows: int) -> bool:
+        return statistics.nulls < rows
+
+    def __repr__(self):
+        return 'NotNull()'
@@ -0,0 +1,209 @@
+from ..data_warehouse import DataWarehouse
+from .table_statistics import TableStatistics
+from typing import List, Tuple, Callable, Union, Dict, Any, Optional
+from multiprocessing.connection import Connection, Listener
+
+import pandas as pd
+import logging
+import os
+
+
+class ShardService:
+    """
+    Executes the requests of a ShardedDataWarehouse on one shard, i.e. on a local DataWarehouse that holds a part of
+    the tables. All answers carry the table ids so that the coordinator can restore the global table order.
+    """
+
+    def __init__(self, data_root: str, deduplicate: bool = False):
+        self.data_root: str = data_root
+        self.warehouse: DataWarehouse = DataWarehouse(data_root, deduplicate)
+
+    def load_files(self, files: List[Tuple[str, str]], meta_data_keys: Union[List[str], None]) -> List[str]:
+        # file paths are relative to the data root, which may differ between the nodes
+        return [self.warehouse.load_data_file(os.path.join(self.data_root, file), meta_data_keys, table_id)
+                for file, table_id in files]
+
+    def reload_tables(self, table_ids: List[str], meta_data_keys: Union[List[str], None]):
+        for table_id in table_ids:
+            self.warehouse.reload_table(table_id, meta_data_keys)
+
+    def remove_tables(self, table_ids: List[str]):
+        for table_id in table_ids:
+            self.warehouse.remove_table(table_id)
+
+    def get_table_ids_by_meta_data(self, meta_filter: Tuple[Dict[str, Any], Dict[str, Any]]) -> List[str]:
+        return self.warehouse.get_table_ids_by_meta_data(meta_filter)
+
+    def get_data_by_id(self, table_id: str, columns: Union[List[str], None] = None,
+                       row_filter: Union[List[Tuple[str, Callable]], None] = None) -> pd.DataFrame:
+        return self.warehouse.get_data_by_id(table_id, columns, row_filter)
+
+    def get_meta_data_by_id(self, table_id: str) -> Dict[str, Any]:
+        return self.warehouse.get_meta_data_by_id(table_id)
+
+    def get_statistics_by_id(self, table_id: str) -> TableStatistics:
+        return self.warehouse.get_statistics_by_id(table_id)
+
+    def get_statistics_by_ids(self, table_ids: List[str]) -> List[Tuple[str, TableStatistics]]:
+        return [(table_id, self.warehouse.get_statistics_by_id(table_id)) for table_id in table_ids]
+
+    def get_meta_values(self, meta_filter: Tuple[Dict[str, Any], Dict[str, Any]],
+                        keys: List[str]) -> List[Tuple[str, Dict[str, Any]]]:
+        # the values of the keys for selecting and ordering the tables in the coordinator
+        values = []
+        for table_id in self.warehouse.get_table_ids_by_meta_data(meta_filter):
+            meta_data = self.warehouse.get_meta_data_by_id(table_id)
+            values.append((table_id, {key: meta_data[key] for key in keys if key in meta_data}))
+        return values
+
+    def get_statistics_by_meta_data(self, meta_filter: Tuple[Dict[str, Any], Dict[str, Any]]) -> Dict[str, Any]:
+        return self.warehouse.get_statistics_by_meta_data(meta_filter)
+
+    def get_data_by_meta_data(self, meta_filter: Tuple[Dict[str, Any], Dict[str, Any]],
+                              columns: Union[List[str], None] = None,
+                              row_filter: Union[List[Tuple[str, Callable]], None] = None) \
+            -> List[Tuple[str, pd.DataFrame]]:
+        return [(table_id, self.warehouse.get_data_by_id(table_id, columns, row_filter))
+                for table_id in self.warehouse.get_table_ids_by_meta_data(meta_filter)]
+
+    def get_complete_data_by_meta_data(self, meta_filter: Tuple[Dict[str, Any], Dict[str, Any]],
+                                       columns: Union[List[str], None] = None,
+                                       row_filter: Union[List[Tuple[str, Callable]], None] = None) \
+            -> List[Tuple[str, Tuple[pd.DataFrame, Dict[str, Any]]]]:
+        table_ids = self.warehouse.get_table_ids_by_meta_data(meta_filter)
+        return [(table_id, (self.warehouse.get_data_by_id(table_id, columns, row_filter),
+                            self.warehouse.get_meta_data_by_id(table_id)))
+                for table_id in table_ids]
+
+    def get_data_by_ids(self, table_ids: List[str], columns: Union[List[str], None] = None,
+                        row_filter: Union[List[Tuple[str, Callable]], None] = None) -> List[Tuple[str, pd.DataFrame]]:
+        return [(table_id, self.warehouse.get_data_by_id(table_id, columns, row_filter)) for table_id in table_ids]
+
+    def get_complete_data_by_ids(self, table_ids: List[str], columns: Union[List[str], None] = None,
+                                 row_filter: Union[List[Tuple[str, Callable]], None] = None) \
+            -> List[Tuple[str, Tuple[pd.DataFrame, Dict[str, Any]]]]:
+        return [(table_id, (self.warehouse.get_data_by_id(table_id, columns, row_filter),
+                            self.warehouse.get_meta_data_by_id(table_id)))
+                for table_id in table_ids]
+
+    def preprocessing_by_args(self, meta_filter: Tuple[Dict[str, Any], Dict[str, Any]], method_name: str,
+                              source_names: List[str], settings: Dict, mark_new: Tuple[str, Any],
+                              mark_old: Union[Tuple[str, Any], None], batch_mode: bool,
+                              stats: Any = None) -> List[Tuple[str, str]]:
+        source_ids = self.warehouse.get_table_ids_by_meta_data(meta_filter)
+        new_ids = self.warehouse.preprocessing_by_id(source_ids, method_name, source_names, settings, mark_new,
+                                                     mark_old, batch_mode, stats)
+        return list(zip(source_ids, new_ids))
+
+    def preprocessing_by_id(self, table_ids: List[str], method_name: str, source_names: List[str],
+                            settings: Dict, mark_new: Tuple[str, Any],
+                            mark_old: Union[Tuple[str, Any], None], batch_mode: bool, stats: Any = None) -> List[str]:
+        return self.warehouse.preprocessing_by_id(table_ids, method_name, source_names, settings, mark_new,
+                                                  mark_old, batch_mode, stats)
+
+    def preprocessor_needs_fit(self, method_name: str, settings: Dict) -> bool:
+        return self.warehouse.preprocessor_needs_fit(method_name, settings)
+
+    def partial_stats(self, table_ids: List[str], method_name: str, source_names: List[str], settings: Dict,
+                      workers: Optional[int] = None) -> Any:
+        return self.warehouse.partial_stats(table_ids, method_name, source_names, settings, workers)
+
+    def finalize_preprocessor(self, method_name: str, settings: Dict, stats: Any):
+        self.warehouse.finalize_preprocessor(method_name, settings, stats)
+
+    def add_meta_data(self, table_id: str, meta_data_update: Dict[str, Any]):
+        self.warehouse.add_meta_data(table_id, meta_data_update)
+
+    def mark_tables(self, table_ids: List[str], meta_data_update: Dict[str, Any]):
+        for table_id in table_ids:
+            self.warehouse.add_meta_data(table_id, meta_data_update)
+
+    def create_meta_index(self, key: str):
+        self.warehouse.create_meta_index(key)
+
+    def drop_meta_index(self, key: str):
+        self.warehouse.drop_meta_index(key)
+
+    def reset_preprocessor(self, method_name: str):
+        self.warehouse.reset_preprocessor(method_name)
+
+    def update_preprocessor_settings(self, method_name: str, new_settings: Dict):
+        self.warehouse.update_preprocessor_settings(method_name, new_settings)
+
+    def memory_report(self) -> Dict[str, int]:
+        return self.warehouse.memory_report()
+
+    def export_warehouse(self) -> DataWarehouse:
+        return self.warehouse
+
+    def import_warehouse(self, warehouse: DataWarehouse):
+        self.warehouse = warehouse
+
+
+def serve(connection: Connection, service: ShardService):
+    """
+    Answer requests of the form (command, args, kwargs) with ('ok', result) or ('error', exception) until the
+    connection is closed or a None request arrives.
+
+    :param connection:
+    :param service:
+    :return:
+    """
+    while True:
+        try:
+            request = connection.recv()
+        except EOFError:
+            return
+        if request is None:
+            return
+        command, args, kwargs = request
+        try:
+            if command.startswith('_') or not hasattr(service, command):
+                raise AttributeError('Unknown shard command {}'.format(command))
+            response = ('ok', getattr(service, command)(*args, **kwargs))
+        except Exception as error:
+            logging.exception('Shard command {} failed.'.format(command))
+            response = ('error', error)
+        try:
+            connection.send(response)
+        except Exception as error:
+            connection.send(('error', RuntimeError('Shard answer could not be sent: {!r}'.format(error))))
+
+
+def run_local_shard(connection: Connection, data_root: str, initializer: Optional[Callable] = None,
+                    deduplicate: bool = False):
+    """
+    Process target of a shard that is started by ShardedDataWarehouse itself
+
+    :param connection:
+    :param data_root:
+    :param initializer: called once in the worker, e.g. to register custom preprocessors
+    :param deduplicate: store tables with identical data only once within the shard
+    :return:
+    """
+    if initializer is not None:
+        initializer()
+    serve(connection, ShardService(data_root, deduplicate))
+    connection.close()
+
+
+def run_shard_server(address: Union[str, Tuple[str, int]], authkey: bytes, data_root: str,
+                     initializer: Optional[Callable] = None, deduplicate: bool = False):
+    """
+    Serve one shard on a (remote) node. A ShardedDataWarehouse connects to it with ShardedDataWarehouse.connect.
+    The shard keeps its tables between coordinator connections.
+
+    :param address: tcp (host, port) or a unix socket path
+    :param authkey: shared secret of coordinator and shards
+    :param data_root: data root of the shard node
+    :param initializer: called once before serving, e.g. to register custom preprocessors
+    :param deduplicate: store tables with identical data only once within the shard
+    :return:
+    """
+    if initializer is not None:
+        initializer()
+    service = ShardService(data_root, deduplicate)
+    with Listener(address, authkey=authkey) as listener:
+        while True:
+            with listener.accept() as connection:
+                serve(connection, service)
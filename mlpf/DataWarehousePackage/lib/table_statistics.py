@@ -0,0 +1,109 @@
+from typing import Dict, Any, List
+
+import numpy as np
+import pandas as pd
+
+
+class ColumnStatistics:
+    """
+    Zone map of one column: minimum and maximum of the non null values (None if unknown, e.g. for non numeric
+    columns or columns without values) and the amount of null values.
+    """
+
+    def __init__(self, minimum: Any, maximum: Any, nulls: int):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.nulls: int = nulls
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'min': self.minimum, 'max': self.maximum, 'nulls': self.nulls}
+
+    def __repr__(self):
+        return 'ColumnStatistics(min={!r}, max={!r}, nulls={})'.format(self.minimum, self.maximum, self.nulls)
+
+
+class TableStatistics:
+    """
+    Row count and per column zone maps of a data table, recorded when the table enters the data store.
+    """
+
+    def __init__(self, rows: int, columns: Dict[str, ColumnStatistics]):
+        self.rows: int = rows
+        self.columns: Dict[str, ColumnStatistics] = columns
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame):
+        nulls = frame.isna().sum()
+        numeric = frame.select_dtypes(include='number')
+        minimum = numeric.min() if len(numeric.columns) else pd.Series(dtype=float)
+        maximum = numeric.max() if len(numeric.columns) else pd.Series(dtype=float)
+        columns = {}
+        for column in frame.columns:
+            low = minimum.get(column)
+            if low is None or pd.isna(low):
+                columns[column] = ColumnStatistics(None, None, int(nulls[column]))
+            else:
+                columns[column] = ColumnStatistics(_python_value(low), _python_value(maximum[column]),
+                                                   int(nulls[column]))
+        return cls(len(frame), columns)
+
+    @staticmethod
+    def summarize(statistics: List['TableStatistics']) -> Dict[str, Any]:
+        """
+        Combine the statistics of several tables into total rows and per column min, max and nulls
+
+        :param statistics:
+        :return:
+        """
+        columns: Dict[str, Dict[str, Any]] = {}
+        for table_statistics in statistics:
+            for column, column_statistics in table_statistics.columns.items():
+                summary = columns.setdefault(column, {'min': None, 'max': None, 'nulls': 0})
+                summary['nulls'] += column_statistics.nulls
+                if column_statistics.minimum is not None:
+                    summary['min'] = column_statistics.minimum if summary['min'] is None \
+                        else min(summary['min'], column_statistics.minimum)
+                    summary['max'] = column_statistics.maximum if summary['max'] is None \
+                        else max(summary['max'], column_statistics.maximum)
+        return {'tables': len(statistics), 'rows': sum(table_statistics.rows for table_statistics in statistics),
+                'columns': columns}
+
+    @staticmethod
+    def merge_summaries(summaries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Combine summaries of disjoint sets of tables, e.g. of several shards
+
+        :param summaries:
+        :return:
+        """
+        partial = [TableStatistics(summary['rows'], {column: ColumnStatistics(values['min'], values['max'],
+                                                                              values['nulls'])
+                                                     for column, values in summary['columns'].items()})
+                   for summary in summaries]
+        merged = TableStatistics.summarize(partial)
+        merged['tables'] = sum(summary['tables'] for summary in summaries)
+        return merged
+
+    def may_match(self, selectors: List) -> bool:
+        """
+        False if the zone maps prove that no row passes all row predicates of the selectors. Plain callables can
+        not be checked and never rule a table out.
+
+        :param selectors: row filter as (column, predicate) pairs
+        :return:
+        """
+        for column, predicate in selectors:
+            may_match = getattr(predicate, 'may_match', None)
+            if may_match is None or column not in self.columns:
+                continue
+            if not may_match(self.columns[column], self.rows):
+                return False
+        return True
+
+    def __repr__(self):
+        return 'TableStatistics(rows={}, columns={})'.format(self.rows, self.columns)
+
+
+def _python_value(value: Any) -> Any:
+    # plain python values keep the statistics picklable and json serializable
+    return value.item() if isinstance(value, np.generic) else value
@@ -0,0 +1,130 @@
+from typing import List, Tuple, Dict, Any, Iterator, Optional, Union
+from numpy.lib.stride_tricks import sliding_window_view
+
+import numpy as np
+import pandas as pd
+
+
+class WindowDataset:
+    """
+    All sliding windows over a list of tables. A window consists of window rows followed by horizon target rows and
+    starts every stride rows. Windows are read only strided views of one array per table, so no window is ever
+    copied. The array of a table is the frame's own memory if pandas holds all selected columns in one numeric
+    block. DataTable stores csv files whose columns share one numeric dtype that way, as do the built-in
+    preprocessors. Otherwise, e.g. for mixed dtypes or after a row filter, the table is copied into an array once.
+
+    Window i is located by index(i) as (table id, offset of its first row in the table).
+    """
+
+    def __init__(self, tables: List[Tuple[str, pd.DataFrame, Dict[str, Any]]], window: int, stride: int = 1,
+                 horizon: int = 0):
+        """
+        :param tables: (table id, frame, meta data) of every table, all frames need the same columns
+        :param window: rows of the input part of a window
+        :param stride: rows between the starts of two consecutive windows of a table
+        :param horizon: rows of the target part directly after the input part
+        """
+        if window < 1 or stride < 1 or horizon < 0:
+            raise ValueError('window and stride have to be at least one and horizon must not be negative.')
+        self.window: int = window
+        self.stride: int = stride
+        self.horizon: int = horizon
+        self.columns: List[str] = list(tables[0][1].columns) if tables else []
+        self.table_ids: List[str] = []
+        self.meta_data: List[Dict[str, Any]] = []
+        self._views: List[np.ndarray] = []
+        counts = []
+        for table_id, frame, meta_data in tables:
+            if list(frame.columns) != self.columns:
+                raise ValueError('All tables need the same columns, got {} and {}.'.format(self.columns,
+                                                                                         list(frame.columns)))
+            self.table_ids.append(table_id)
+            self.meta_data.append(meta_data)
+            self._views.append(self._table_view(frame))
+            counts.append(len(self._views[-1]))
+        counts = np.asarray(counts, dtype=np.int64)
+        self._first_window: np.ndarray = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=self._first_window[1:])
+        self._table_of_window: np.ndarray = np.repeat(np.arange(len(counts)), counts)
+
+    def __len__(self) -> int:
+        return int(self._first_window[-1])
+
+    def __getitem__(self, i: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Window i as (input rows of shape (window, columns), target rows of shape (horizon, columns)), both views
+
+        :param i:
+        :return:
+        """
+        table, position = self._locate(i)
+        view = self._views[table][position]
+        return view[:self.window], view[self.window:]
+
+    def __iter__(self) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        return (self[i] for i in range(len(self)))
+
+    def index(self, i: int) -> Tuple[str, int]:
+        """
+        Table id and row offset of window i
+
+        :param i:
+        :return:
+        """
+        table, position = self._locate(i)
+        return self.table_ids[table], position * self.stride
+
+    def table_windows(self, table_id: str) -> np.ndarray:
+        """
+        All windows of one table as a single view of shape (windows, window + horizon, columns)
+
+        :param table_id:
+        :return:
+        """
+        return self._views[self.table_ids.index(table_id)]
+
+    def get_batch(self, indices: Union[List[int], np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Stack the windows with the given indices into (batch, window, columns) inputs and (batch, horizon, columns)
+        targets. Unlike single windows, a batch is a new array.
+
+        :param indices:
+        :return:
+        """
+        windows = [self._views[table][position] for table, position in (self._locate(i) for i in indices)]
+        stacked = np.stack(windows) if windows else np.empty((0, self.window + self.horizon, len(self.columns)))
+        return stacked[:, :self.window], stacked[:, self.window:]
+
+    def batches(self, batch_size: int, shuffle: bool = False, seed: Optional[int] = None) \
+            -> Iterator[Tuple[np.ndarray, np.ndarray, List[Tuple[str, int]]]]:
+        """
+        Iterate over all windows in batches of (inputs, targets, window index), optionally in random order
+
+        :param batch_size:
+        :param shuffle:
+        :param seed:
+        :return:
+        """
+        order = np.random.default_rng(seed).permutation(len(self)) if shuffle else np.arange(len(self))
+        for start in range(0, len(order), batch_size):
+            indices = order[start:start + batch_size]
+            inputs, targets = self.get_batch(indices)
+            yield inputs, targets, [self.index(i) for i in indices]
+
+    def _locate(self, i: int) -> Tuple[int, int]:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError('Window index {} out of range for {} windows.'.format(i, len(self)))
+        table = int(self._table_of_window[i])
+        return table, int(i - self._first_window[table])
+
+    def _table_view(self, frame: pd.DataFrame) -> np.ndarray:
+        values = frame.to_numpy()
+        if not np.issubdtype(values.dtype, np.number):
+            values = frame.to_numpy(dtype=float)
+        length = self.window + self.horizon
+        if len(values) < length:
+            return np.empty((0, length, values.shape[1]), dtype=values.dtype)
+        # sliding_window_view appends the window axis, swapping it with the column axis keeps it a view
+        return sliding_window_view(values, length, axis=0)[::self.stride].swapaxes(1, 2)
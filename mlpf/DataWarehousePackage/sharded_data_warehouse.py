@@ -0,0 +1,719 @@
+from .lib.data_table import DataTable
+from .lib.shard_worker import run_local_shard
+from .lib import data_aggregation
+from .lib.ingest_manifest import IngestManifest
+from .lib.meta_query import Range, TopK
+from .lib.table_statistics import TableStatistics
+from .lib.window_dataset import WindowDataset
+from ..AlgorithmPackage.preprocessing import preprocessing_factory
+from typing import List, Tuple, Callable, Union, Dict, Any, Optional, AsyncIterator
+from concurrent.futures import Executor
+from functools import reduce
+from multiprocessing.connection import Client, Connection
+from multiprocessing.reduction import ForkingPickler
+
+import asyncio
+import multiprocessing
+import pandas as pd
+import os
+import pickle
+import threading
+import uuid
+import zlib
+
+
+class ShardedDataWarehouse:
+    """
+    DataWarehouse whose tables are partitioned over shards in worker processes. It offers the method surface of
+    DataWarehouse: queries and preprocessing are scattered to all shards in parallel and the results are gathered in
+    the global insertion order of the tables, so they match the results of a single DataWarehouse.
+
+    Tables are assigned to a shard by a hash of their table id or, if partition_key is set, of that meta data key.
+    Preprocessed tables stay on the shard of their source table. Batch preprocessing therefore only sees the tables
+    of one shard at a time.
+
+    Shards communicate through multiprocessing connections only, so they can run as local processes or, with
+    ShardedDataWarehouse.connect, as shard servers (see shard_worker.run_shard_server) on other nodes.
+    Row filters that cannot be pickled, e.g. lambdas, are evaluated in the coordinator instead of the shards.
+    Top-k filters and ordered retrieval need the global order of the meta data values: the shards send their
+    candidates with the values, the coordinator selects and orders them and fetches the tables by id.
+
+    A shard answers one request at a time. Threads sharing the coordinator therefore take turns for each round trip
+    to the shards, while the shards of one round trip still work in parallel. If a round trip breaks off, e.g.
+    because a shard died, the connections are closed and every later request raises a RuntimeError.
+
+    Local shards are started with forkserver, or spawn where it is not available, never forked from the coordinator:
+    a fork copies locks that other threads hold at that moment. Scripts creating local shards therefore need the
+    usual `if __name__ == '__main__':` guard.
+    """
+
+    def __init__(self, data_root: str, shards: int = 2, partition_key: Optional[str] = None,
+                 initializer: Optional[Callable] = None, deduplicate: bool = False):
+        """
+        Start the shards as local worker processes.
+
+        :param data_root:
+        :param shards: amount of worker processes
+        :param partition_key: meta data key to partition by, partition by table id if None
+        :param initializer: picklable function called once in every worker, e.g. to register custom preprocessors
+        :param deduplicate: store tables with identical data only once within each shard
+        """
+        if shards < 1:
+            raise ValueError('A sharded data warehouse needs at least one shard.')
+        self._data_root: str = data_root
+        self._partition_key: Optional[str] = partition_key
+        self._initializer: Optional[Callable] = initializer
+        self._deduplicate: bool = deduplicate
+        self._table_shards: Dict[str, int] = {}
+        self._table_positions: Dict[str, int] = {}
+        self._next_position: int = 0
+        self._manifest: IngestManifest = IngestManifest()
+        self._connections: List[Connection] = []
+        self._processes: List[multiprocessing.Process] = []
+        self._request_lock: threading.Lock = threading.Lock()
+        # error of the round trip that broke the connections to the shards
+        self._failure: Optional[BaseException] = None
+        self._start_local_shards(shards)
+
+    @classmethod
+    def connect(cls, data_root: str, addresses: List[Union[str, Tuple[str, int]]], authkey: bytes,
+                partition_key: Optional[str] = None):
+        """
+        Use already running shard servers instead of local worker processes. The file paths sent to the shards are
+        relative to the data root, every node resolves them against its own data root.
+
+        :param data_root:
+        :param addresses:
+        :param authkey:
+        :param partition_key:
+        :return:
+        """
+        warehouse = cls.__new__(cls)
+        warehouse._data_root = data_root
+        warehouse._partition_key = partition_key
+        warehouse._initializer = None
+        warehouse._deduplicate = False
+        warehouse._table_shards = {}
+        warehouse._table_positions = {}
+        warehouse._next_position = 0
+        warehouse._manifest = IngestManifest()
+        warehouse._processes = []
+        warehouse._request_lock = threading.Lock()
+        warehouse._failure = None
+        warehouse._connections = [Client(address, authkey=authkey) for address in addresses]
+        return warehouse
+
+    @property
+    def shards(self) -> int:
+        return len(self._connections)
+
+    def close(self):
+        """
+        Stop the local worker processes and close the connections to all shards
+
+        :return:
+        """
+        for connection in self._connections:
+            try:
+                connection.send(None)
+            except (OSError, EOFError):
+                pass
+            connection.close()
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._connections = []
+        self._processes = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def load_data_folders(self, folders=List[str], meta_data_keys: Union[List[str], None] = None) -> List[str]:
+        """
+        Load all csv files in a folder, distributed over the shards. Files that are already loaded keep their table,
+        see DataWarehouse.load_data_folders.
+
+        :param folders:
+        :param meta_data_keys:
+        :return: ids of the tables of all csv files of the folders
+        """
+        files = []
+        for folder in folders:
+            for file in os.listdir(os.path.join(self._data_root, folder)):
+                if file.endswith('.csv'):
+                    files.append(os.path.join(folder, file))
+        new_files = [file for file in files if file not in self._manifest]
+        signatures = [self._manifest.signature(os.path.join(self._data_root, file)) for file in new_files]
+        for file, signature, table_id in zip(new_files, signatures, self._load_files(new_files, meta_data_keys)):
+            self._manifest.record(file, signature, table_id)
+        return [self._manifest.table_id(file) for file in files]
+
+    def refresh_data_folders(self, folders: List[str], meta_data_keys: Union[List[str], None] = None,
+                             deleted_mark: Union[Tuple[str, Any], None] = None) \
+            -> Tuple[List[str], List[str], List[str]]:
+        """
+        Bring the tables of the folders up to date with the csv files, see DataWarehouse.refresh_data_folders.
+        New files are distributed over the shards, changed and deleted files are handled by the shard of their table.
+
+        :param folders:
+        :param meta_data_keys:
+        :param deleted_mark: mark the tables of deleted files with this meta data instead of dropping them
+        :return: ids of the added, reloaded and deleted tables
+        """
+        scan = self._manifest.scan(self._data_root, folders)
+        new_files = list(scan.new)
+        added = self._load_files(new_files, meta_data_keys)
+        for file, table_id in zip(new_files, added):
+            self._manifest.record(file, scan.new[file], table_id)
+        reloaded = [self._manifest.table_id(file) for file in scan.changed]
+        self._request({shard: ('reload_tables', (table_ids, meta_data_keys), {})
+                       for shard, table_ids in self._group_by_shard(reloaded).items()})
+        for file, signature in {**scan.changed, **scan.touched}.items():
+            self._manifest.record(file, signature, self._manifest.table_id(file))
+        deleted = [entry.table_id for entry in scan.deleted.values()]
+        if deleted_mark is None:
+            self._request({shard: ('remove_tables', (table_ids,), {})
+                           for shard, table_ids in self._group_by_shard(deleted).items()})
+            for table_id in deleted:
+                self._table_shards.pop(table_id)
+                self._table_positions.pop(table_id)
+        else:
+            self._request({shard: ('mark_tables', (table_ids, dict([deleted_mark])), {})
+                           for shard, table_ids in self._group_by_shard(deleted).items()})
+        for file in scan.deleted:
+            self._manifest.remove(file)
+        return added, reloaded, deleted
+
+    async def ingest_data_folders(self, folders: List[str], meta_data_keys: Union[List[str], None] = None,
+                                  executor: Optional[Executor] = None) -> AsyncIterator[str]:
+        """
+        Load the csv files of the folders that are not loaded yet and yield the table ids while the remaining files
+        are loaded, see DataWarehouse.ingest_data_folders. Every round trip hands one file to each shard, the next
+        round trip is already running while the ids of the current one are consumed.
+
+        :param folders:
+        :param meta_data_keys:
+        :param executor: executor that waits for the shards, the default executor of the event loop if None
+        :return:
+        """
+        loop = asyncio.get_running_loop()
+        # only list the files here, they are stated and loaded in the executor
+        files = self._manifest.new_files(self._data_root, folders)
+        chunks = [files[start:start + self.shards] for start in range(0, len(files), self.shards)]
+
+        def load(chunk: List[str]) -> List[str]:
+            signatures = [self._manifest.signature(os.path.join(self._data_root, file)) for file in chunk]
+            table_ids = self._load_files(chunk, meta_data_keys)
+            for file, signature, table_id in zip(chunk, signatures, table_ids):
+                self._manifest.record(file, signature, table_id)
+            return table_ids
+
+        loading = None
+        for index, chunk in enumerate(chunks):
+            current = loading or loop.run_in_executor(executor, load, chunk)
+            table_ids = await current
+            # files loaded ahead are kept even if the consumer stops early
+            loading = loop.run_in_executor(executor, load, chunks[index + 1]) if index + 1 < len(chunks) else None
+            for table_id in table_ids:
+                yield table_id
+
+    def load_data_file(self, file: str, meta_data_keys: Union[List[str], None]) -> str:
+        """
+        Load a csv file into a data table on one of the shards
+
+        :param file: path relative to the data root
+        :param meta_data_keys:
+        :return:
+        """
+        if not file.endswith('.csv'):
+            raise ValueError('specified file has to be a .csv file')
+        return self._load_files([os.path.relpath(file, self._data_root) if os.path.isabs(file) else file],
+                                meta_data_keys)[0]
+
+    def reload_table(self, table_id: str, meta_data_keys: Union[List[str], None]):
+        """
+        Load the csv file of a table again on its shard, the table keeps its id
+
+        :param table_id:
+        :param meta_data_keys:
+        :return:
+        """
+        self._request({self._table_shards[table_id]: ('reload_tables', ([table_id], meta_data_keys), {})})
+
+    def remove_table(self, table_id: str):
+        """
+        Remove a data table from its shard
+
+        :param table_id:
+        :return:
+        """
+        self._request({self._table_shards.pop(table_id): ('remove_tables', ([table_id],), {})})
+        self._table_positions.pop(table_id)
+
+    def preprocessing_by_args(self, meta_filter: Tuple[Dict[str, Any], Dict[str, Any]], method_name: str,
+                              source_names: List[str], settings: Dict, mark_new: Tuple[str, Any],
+                              mark_old: Union[Tuple[str, Any], None], batch_mode: bool) -> List[str]:
+        """
+        Preprocess all data tables that fit the filters, every shard preprocesses its own tables. A preprocessor
+        that needs a fit is fitted on the tables of all shards for this call, see DataWarehouse.preprocessing_by_id.
+
+        :param meta_filter:
+        :param method_name:
+        :param source_names:
+        :param settings:
+        :param mark_new:
+        :param mark_old:
+        :param batch_mode:
+        :return:
+        """
+        if self._ordered_ids(meta_filter, None, False) is not None:
+            # a top-k filter only holds on all shards together, the shards get the selected ids
+            return self.preprocessing_by_id(self.get_table_ids_by_meta_data(meta_filter), method_name, source_names,
+                                            settings, mark_new, mark_old, batch_mode)
+        stats = None
+        if any(self._scatter('preprocessor_needs_fit', method_name, settings)):
+            table_ids = self.get_table_ids_by_meta_data(meta_filter)
+            if not table_ids:
+                return []
+            stats = self._merged_stats(table_ids, method_name, source_names, settings)
+        answers = self._scatter('preprocessing_by_args', meta_filter, method_name, source_names, settings, mark_new,
+                                mark_old, batch_mode, stats)
+        new_ids = self._gather_ordered(answers)
+        for shard, answer in enumerate(answers):
+            for _, new_id in answer:
+                self._table_shards[new_id] = shard
+        self._append_positions(new_ids)
+        return new_ids
+
+    def preprocessing_by_id(self, table_ids: List[str], method_name: str, source_names: List[str],
+                            settings: Dict, mark_new: Tuple[str, Any],
+                            mark_old: Union[Tuple[str, Any], None], batch_mode: bool) -> List[str]:
+        """
+        Preprocess all data tables specified in the id list, a preprocessor that needs a fit is fitted on them first,
+        see preprocessing_by_args.
+
+        :param table_ids:
+        :param method_name:
+        :param source_names:
+        :param settings:
+        :param mark_new:
+        :param mark_old:
+        :param batch_mode:
+        :return:
+        """
+        if not table_ids:
+            return []
+        stats = None
+        if any(self._scatter('preprocessor_needs_fit', method_name, settings)):
+            stats = self._merged_stats(table_ids, method_name, source_names, settings)
+        shard_ids: Dict[int, List[str]] = {}
+        for table_id in table_ids:
+            shard_ids.setdefault(self._table_shards[table_id], []).append(table_id)
+        requests = {shard: ('preprocessing_by_id', (ids, method_name, source_names, settings, mark_new, mark_old,
+                                                    batch_mode, stats), {})
+                    for shard, ids in shard_ids.items()}
+        answers = self._request(requests)
+        new_id_by_source: Dict[str, str] = {}
+        for shard, ids in shard_ids.items():
+            new_id_by_source.update(zip(ids, answers[shard]))
+            for new_id in answers[shard]:
+                self._table_shards[new_id] = shard
+        new_ids = [new_id_by_source[table_id] for table_id in table_ids]
+        self._append_positions(new_ids)
+        return new_ids
+
+    def fit_preprocessor(self, table_ids: List[str], method_name: str, source_names: List[str], settings: Dict,
+                         workers: Optional[int] = None):
+        """
+        Fit a preprocessor on the tables of all shards, see DataWarehouse.fit_preprocessor. Every shard computes the
+        statistics of its own tables, the coordinator merges them and fits the preprocessors of all shards with the
+        result. The preprocessor has to be registered in the coordinator as well.
+
+        :param table_ids:
+        :param method_name:
+        :param source_names:
+        :param settings:
+        :param workers: amount of threads per shard
+        :return:
+        """
+        self._scatter('finalize_preprocessor', method_name, settings,
+                      self._merged_stats(table_ids, method_name, source_names, settings, workers))
+
+    def _merged_stats(self, table_ids: List[str], method_name: str, source_names: List[str], settings: Dict,
+                      workers: Optional[int] = None) -> Any:
+        # every shard merges the statistics of its own tables, the coordinator merges the shards in shard order
+        if not table_ids:
+            raise ValueError('A preprocessor can not be fitted without tables.')
+        answers = self._request({shard: ('partial_stats', (ids, method_name, source_names, settings, workers), {})
+                                 for shard, ids in self._group_by_shard(table_ids).items()})
+        merger = preprocessing_factory.create_preprocessor(method_name, settings)
+        return reduce(merger.merge, [answers[shard] for shard in sorted(answers)])
+
+    def get_data_by_id(self, table_id: str, columns: Union[List[str], None] = None,
+                       row_filter: Union[List[Tuple[str, Callable]], None] = None) -> pd.DataFrame:
+        """
+        Retrieve data of the data table id.
+
+        :param table_id:
+        :param columns:
+        :param row_filter:
+        :return:
+        """
+        shard = self._table_shards[table_id]
+        if self._is_picklable(row_filter):
+            return self._request({shard: ('get_data_by_id', (table_id, columns, row_filter), {})})[shard]
+        frame = self._request({shard: ('get_data_by_id', (table_id, self._filter_columns(columns, row_filter),
+                                                          None), {})})[shard]
+        return self._apply_row_filter(frame, columns, row_filter)
+
+    def get_data_by_meta_data(self, meta_filter: Tuple[Dict[str, Any], Dict[str, Any]],
+                              columns: Union[List[str], None] = None,
+                              row_filter: Union[List[Tuple[str, Callable]], None] = None,
+                              order_by: Optional[str] = None, descending: bool = False) -> List[pd.DataFrame]:
+        """
+        Retrieve the data that matches the filter.
+
+        :param meta_filter:
+        :param columns:
+        :param row_filter:
+        :param order_by: meta data key to order the tables by, insertion order if None
+        :param descending:
+        :return:
+        """
+        picklable = self._is_picklable(row_filter)
+        query = (columns, row_filter) if picklable else (self._filter_columns(columns, row_filter), None)
+        table_ids = self._ordered_ids(meta_filter, order_by, descending)
+        if table_ids is None:
+            frames = self._gather_ordered(self._scatter('get_data_by_meta_data', meta_filter, *query))
+        else:
+            frames = self._gather_by_ids('get_data_by_ids', table_ids, *query)
+        if picklable:
+            return frames
+        return [self._apply_row_filter(frame, columns, row_filter) for frame in frames]
+
+    def get_complete_data_by_meta_data(self, meta_filter: Tuple[Dict[str, Any], Dict[str, Any]],
+                                       columns: Union[List[str], None] = None,
+                                       row_filter: Union[List[Tuple[str, Callable]], None] = None,
+                                       order_by: Optional[str] = None, descending: bool = False) \
+            -> List[Tuple[pd.DataFrame, Dict[str, Any]]]:
+        """
+        Retrieve the complete data tables by matching filters.
+
+        :param meta_filter:
+        :param columns:
+        :param row_filter:
+        :param order_by: meta data key to order the tables by, insertion order if None
+        :param descending:
+        :return:
+        """
+        picklable = self._is_picklable(row_filter)
+        query = (columns, row_filter) if picklable else (self._filter_columns(columns, row_filter), None)
+        table_ids = self._ordered_ids(meta_filter, order_by, descending)
+        if table_ids is None:
+            tables = self._gather_ordered(self._scatter('get_complete_data_by_meta_data', meta_filter, *query))
+        else:
+            tables = self._gather_by_ids('get_complete_data_by_ids', table_ids, *query)
+        if picklable:
+            return tables
+        return [(self._apply_row_filter(frame, columns, row_filter), meta_data) for frame, meta_data in tables]
+
+    def get_windows_by_meta_data(self, meta_filter: Tuple[Dict[str, Any], Dict[str, Any]], window: int,
+                                 stride: int = 1, horizon: int = 0, columns: Union[List[str], None] = None,
+                                 row_filter: Union[List[Tuple[str, Callable]], None] = None,
+                                 order_by: Optional[str] = None, descending: bool = False) -> WindowDataset:
+        """
+        Retrieve all sliding windows over the data tables that match the filter. The tables are transferred from
+        the shards once, the windows are views of the transferred tables.
+
+        :param meta_filter:
+        :param window:
+        :param stride:
+        :param horizon:
+        :param columns:
+        :param row_filter:
+        :param order_by: meta data key to order the tables by, insertion order if None
+        :param descending:
+        :return:
+        """
+        tables = self.get_complete_data_by_meta_data(meta_filter, columns, row_filter, order_by, descending)
+        table_ids = self.get_table_ids_by_meta_data(meta_filter, order_by, descending)
+        return WindowDataset([(table_id, frame, meta_data) for table_id, (frame, meta_data) in zip(table_ids, tables)],
+                             window, stride, horizon)
+
+    def get_statistics_by_id(self, table_id: str) -> TableStatistics:
+        """
+        Retrieve the row count and column zone maps of the data table id from its shard.
+
+        :param table_id:
+        :return:
+        """
+        shard = self._table_shards[table_id]
+        return self._request({shard: ('get_statistics_by_id', (table_id,), {})})[shard]
+
+    def get_statistics_by_meta_data(self, meta_filter: Tuple[Dict[str, Any], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Summarize the tables that match the filter from the statistics catalogs of all shards.
+
+        :param meta_filter:
+        :return:
+        """
+        table_ids = self._ordered_ids(meta_filter, None, False)
+        if table_ids is not None:
+            return TableStatistics.summarize(self._gather_by_ids('get_statistics_by_ids', table_ids))
+        return TableStatistics.merge_summaries(self._scatter('get_statistics_by_meta_data', meta_filter))
+
+    def get_meta_data_by_id(self, table_id: str) -> Dict[str, Any]:
+        """
+        Retrieve the meta data of the data table id.
+
+        :param table_id:
+        :return:
+        """
+        shard = self._table_shards[table_id]
+        return self._request({shard: ('get_meta_data_by_id', (table_id,), {})})[shard]
+
+    def get_table_ids_by_meta_data(self, meta_filter: Tuple[Dict[str, Any], Dict[str, Any]],
+                                   order_by: Optional[str] = None, descending: bool = False) -> List[str]:
+        """
+        Retrieve the ids of the data tables that match the filter.
+
+        :param meta_filter:
+        :param order_by: meta data key to order the tables by, insertion order if None. Tables without the key
+        come last.
+        :param descending:
+        :return:
+        """
+        table_ids = self._ordered_ids(meta_filter, order_by, descending)
+        if table_ids is not None:
+            return table_ids
+        answers = self._scatter('get_table_ids_by_meta_data', meta_filter)
+        return sorted((table_id for answer in answers for table_id in answer), key=self._table_positions.get)
+
+    def memory_report(self) -> Dict[str, int]:
+        """
+        Memory of the stored tables summed over all shards, tables are only deduplicated within a shard
+
+        :return:
+        """
+        report: Dict[str, int] = {}
+        for shard_report in self._scatter('memory_report'):
+            for key, value in shard_report.items():
+                report[key] = report.get(key, 0) + value
+        return report
+
+    def add_meta_data(self, table_id: str, meta_data_update: Dict[str, Any]):
+        """
+        Enrich a data table with new meta data
+
+        :param table_id:
+        :param meta_data_update:
+        :return:
+        """
+        shard = self._table_shards[table_id]
+        self._request({shard: ('add_meta_data', (table_id, meta_data_update), {})})
+
+    def create_meta_index(self, key: str):
+        """
+        Create a sorted index on a meta data key on all shards
+
+        :param key:
+        :return:
+        """
+        self._scatter('create_meta_index', key)
+
+    def drop_meta_index(self, key: str):
+        """
+        Remove the index of a meta data key on all shards
+
+        :param key:
+        :return:
+        """
+        self._scatter('drop_meta_index', key)
+
+    def reset_preprocessor(self, method_name: str):
+        """
+        Reset the state of the Preprocessor on all shards
+
+        :param method_name:
+        :return:
+        """
+        self._scatter('reset_preprocessor', method_name)
+
+    def update_preprocessor_settings(self, method_name: str, new_settings: Dict):
+        """
+        Update the settings of the specified preprocessor on all shards
+
+        :param method_name:
+        :param new_settings:
+        :return:
+        """
+        self._scatter('update_preprocessor_settings', method_name, new_settings)
+
+    def __getstate__(self):
+        # The shards are pickled as plain data warehouses and restarted as local processes when unpickled
+        return {'data_root': self._data_root, 'partition_key': self._partition_key,
+                'initializer': self._initializer, 'deduplicate': self._deduplicate, 'table_shards': self._table_shards,
+                'table_positions': self._table_positions, 'next_position': self._next_position,
+                'manifest': self._manifest, 'warehouses': self._scatter('export_warehouse')}
+
+    def __setstate__(self, state):
+        self._data_root = state['data_root']
+        self._partition_key = state['partition_key']
+        self._initializer = state['initializer']
+        self._deduplicate = state['deduplicate']
+        self._table_shards = state['table_shards']
+        self._table_positions = state['table_positions']
+        self._next_position = state['next_position']
+        self._manifest = state['manifest']
+        self._connections = []
+        self._processes = []
+        self._request_lock = threading.Lock()
+        self._failure = None
+        self._start_local_shards(len(state['warehouses']))
+        self._request({shard: ('import_warehouse', (warehouse,), {})
+                       for shard, warehouse in enumerate(state['warehouses'])})
+
+    def _start_local_shards(self, shards: int):
+        # a forked shard would inherit locks that other threads of the coordinator hold at that moment
+        method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        context = multiprocessing.get_context(method)
+        for _ in range(shards):
+            parent_connection, child_connection = context.Pipe()
+            process = context.Process(target=run_local_shard, args=(child_connection, self._data_root,
+                                                                    self._initializer, self._deduplicate),
+                                      daemon=True)
+            process.start()
+            child_connection.close()
+            self._connections.append(parent_connection)
+            self._processes.append(process)
+
+    def _load_files(self, files: List[str], meta_data_keys: Union[List[str], None]) -> List[str]:
+        table_ids = [str(uuid.uuid4()) for _ in files]
+        shard_files: Dict[int, List[Tuple[str, str]]] = {}
+        for file, table_id in zip(files, table_ids):
+            shard_files.setdefault(self._select_shard(file, table_id), []).append((file, table_id))
+        self._request({shard: ('load_files', (shard_file_list, meta_data_keys), {})
+                       for shard, shard_file_list in shard_files.items()})
+        for shard, shard_file_list in shard_files.items():
+            for _, table_id in shard_file_list:
+                self._table_shards[table_id] = shard
+        self._append_positions(table_ids)
+        return table_ids
+
+    def _select_shard(self, file: str, table_id: str) -> int:
+        key = table_id
+        if self._partition_key is not None:
+            meta_data = DataTable._load_meta_data(os.path.join(self._data_root, file), [self._partition_key])
+            if self._partition_key in meta_data:
+                key = repr(meta_data[self._partition_key])
+        return zlib.crc32(key.encode('utf-8')) % self.shards
+
+    def _append_positions(self, table_ids: List[str]):
+        # new tables are ordered behind all existing ones, like the insertion order of a single DataStore
+        for table_id in table_ids:
+            self._table_positions[table_id] = self._next_position
+            self._next_position += 1
+
+    def _group_by_shard(self, table_ids: List[str]) -> Dict[int, List[str]]:
+        groups: Dict[int, List[str]] = {}
+        for table_id in table_ids:
+            groups.setdefault(self._table_shards[table_id], []).append(table_id)
+        return groups
+
+    def _scatter(self, command: str, *args, **kwargs) -> List[Any]:
+        answers = self._request({shard: (command, args, kwargs) for shard in range(self.shards)})
+        return [answers[shard] for shard in range(self.shards)]
+
+    def _request(self, requests: Dict[int, Tuple[str, Tuple, Dict]]) -> Dict[int, Any]:
+        # All requests are sent before the first answer is awaited, the shards work in parallel
+        answers = {}
+        error = None
+        with self._request_lock:
+            if self._failure is not None:
+                raise RuntimeError('The shards of the data warehouse failed before and can not be used anymore: '
+                                   '{!r}'.format(self._failure))
+            # requests that can not be pickled fail here, before any shard got its request
+            messages = {shard: ForkingPickler.dumps(request) for shard, request in requests.items()}
+            try:
+                for shard, message in messages.items():
+                    self._connections[shard].send_bytes(message)
+                for shard in requests:
+                    status, answer = self._connections[shard].recv()
+                    if status == 'error':
+                        error = error or answer
+                    answers[shard] = answer
+            except BaseException as failure:
+                # the answers of the other shards of this round trip would be read by the next request instead of
+                # its own, the connections can not be used anymore
+                self._failure = failure
+                self.close()
+                raise
+        if error is not None:
+            raise error
+        return answers
+
+    def _gather_ordered(self, answers: List[List[Tuple[str, Any]]]) -> List[Any]:
+        merged = [item for answer in answers for item in answer]
+        merged.sort(key=lambda item: self._table_positions[item[0]])
+        return [value for _, value in merged]
+
+    def _gather_by_ids(self, command: str, table_ids: List[str], *args) -> List[Any]:
+        # the shards answer (table id, value) pairs for their part of the ids, the values keep the order of the ids
+        answers = self._request({shard: (command, (ids,) + args, {})
+                                 for shard, ids in self._group_by_shard(table_ids).items()})
+        values = dict(item for answer in answers.values() for item in answer)
+        return [values[table_id] for table_id in table_ids]
+
+    def _ordered_ids(self, meta_filter: Tuple[Dict[str, Any], Dict[str, Any]], order_by: Optional[str],
+                     descending: bool) -> Optional[List[str]]:
+        # Ids of a filter with top-k conditions or an order like a single DataStore selects them, None without both.
+        # A single top-k condition is applied by every shard first, the global top k are among the local ones.
+        # Chained top-k conditions only hold on all tables, then the shards send all candidates.
+        inclusive, exclusive = meta_filter
+        top_ks = [(key, condition) for key, condition in inclusive.items() if isinstance(condition, TopK)]
+        if not top_ks and order_by is None:
+            return None
+        if len(top_ks) > 1:
+            inclusive = {key: Range() if isinstance(condition, TopK) else condition
+                         for key, condition in inclusive.items()}
+        keys = [key for key, _ in top_ks] + ([order_by] if order_by is not None else [])
+        candidates = [item for answer in self._scatter('get_meta_values', (inclusive, exclusive), keys)
+                      for item in answer]
+        candidates.sort(key=lambda item: self._table_positions[item[0]])
+        for key, condition in top_ks:
+            # sorting is stable, equal values stay in insertion order
+            ranked = sorted(candidates, key=lambda item: item[1][key], reverse=condition.largest)
+            selected = {table_id for table_id, _ in ranked[:condition.k]}
+            candidates = [item for item in candidates if item[0] in selected]
+        if order_by is not None:
+            missing = [item for item in candidates if order_by not in item[1]]
+            candidates = sorted((item for item in candidates if order_by in item[1]),
+                                key=lambda item: item[1][order_by], reverse=descending) + missing
+        return [table_id for table_id, _ in candidates]
+
+    @staticmethod
+    def _is_picklable(value: Any) -> bool:
+        if value is None:
+            return True
+        try:
+            pickle.dumps(value)
+        except (pickle.PicklingError, AttributeError, TypeError):
+            return False
+        return True
+
+    @staticmethod
+    def _filter_columns(columns: Union[List[str], None], row_filter: List[Tuple[str, Callable]]) \
+            -> Union[List[str], None]:
+        if columns is None:
+            return None
+        return columns + [column for column, _ in row_filter if column not in columns]
+
+    @staticmethod
+    def _apply_row_filter(frame: pd.DataFrame, columns: Union[List[str], None],
+                          row_filter: List[Tuple[str, Callable]]) -> pd.DataFrame:
+        row_mask = data_aggregation.create_mask(frame, row_filter)
+        return frame.loc[row_mask, columns if columns is not None else slice(None)]
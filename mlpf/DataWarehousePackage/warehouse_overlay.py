@@ -0,0 +1,52 @@
+from .data_warehouse import DataWarehouse
+from .layered_data_store import LayeredDataStore
+from concurrent.futures import Executor
+from typing import List, Tuple, Union, Dict, Any, Optional, AsyncIterator
+
+
+class WarehouseOverlay(DataWarehouse):
+    """
+    Per model view of a shared DataWarehouse. The base warehouse is only read: preprocessed tables, meta data marks
+    and preprocessor states of the overlay stay in the overlay, so several models can work on one copy of the raw
+    data without seeing each other's changes. Loading, refreshing and ingesting folders is handed to the base
+    warehouse and its ingest manifest, so the files of a data root are only loaded once for all overlays and every
+    overlay sees them. Single files loaded with load_data_file are private to the overlay.
+
+    An overlay reads the tables of its base, it therefore shares the read write lock of the base warehouse.
+    """
+
+    def __init__(self, base: DataWarehouse, deduplicate: bool = False):
+        """
+        :param base: shared warehouse, may be an overlay itself
+        :param deduplicate: store identical tables of the overlay only once
+        """
+        super().__init__(base._data_root, deduplicate)
+        self.base: DataWarehouse = base
+        self._data_store: LayeredDataStore = LayeredDataStore(base._data_store, deduplicate)
+        self._lock = base._lock
+
+    def load_data_folders(self, folders=List[str], meta_data_keys: Union[List[str], None] = None) -> List[str]:
+        return self.base.load_data_folders(folders, meta_data_keys)
+
+    def refresh_data_folders(self, folders: List[str], meta_data_keys: Union[List[str], None] = None,
+                             deleted_mark: Union[Tuple[str, Any], None] = None) \
+            -> Tuple[List[str], List[str], List[str]]:
+        return self.base.refresh_data_folders(folders, meta_data_keys, deleted_mark)
+
+    def ingest_data_folders(self, folders: List[str], meta_data_keys: Union[List[str], None] = None,
+                            executor: Optional[Executor] = None, prefetch: int = 4) -> AsyncIterator[str]:
+        return self.base.ingest_data_folders(folders, meta_data_keys, executor, prefetch)
+
+    def preprocessing_by_id(self, table_ids: List[str], method_name: str, source_names: List[str],
+                            settings: Dict, mark_new: Tuple[str, Any],
+                            mark_old: Union[Tuple[str, Any], None], batch_mode: bool, stats: Any = None) -> List[str]:
+        if mark_old:
+            # the source tables are marked in place, base tables need their own copy first
+            with self._lock.write():
+                self._data_store.detach(table_ids)
+        return super().preprocessing_by_id(table_ids, method_name, source_names, settings, mark_new, mark_old,
+                                           batch_mode, stats)
+
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        self._lock = self.base._lock
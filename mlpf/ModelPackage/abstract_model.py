@@ -1,5 +1,7 @@
 import pickle
-from typing import Dict, Any
+from typing import Dict, Any, List, Union
+
+import numpy as np
 
 
 class AbstractModel:
@@ -8,14 +10,34 @@ class AbstractModel:
         self.config = model_config
         self._learn_strategy = learn_strategy
         self._response_strategy = response_strategy
+        self.version: int = 0
 
     def predict(self, signal: Dict[str, Any], **kwargs):
         return self._response_strategy.predict(self, signal, **kwargs)
 
+    def predict_batch(self, signals: Union[List[Dict[str, Any]], Dict[str, np.ndarray]], **kwargs) -> List[Any]:
+        """
+        Predict a batch of signals at once. The batch is either a list of signal dicts or a packed batch, i.e. a
+        signal dict whose array values share a leading batch dimension. Response strategies may implement a
+        vectorized predict_batch kernel, otherwise every signal is forwarded to predict one after another.
+
+        :param signals:
+        :param kwargs:
+        :return: one prediction per signal, in input order
+        """
+        batch_kernel = getattr(self._response_strategy, 'predict_batch', None)
+        if batch_kernel is not None:
+            return batch_kernel(self, signals, **kwargs)
+        return [self.predict(signal, **kwargs) for signal in self.unpack_signal_batch(signals)]
+
     def learn(self, training_signal: Dict[str, Any], **kwargs):
         # In the strategy pattern we will not simply call a function here,
         # but actually call a learn function on a learner object in our model
-        return self._learn_strategy.learn(self, training_signal, **kwargs)
+        try:
+            return self._learn_strategy.learn(self, training_signal, **kwargs)
+        finally:
+            # Every learn step invalidates cached predictions, see PredictionCache
+            self.version = getattr(self, 'version', 0) + 1
 
     def save(self, file_path):
         with open(file_path, "wb") as output_file:
@@ -25,3 +47,20 @@ class AbstractModel:
     def load(cls, file_path):
         with open(file_path, "rb") as input_file:
             return pickle.load(input_file)
+
+    @staticmethod
+    def unpack_signal_batch(signals: Union[List[Dict[str, Any]], Dict[str, np.ndarray]]) -> List[Dict[str, Any]]:
+        """
+        Turn a packed batch into a list of single signals. Lists of signals are returned unchanged.
+
+        :param signals:
+        :return:
+        """
+        if not isinstance(signals, dict):
+            return list(signals)
+        batch_sizes = {len(value) for value in signals.values() if isinstance(value, np.ndarray) and value.ndim > 0}
+        if len(batch_sizes) > 1:
+            raise ValueError('Packed signal batch has arrays with different leading dimensions: {}'.format(batch_sizes))
+        batch_size = batch_sizes.pop() if batch_sizes else 1
+        return [{k: v[i] if isinstance(v, np.ndarray) and v.ndim > 0 else v for k, v in signals.items()}
+                for i in range(batch_size)]
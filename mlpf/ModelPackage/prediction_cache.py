@@ -0,0 +1,112 @@
+from .abstract_model import AbstractModel
+from ..lib.content_hash import content_hash
+from collections import OrderedDict
+from typing import Dict, Any, List, Union
+
+import numpy as np
+import threading
+
+
+class PredictionCache:
+    """
+    Opt-in memoization of model predictions. Results are keyed by a content hash of the signal and the version
+    counter of the model, which AbstractModel.learn increments. Cached answers are therefore never served after the
+    model has learned. Changes to a model that bypass learn have to be followed by a call to clear.
+    """
+
+    def __init__(self, model: AbstractModel, max_size: int = 4096):
+        if max_size < 1:
+            raise ValueError('max_size has to be at least 1')
+        self.model: AbstractModel = model
+        self.max_size: int = max_size
+        self._entries: OrderedDict = OrderedDict()
+        self._version: int = getattr(model, 'version', 0)
+        self._lock = threading.Lock()
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self.invalidations: int = 0
+
+    def predict(self, signal: Dict[str, Any], **kwargs):
+        """
+        Predict a signal, answering from the cache if the same signal was predicted by the current model version
+
+        :param signal:
+        :param kwargs:
+        :return:
+        """
+        key = content_hash((signal, kwargs))
+        found, prediction = self._lookup(key)
+        if found:
+            return prediction
+        prediction = self.model.predict(signal, **kwargs)
+        self._store(key, prediction)
+        return prediction
+
+    def predict_batch(self, signals: Union[List[Dict[str, Any]], Dict[str, np.ndarray]], **kwargs) -> List[Any]:
+        """
+        Predict a batch of signals. Only the signals that are not cached are forwarded to the model, in one
+        predict_batch call.
+
+        :param signals:
+        :param kwargs:
+        :return: one prediction per signal, in input order
+        """
+        signals = self.model.unpack_signal_batch(signals)
+        keys = [content_hash((signal, kwargs)) for signal in signals]
+        predictions = []
+        missing = []
+        for i, key in enumerate(keys):
+            found, prediction = self._lookup(key)
+            predictions.append(prediction)
+            if not found:
+                missing.append(i)
+        if missing:
+            new_predictions = self.model.predict_batch([signals[i] for i in missing], **kwargs)
+            if len(new_predictions) != len(missing):
+                raise ValueError('predict_batch returned {} predictions for {} signals'.format(len(new_predictions),
+                                                                                                len(missing)))
+            for i, prediction in zip(missing, new_predictions):
+                predictions[i] = prediction
+                self._store(keys[i], prediction)
+        return predictions
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def statistics(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {'size': len(self._entries), 'max_size': self.max_size, 'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0., 'evictions': self.evictions,
+                'invalidations': self.invalidations, 'model_version': self._version}
+
+    def _lookup(self, key: bytes):
+        with self._lock:
+            self._check_version()
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def _store(self, key: bytes, prediction: Any):
+        with self._lock:
+            # A learn step during the prediction makes the result stale, it must not be cached
+            if self._check_version():
+                return
+            self._entries[key] = prediction
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _check_version(self) -> bool:
+        version = getattr(self.model, 'version', 0)
+        if version == self._version:
+            return False
+        self._entries.clear()
+        self._version = version
+        self.invalidations += 1
+        return True
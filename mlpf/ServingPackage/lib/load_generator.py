@@ -0,0 +1,73 @@
+from typing import Dict, Any, Optional
+
+import numpy as np
+import asyncio
+import json
+import time
+
+
+async def generate_load(model_id: str, signal: Dict[str, Any], total_requests: int = 1000, concurrency: int = 16,
+                        host: str = '127.0.0.1', port: int = 8080, unix_socket: Optional[str] = None) \
+        -> Dict[str, Any]:
+    """
+    Send total_requests predict requests for the same signal over concurrency keep-alive connections and measure
+    the client side latency and throughput.
+
+    :param model_id:
+    :param signal:
+    :param total_requests:
+    :param concurrency:
+    :param host:
+    :param port:
+    :param unix_socket:
+    :return:
+    """
+    body = json.dumps(signal).encode('utf-8')
+    request = ('POST /models/{}/predict HTTP/1.1\r\nHost: {}\r\nContent-Type: application/json\r\n'
+               'Content-Length: {}\r\n\r\n'.format(model_id, host, len(body))).encode('latin-1') + body
+    per_connection = [total_requests // concurrency + (1 if i < total_requests % concurrency else 0)
+                      for i in range(concurrency)]
+    start = time.perf_counter()
+    results = await asyncio.gather(*[_client(request, n, host, port, unix_socket) for n in per_connection if n])
+    duration = time.perf_counter() - start
+    latencies_ms = np.concatenate([np.asarray(latencies) for latencies, _ in results]) * 1000.
+    errors = sum(error_count for _, error_count in results)
+    return {'requests': int(len(latencies_ms)),
+            'errors': errors,
+            'concurrency': concurrency,
+            'duration_s': duration,
+            'throughput_rps': len(latencies_ms) / duration if duration > 0 else 0.,
+            'latency_ms': {'mean': float(latencies_ms.mean()),
+                           'p50': float(np.percentile(latencies_ms, 50)),
+                           'p95': float(np.percentile(latencies_ms, 95)),
+                           'p99': float(np.percentile(latencies_ms, 99))}}
+
+
+async def _client(request: bytes, amount: int, host: str, port: int, unix_socket: Optional[str]):
+    if unix_socket:
+        reader, writer = await asyncio.open_unix_connection(unix_socket)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    latencies = []
+    errors = 0
+    try:
+        for _ in range(amount):
+            sent = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            status_line = await reader.readline()
+            content_length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                key, _, value = line.decode('latin-1').partition(':')
+                if key.strip().lower() == 'content-length':
+                    content_length = int(value.strip())
+            await reader.readexactly(content_length)
+            latencies.append(time.perf_counter() - sent)
+            if b' 200 ' not in status_line:
+                errors += 1
+    finally:
+        writer.close()
+    return latencies, errors
@@ -0,0 +1,97 @@
+from .serving_metrics import ServingMetrics
+from ...ModelPackage.abstract_model import AbstractModel
+from ...ModelPackage.prediction_cache import PredictionCache
+from typing import Dict, Any, List, Tuple, Optional, Union
+
+import asyncio
+import logging
+import time
+
+
+class MicroBatcher:
+
+    def __init__(self, model_id: str, model: Union[AbstractModel, PredictionCache], metrics: ServingMetrics,
+                 max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        if max_batch_size < 1:
+            raise ValueError('max_batch_size has to be at least 1')
+        self.model_id: str = model_id
+        self.model: Union[AbstractModel, PredictionCache] = model
+        self.max_batch_size: int = max_batch_size
+        self.max_wait: float = max_wait_ms / 1000.
+        self._metrics: ServingMetrics = metrics
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._worker: Optional[asyncio.Task] = None
+
+    async def submit(self, signal: Dict[str, Any]) -> Any:
+        """
+        Queue a signal and wait until its micro batch has been predicted
+
+        :param signal:
+        :return:
+        """
+        if self._worker is None:
+            self._worker = asyncio.ensure_future(self._run())
+        future = asyncio.get_event_loop().create_future()
+        await self._queue.put((signal, future, time.perf_counter()))
+        return await future
+
+    async def close(self):
+        """
+        Stop the batching worker. Requests that are still queued are cancelled.
+
+        :return:
+        """
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        while not self._queue.empty():
+            _, future, _ = self._queue.get_nowait()
+            future.cancel()
+
+    async def _run(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            batch = await self._collect_batch(loop)
+            self._metrics.record_batch(self.model_id, len(batch))
+            signals = [signal for signal, _, _ in batch]
+            try:
+                # The model runs in the default executor so the event loop keeps accepting requests meanwhile.
+                # Only one batch per model is in flight, models therefore do not have to be thread safe.
+                predictions = await loop.run_in_executor(None, self.model.predict_batch, signals)
+                if len(predictions) != len(signals):
+                    raise ValueError('predict_batch returned {} predictions for {} signals'.format(
+                        len(predictions), len(signals)))
+            except Exception as error:
+                logging.exception('Prediction of a batch for model {} failed.'.format(self.model_id))
+                self._resolve(batch, error=error)
+                continue
+            self._resolve(batch, predictions=predictions)
+
+    async def _collect_batch(self, loop) -> List[Tuple[Dict[str, Any], asyncio.Future, float]]:
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _resolve(self, batch: List[Tuple[Dict[str, Any], asyncio.Future, float]], predictions: List[Any] = None,
+                 error: Exception = None):
+        now = time.perf_counter()
+        for i, (_, future, enqueued) in enumerate(batch):
+            self._metrics.record_request(self.model_id, now - enqueued, failed=error is not None)
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(predictions[i])
@@ -0,0 +1,79 @@
+from collections import deque, defaultdict
+from typing import Dict, Any, Deque
+
+import numpy as np
+import time
+
+
+class ModelMetrics:
+
+    def __init__(self, window_size: int = 10000):
+        self.requests: int = 0
+        self.errors: int = 0
+        self.batches: int = 0
+        self.batched_requests: int = 0
+        self.max_batch_size: int = 0
+        self.latencies: Deque[float] = deque(maxlen=window_size)
+
+    def record_batch(self, batch_size: int):
+        self.batches += 1
+        self.batched_requests += batch_size
+        self.max_batch_size = max(self.max_batch_size, batch_size)
+
+    def record_request(self, latency: float, failed: bool = False):
+        self.requests += 1
+        self.latencies.append(latency)
+        if failed:
+            self.errors += 1
+
+    def summary(self, uptime: float) -> Dict[str, Any]:
+        latencies_ms = np.fromiter(self.latencies, dtype=float, count=len(self.latencies)) * 1000.
+        percentiles = np.percentile(latencies_ms, [50, 95, 99]) if len(latencies_ms) else [0., 0., 0.]
+        return {'requests': self.requests,
+                'errors': self.errors,
+                'batches': self.batches,
+                'mean_batch_size': self.batched_requests / self.batches if self.batches else 0.,
+                'max_batch_size': self.max_batch_size,
+                'throughput_rps': self.requests / uptime if uptime > 0 else 0.,
+                'latency_ms': {'mean': float(latencies_ms.mean()) if len(latencies_ms) else 0.,
+                               'p50': float(percentiles[0]),
+                               'p95': float(percentiles[1]),
+                               'p99': float(percentiles[2])}}
+
+
+class ServingMetrics:
+
+    def __init__(self, window_size: int = 10000):
+        self._start = time.perf_counter()
+        self._models: Dict[str, ModelMetrics] = defaultdict(lambda: ModelMetrics(window_size))
+
+    def record_batch(self, model_id: str, batch_size: int):
+        """
+        Record that a micro batch of the given size was sent to a model
+
+        :param model_id:
+        :param batch_size:
+        :return:
+        """
+        self._models[model_id].record_batch(batch_size)
+
+    def record_request(self, model_id: str, latency: float, failed: bool = False):
+        """
+        Record the end to end latency of a single request in seconds
+
+        :param model_id:
+        :param latency:
+        :param failed:
+        :return:
+        """
+        self._models[model_id].record_request(latency, failed)
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Latency percentiles are computed over the most recent requests of each model, counters over the uptime.
+
+        :return:
+        """
+        uptime = time.perf_counter() - self._start
+        return {'uptime_s': uptime,
+                'models': {model_id: metrics.summary(uptime) for model_id, metrics in self._models.items()}}
@@ -0,0 +1,209 @@
+from .lib.micro_batcher import MicroBatcher
+from .lib.serving_metrics import ServingMetrics
+from ..BackendPackage.system_manager import SystemManager
+from ..ModelPackage.prediction_cache import PredictionCache
+from typing import Dict, Any, Tuple, Optional
+
+import pandas as pd
+import numpy as np
+import asyncio
+import json
+import logging
+
+
+class ModelServer:
+    """
+    Local HTTP frontend for the models of a system. Concurrent requests for the same model are coalesced into
+    micro batches and answered with a single predict_batch call. With a cache_size > 0 every model is wrapped in a
+    PredictionCache of that size.
+
+    Routes:
+        POST /models/<model_id>/predict   body: signal as json object, answer: {"prediction": ...}
+        GET  /models                      answer: {"models": [<model_id>, ...]}
+        GET  /metrics                     answer: latency and throughput metrics per model
+    """
+
+    def __init__(self, system: SystemManager, max_batch_size: int = 32, max_wait_ms: float = 5.0,
+                 cache_size: int = 0):
+        self.system: SystemManager = system
+        self.max_batch_size: int = max_batch_size
+        self.max_wait_ms: float = max_wait_ms
+        self.cache_size: int = cache_size
+        self.metrics: ServingMetrics = ServingMetrics()
+        self._batchers: Dict[str, MicroBatcher] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @classmethod
+    def from_save_state(cls, filename: str, **kwargs):
+        """
+        Create a server for a system that was stored with SystemManager.save
+
+        :param filename:
+        :param kwargs: forwarded to the constructor
+        :return:
+        """
+        return cls(SystemManager.load(filename), **kwargs)
+
+    async def predict(self, model_id: str, signal: Dict[str, Any]) -> Any:
+        """
+        Predict a single signal. The signal is batched with other concurrent requests for the same model.
+
+        :param model_id:
+        :param signal:
+        :return:
+        """
+        return await self._get_batcher(model_id).submit(signal)
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8080, unix_socket: Optional[str] = None):
+        """
+        Start listening on a tcp port or, if a path is given, on a unix socket
+
+        :param host:
+        :param port:
+        :param unix_socket:
+        :return:
+        """
+        if unix_socket:
+            self._server = await asyncio.start_unix_server(self._handle_connection, path=unix_socket)
+        else:
+            self._server = await asyncio.start_server(self._handle_connection, host=host, port=port)
+        logging.info('Model server listening on {}'.format(unix_socket or '{}:{}'.format(host, port)))
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for batcher in self._batchers.values():
+            await batcher.close()
+        self._batchers = {}
+
+    def serve_forever(self, host: str = '127.0.0.1', port: int = 8080, unix_socket: Optional[str] = None):
+        """
+        Blocking entry point that runs the server until it is interrupted
+
+        :param host:
+        :param port:
+        :param unix_socket:
+        :return:
+        """
+        async def _serve():
+            await self.start(host, port, unix_socket)
+            try:
+                await self._server.serve_forever()
+            finally:
+                await self.stop()
+        try:
+            asyncio.run(_serve())
+        except KeyboardInterrupt:
+            logging.info('Model server stopped.')
+
+    def _get_batcher(self, model_id: str) -> MicroBatcher:
+        if model_id not in self._batchers:
+            model = self.system.get_model(model_id)
+            if model is None:
+                raise KeyError(model_id)
+            if self.cache_size > 0:
+                model = PredictionCache(model, self.cache_size)
+            self._batchers[model_id] = MicroBatcher(model_id, model, self.metrics, self.max_batch_size,
+                                                    self.max_wait_ms)
+        return self._batchers[model_id]
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except ValueError as error:
+                    # the rest of the stream can not be framed after a malformed request, the connection is closed
+                    self._write_response(writer, 400, {'error': 'Malformed request: {}'.format(error)}, False)
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+                status, payload = await self._route(method, path, body)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                self._write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method: str, path: str, body: bytes) -> Tuple[int, Dict[str, Any]]:
+        parts = [part for part in path.split('?')[0].split('/') if part]
+        if method == 'GET' and parts == ['metrics']:
+            summary = self.metrics.summary()
+            for model_id, batcher in self._batchers.items():
+                if isinstance(batcher.model, PredictionCache) and model_id in summary['models']:
+                    summary['models'][model_id]['cache'] = batcher.model.statistics()
+            return 200, summary
+        if method == 'GET' and parts == ['models']:
+            return 200, {'models': [model_id for model_id, (model, _) in self.system.model_data_pairs.items()
+                                    if model is not None]}
+        if method == 'POST' and len(parts) == 3 and parts[0] == 'models' and parts[2] == 'predict':
+            try:
+                signal = self._decode_signal(json.loads(body or b'{}'))
+            except ValueError as error:
+                return 400, {'error': 'Invalid signal: {}'.format(error)}
+            try:
+                batcher = self._get_batcher(parts[1])
+            except KeyError:
+                return 404, {'error': 'Unknown model id {}'.format(parts[1])}
+            try:
+                return 200, {'prediction': await batcher.submit(signal)}
+            except Exception as error:
+                return 500, {'error': repr(error)}
+        return 404, {'error': 'Unknown route {} {}'.format(method, path)}
+
+    @staticmethod
+    async def _read_request(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+        request_line = await reader.readline()
+        if not request_line.strip():
+            return None
+        parts = request_line.decode('latin-1').split()
+        if len(parts) != 3:
+            raise ValueError('invalid request line {!r}'.format(request_line.strip()))
+        method, path, _ = parts
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            key, _, value = line.decode('latin-1').partition(':')
+            headers[key.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            raise ValueError('invalid content-length {!r}'.format(headers['content-length'])) from None
+        if length < 0:
+            raise ValueError('invalid content-length {!r}'.format(headers['content-length']))
+        body = await reader.readexactly(length)
+        return method.upper(), path, headers, body
+
+    @classmethod
+    def _write_response(cls, writer: asyncio.StreamWriter, status: int, payload: Dict[str, Any], keep_alive: bool):
+        body = json.dumps(payload, default=cls._encode_value).encode('utf-8')
+        reason = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 500: 'Internal Server Error'}[status]
+        head = 'HTTP/1.1 {} {}\r\nContent-Type: application/json\r\nContent-Length: {}\r\nConnection: {}\r\n\r\n'
+        writer.write(head.format(status, reason, len(body), 'keep-alive' if keep_alive else 'close').encode('latin-1'))
+        writer.write(body)
+
+    @staticmethod
+    def _decode_signal(signal: Dict[str, Any]) -> Dict[str, Any]:
+        if not isinstance(signal, dict):
+            raise ValueError('signal has to be a json object')
+        if isinstance(signal.get('data_signal'), dict):
+            signal['data_signal'] = pd.DataFrame(signal['data_signal'])
+        return signal
+
+    @staticmethod
+    def _encode_value(value: Any) -> Any:
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            return value.to_dict(orient='list') if isinstance(value, pd.DataFrame) else value.tolist()
+        if isinstance(value, (np.ndarray, np.generic)):
+            return value.tolist()
+        raise TypeError('Object of type {} is not json serializable'.format(type(value).__name__))
@@ -0,0 +1,49 @@
+from typing import Any
+
+import pandas as pd
+import numpy as np
+import hashlib
+
+
+def content_hash(value: Any) -> bytes:
+    """
+    Compute a content hash of a value. Data frames and arrays are hashed on their raw values, containers
+    recursively.
+
+    :param value:
+    :return:
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    _update_hash(hasher, value)
+    return hasher.digest()
+
+
+def _update_hash(hasher, value: Any):
+    if isinstance(value, pd.DataFrame):
+        hasher.update(b'frame')
+        hasher.update(repr((list(value.columns), [str(dtype) for dtype in value.dtypes])).encode())
+        hasher.update(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+    elif isinstance(value, pd.Series):
+        hasher.update(b'series')
+        hasher.update(repr((value.name, str(value.dtype))).encode())
+        hasher.update(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+    elif isinstance(value, np.ndarray):
+        hasher.update(b'array')
+        hasher.update(repr((value.dtype.str, value.shape)).encode())
+        if value.dtype.hasobject:
+            _update_hash(hasher, value.tolist())
+        else:
+            hasher.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, dict):
+        hasher.update(b'dict')
+        for key in sorted(value, key=repr):
+            _update_hash(hasher, key)
+            _update_hash(hasher, value[key])
+    elif isinstance(value, (list, tuple)):
+        hasher.update(type(value).__name__.encode())
+        hasher.update(str(len(value)).encode())
+        for item in value:
+            _update_hash(hasher, item)
+    else:
+        hasher.update(type(value).__name__.encode())
+        hasher.update(repr(value).encode())
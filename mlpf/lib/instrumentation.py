@@ -0,0 +1,260 @@
+"""
+Per stage timing and counters for the data and learning pipeline.
+
+Instrumentation is disabled by default. While disabled, stage() hands out a shared no-op recorder, so the cost of an
+instrumented call is a global flag check. The recorder and its statistics are global to the process: they are
+shared by all system managers and warehouses of the process. It is enabled by enable() until disable(), or by
+acquire() as long as acquire() was called more often than release(), which is how system managers with the
+instrumentation config flag enable it for their lifetime. Usage inside the pipeline:
+
+    with instrumentation.stage('from_source') as recorder:
+        frame = pd.read_csv(data_source)
+        recorder.add_frames([frame])
+"""
+from collections import defaultdict
+from typing import Dict, Any, List, Set
+
+import pandas as pd
+import cProfile
+import io
+import json
+import pstats
+import threading
+import time
+
+
+_enabled: bool = False
+# amount of acquire() calls without a release(), e.g. of living system managers with instrumentation
+_holders: int = 0
+_lock = threading.Lock()
+_profile_requests: Set[str] = set()
+_profiles: Dict[str, str] = {}
+_profiling: bool = False
+
+
+class _Distribution:
+
+    def __init__(self):
+        self.total: float = 0.
+        self.minimum: float = float('inf')
+        self.maximum: float = 0.
+        # log2 buckets over microseconds, bucket k counts durations in [2^(k-1), 2^k) us
+        self.histogram: Dict[int, int] = defaultdict(int)
+
+    def add(self, seconds: float):
+        self.total += seconds
+        self.minimum = min(self.minimum, seconds)
+        self.maximum = max(self.maximum, seconds)
+        self.histogram[int(seconds * 1e6).bit_length()] += 1
+
+    def summary(self, calls: int) -> Dict[str, Any]:
+        return {'total_s': self.total,
+                'mean_s': self.total / calls if calls else 0.,
+                'min_s': self.minimum if calls else 0.,
+                'max_s': self.maximum,
+                'histogram_us': {'<{}'.format(2 ** bucket): count for bucket, count in sorted(self.histogram.items())}}
+
+
+class _StageStatistics:
+
+    def __init__(self):
+        self.calls: int = 0
+        self.rows: int = 0
+        self.bytes: int = 0
+        self.wall = _Distribution()
+        self.cpu = _Distribution()
+
+    def summary(self) -> Dict[str, Any]:
+        return {'calls': self.calls, 'rows': self.rows, 'bytes': self.bytes,
+                'wall': self.wall.summary(self.calls), 'cpu': self.cpu.summary(self.calls)}
+
+
+_stages: Dict[str, _StageStatistics] = defaultdict(_StageStatistics)
+
+
+class _NullRecorder:
+
+    active = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+    def add(self, rows: int = 0, nbytes: int = 0):
+        pass
+
+    def add_frames(self, frames: List[pd.DataFrame]):
+        pass
+
+
+_NULL_RECORDER = _NullRecorder()
+
+
+class _StageRecorder:
+
+    active = True
+
+    def __init__(self, name: str):
+        self.name: str = name
+        self.rows: int = 0
+        self.bytes: int = 0
+        self._profiler = None
+
+    def __enter__(self):
+        global _profiling
+        with _lock:
+            # Only one cProfile capture can be active at a time
+            capture = self.name in _profile_requests and not _profiling
+            if capture:
+                _profiling = True
+        if capture:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        wall = time.perf_counter() - self._wall
+        cpu = time.process_time() - self._cpu
+        if self._profiler is not None:
+            self._profiler.disable()
+            self._store_profile()
+        with _lock:
+            statistics = _stages[self.name]
+            statistics.calls += 1
+            statistics.rows += self.rows
+            statistics.bytes += self.bytes
+            statistics.wall.add(wall)
+            statistics.cpu.add(cpu)
+        return False
+
+    def add(self, rows: int = 0, nbytes: int = 0):
+        self.rows += rows
+        self.bytes += nbytes
+
+    def add_frames(self, frames: List[pd.DataFrame]):
+        for frame in frames:
+            if frame is not None:
+                self.rows += len(frame)
+                self.bytes += int(frame.memory_usage(index=True, deep=False).sum())
+
+    def _store_profile(self):
+        global _profiling
+        stream = io.StringIO()
+        pstats.Stats(self._profiler, stream=stream).sort_stats('cumulative').print_stats(30)
+        with _lock:
+            _profile_requests.discard(self.name)
+            _profiles[self.name] = stream.getvalue()
+            _profiling = False
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def acquire():
+    """
+    Enable the instrumentation until the matching release(), independent of enable() and disable()
+
+    :return:
+    """
+    global _holders
+    with _lock:
+        _holders += 1
+
+
+def release():
+    """
+    Undo one acquire(), the instrumentation stays enabled while other acquires or enable() are in effect
+
+    :return:
+    """
+    global _holders
+    with _lock:
+        _holders = max(0, _holders - 1)
+
+
+def is_enabled() -> bool:
+    return _enabled or _holders > 0
+
+
+def reset():
+    """
+    Drop all recorded statistics and profiles
+
+    :return:
+    """
+    with _lock:
+        _stages.clear()
+        _profiles.clear()
+        _profile_requests.clear()
+
+
+def stage(name: str):
+    """
+    Context manager that records wall and cpu time of one execution of a pipeline stage. The returned recorder
+    accepts the amount of rows and bytes the stage processed.
+
+    :param name:
+    :return:
+    """
+    if not _enabled and not _holders:
+        return _NULL_RECORDER
+    return _StageRecorder(name)
+
+
+def profile_stage(name: str):
+    """
+    Capture a cProfile of the next execution of the stage, retrievable with get_profile afterwards.
+    Instrumentation has to be enabled for the capture to happen.
+
+    :param name:
+    :return:
+    """
+    with _lock:
+        _profile_requests.add(name)
+
+
+def get_profile(name: str) -> str:
+    """
+    Get the cumulative cProfile report of the last profiled execution of a stage
+
+    :param name:
+    :return:
+    """
+    return _profiles.get(name, '')
+
+
+def stats() -> Dict[str, Any]:
+    """
+    Summary of all recorded stages: call count, rows, bytes and wall/cpu time distributions
+
+    :return:
+    """
+    with _lock:
+        return {name: statistics.summary() for name, statistics in _stages.items()}
+
+
+def export_json(filename: str, include_profiles: bool = True):
+    """
+    Write the statistics, and optionally the captured profiles, to a json file
+
+    :param filename:
+    :param include_profiles:
+    :return:
+    """
+    content = {'stages': stats()}
+    if include_profiles:
+        with _lock:
+            content['profiles'] = dict(_profiles)
+    with open(filename, 'w') as outfile:
+        json.dump(content, outfile, indent=4, sort_keys=True)
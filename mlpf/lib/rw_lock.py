@@ -0,0 +1,107 @@
+from contextlib import contextmanager
+
+import functools
+import threading
+
+
+class ReadWriteLock:
+    """
+    Lock that lets any number of readers in at the same time, but a writer only alone. Waiting writers are
+    preferred over new readers, so a steady stream of queries can not starve ingestion.
+
+    Both sides are reentrant per thread: a reader may read again and a writer may read or write again. Upgrading a
+    read lock to a write lock would deadlock and raises a RuntimeError instead.
+    """
+
+    def __init__(self):
+        self._condition: threading.Condition = threading.Condition(threading.Lock())
+        self._readers: int = 0
+        self._writer = None
+        self._write_depth: int = 0
+        self._waiting_writers: int = 0
+        self._local: threading.local = threading.local()
+
+    @contextmanager
+    def read(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+    def acquire_read(self):
+        depth = getattr(self._local, 'read_depth', 0)
+        if depth or self._writer == threading.get_ident():
+            # nested inside a read or write of this thread, waiting for writers would deadlock
+            self._local.read_depth = depth + 1
+            return
+        with self._condition:
+            while self._writer is not None or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+        self._local.read_depth = 1
+
+    def release_read(self):
+        depth = self._local.read_depth - 1
+        self._local.read_depth = depth
+        if depth or self._writer == threading.get_ident():
+            return
+        with self._condition:
+            self._readers -= 1
+            if not self._readers:
+                self._condition.notify_all()
+
+    def acquire_write(self):
+        me = threading.get_ident()
+        if self._writer == me:
+            self._write_depth += 1
+            return
+        if getattr(self._local, 'read_depth', 0):
+            raise RuntimeError('A read lock can not be upgraded to a write lock.')
+        with self._condition:
+            self._waiting_writers += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._condition.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writer = me
+            self._write_depth = 1
+
+    def release_write(self):
+        self._write_depth -= 1
+        if self._write_depth:
+            return
+        with self._condition:
+            self._writer = None
+            self._condition.notify_all()
+
+
+def read_locked(method):
+    """
+    Run a method under the read lock of its instance, which has to be stored in the attribute _lock
+    """
+    @functools.wraps(method)
+    def locked(self, *args, **kwargs):
+        with self._lock.read():
+            return method(self, *args, **kwargs)
+    return locked
+
+
+def write_locked(method):
+    """
+    Run a method under the write lock of its instance, which has to be stored in the attribute _lock
+    """
+    @functools.wraps(method)
+    def locked(self, *args, **kwargs):
+        with self._lock.write():
+            return method(self, *args, **kwargs)
+    return locked